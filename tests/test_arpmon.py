@@ -0,0 +1,77 @@
+"""Puntuación de ArpSpoofDetector sobre réplicas sintéticas (sin captura real)."""
+
+from __future__ import annotations
+from typing import Any, Dict, List
+import socket
+
+from wifi_guardian.arpmon import ArpSpoofDetector
+
+GATEWAY_IP = "192.168.1.1"
+GATEWAY_MAC = "00:11:22:33:44:55"
+ATTACKER_MAC = "66:77:88:99:aa:bb"
+VICTIM_IP = "192.168.1.50"
+VICTIM_MAC = "de:ad:be:ef:00:01"
+
+
+def arp_frame(op: int, sha: str, spa: str, tha: str, tpa: str) -> bytes:
+    """Trama Ethernet + ARP IPv4 (op 1 = request, 2 = reply)."""
+    sha_b = bytes.fromhex(sha.replace(":", ""))
+    tha_b = bytes.fromhex(tha.replace(":", ""))
+    dst = b"\xff" * 6 if op == 1 else tha_b
+    return (
+        dst + sha_b + b"\x08\x06"
+        + b"\x00\x01\x08\x00\x06\x04" + op.to_bytes(2, "big")
+        + sha_b + socket.inet_aton(spa) + tha_b + socket.inet_aton(tpa)
+    )
+
+
+def persistent_poisoning() -> List[Any]:
+    """Una reply del gateway en t=1000 y el atacante reclamando su IP cada 2 s durante 10 min desde t=1200."""
+    batch = [(1000.0, arp_frame(2, GATEWAY_MAC, GATEWAY_IP, VICTIM_MAC, VICTIM_IP))]
+    for i in range(300):
+        batch.append((1200.0 + 2 * i, arp_frame(2, ATTACKER_MAC, GATEWAY_IP, VICTIM_MAC, VICTIM_IP)))
+    return batch
+
+
+def run(batch: List[Any], **kwargs: Any) -> Dict[str, Any]:
+    events: List[Dict[str, Any]] = []
+    det = ArpSpoofDetector(on_event=events.append, **kwargs)
+    det.process_batch(batch)
+    return {"counters": det.counters, "events": events}
+
+
+def test_persistent_poisoning_against_baseline_alerts():
+    res = run(persistent_poisoning(), baseline={GATEWAY_IP: GATEWAY_MAC})
+    assert res["counters"]["mac_changes"] == 1
+    assert res["counters"]["alerts"] == 1
+    ev = res["events"][0]
+    assert ev["ip"] == GATEWAY_IP and ev["new_mac"] == ATTACKER_MAC
+    assert "baseline_mismatch" in ev["reasons"]
+    assert "previous_stale" not in ev["reasons"]
+
+
+def test_baseline_mismatch_alone_reaches_threshold():
+    res = run(persistent_poisoning(), baseline={GATEWAY_IP: GATEWAY_MAC}, threshold=90)
+    assert res["counters"]["alerts"] == 1
+    assert res["events"][0]["score"] >= 90
+
+
+def test_reassignment_matching_baseline_is_suppressed():
+    # La IP pasa al equipo que el baseline ya conocía: churn DHCP, no ataque
+    res = run(persistent_poisoning(), baseline={GATEWAY_IP: ATTACKER_MAC})
+    assert res["counters"]["alerts"] == 0
+    assert res["counters"]["suppressed"] == 1
+
+
+def test_first_flip_without_baseline_keeps_floor():
+    # Sin baseline un cambio aislado no alerta, pero una ráfaga de gratuitos sí,
+    # aunque la MAC anterior lleve callada más de 'stale_after'
+    quiet = run(persistent_poisoning())
+    assert quiet["counters"]["alerts"] == 0
+
+    batch = [(1000.0, arp_frame(2, GATEWAY_MAC, GATEWAY_IP, VICTIM_MAC, VICTIM_IP))]
+    for i in range(6):
+        batch.append((1200.0 + 0.1 * i, arp_frame(1, ATTACKER_MAC, GATEWAY_IP, "00:00:00:00:00:00", GATEWAY_IP)))
+    burst = run(batch, gratuitous_burst=1)
+    assert burst["counters"]["alerts"] == 1
+    assert "previous_stale" in burst["events"][0]["reasons"]
@@ -2,9 +2,13 @@
 CLI de WiFi Guardian con Typer.
 Comandos:
   - scan: escaneo ARP/ICMP + baseline + informe (+ opcional: actualizar base OUI)
-  - watch-arp: escucha cambios ARP (posible ARP spoof)
-  - deauth: detector de deauth (Linux + monitor)
+  - passive: inventario pasivo (ARP/DHCP/mDNS/NBNS) sin enviar tráfico
+  - watch: daemon de vigilancia continua (altas/bajas de dispositivos)
+  - watch-arp: alertas en streaming de cambios ARP (posible ARP spoof)
+  - deauth: detector de ráfagas deauth/disassoc con serie por segundo (Linux + monitor)
   - vendors-update: actualiza la base OUI (fabricantes) sin escanear
+  - history: consultas sobre el histórico SQLite (escaneos, dispositivo, diff)
+  - bench: banco de pruebas con LAN simulada (run) y comparación entre commits (compare)
 """
 
 from __future__ import annotations
@@ -12,121 +16,487 @@ import typer
 from rich import print
 from pathlib import Path
 
-from .scan import infer_default_iface_and_cidr, arp_scan, monitor_arp_spoof
-from .baseline import load_baseline, save_baseline, diff_baseline
+from typing import List
+import json
+import time
+from .scan import plan_segments, scan_segments, monitor_arp_spoof
+from .baseline import load_baseline, save_baseline, diff_devices
 from .report import write_reports
 from .deauth import detect_deauth
+from .capture import PcapError
 from .aliases import load_aliases, apply_aliases  # <-- para alias amigables
+from . import cache as enrich_cache
+from . import profiling
 
 app = typer.Typer(add_completion=False, help="WiFi Guardian - escaneo y monitor de tu red local")
 
 @app.command()
 def scan(
-    cidr: str = typer.Option(None, help="CIDR de la subred (ej: 192.168.1.0/24)"),
-    iface: str = typer.Option(None, help="Interfaz a usar (ej: wlan0, Ethernet)"),
+    cidr: List[str] = typer.Option(None, help="CIDR de la subred (ej: 192.168.1.0/24). Repetible para varias VLAN"),
+    iface: List[str] = typer.Option(None, help="Interfaz a usar (ej: wlan0, Ethernet). Repetible, en el mismo orden que --cidr"),
+    all_ifaces: bool = typer.Option(False, help="Escanear en paralelo todas las interfaces IPv4 válidas"),
     report_dir: Path = typer.Option(Path("reports"), help="Directorio de informes"),
     baseline_file: Path = typer.Option(Path(".wg_baseline.json"), help="Archivo de baseline"),
     aliases_file: Path = typer.Option(Path("device_alias.json"), help="Archivo de alias amigables (IP/MAC→nombre)"),
-    update_vendors: bool = typer.Option(False, help="Actualizar la base OUI (requiere Internet) antes de escanear")
+    update_vendors: bool = typer.Option(False, help="Actualizar la base OUI (requiere Internet) antes de escanear"),
+    cache_file: Path = typer.Option(None, help="Caché de hostnames/fabricantes (por defecto: .wg_cache.json junto al baseline)"),
+    no_cache: bool = typer.Option(False, help="No leer ni guardar la caché de enriquecido (resolver todo de nuevo)"),
+    engine: str = typer.Option("auto", help="Motor ARP L2: auto | scapy | raw (AF_PACKET, Linux; recomendado en /16)"),
+    history_file: Path = typer.Option(None, help="Añadir el escaneo al histórico SQLite (ej. .wg_history.db)"),
+    output: List[str] = typer.Option(None, help="Salida adicional legible por máquina: jsonl | csv | prom. Repetible"),
+    no_html: bool = typer.Option(False, help="No generar el informe HTML (p. ej. en ejecuciones frecuentes)"),
+    inline_assets: bool = typer.Option(False, help="Incrustar CSS/JS también en informes paginados (por defecto solo hasta 2000 filas; si no, van a <report-dir>/assets/)"),
+    textfile_dir: Path = typer.Option(None, help="Directorio del textfile collector de node-exporter para 'prom' (por defecto --report-dir)"),
+    profile: bool = typer.Option(False, help="Medir tiempos por etapa, latencias por host y paquetes (tabla al final y 'profile' en el resumen)")
 ):
     """
     Escaneo ARP/ICMP de la red, comparación con baseline y generación de informe.
+    Con varios --cidr/--iface (o --all-ifaces) escanea cada segmento en paralelo
+    y fusiona el resultado en un único informe y baseline.
     Opcionalmente, actualiza la base de OUIs (fabricantes) para anotar vendor:<nombre>.
+    Con --output escribe además JSON lines, CSV o métricas de Prometheus (--no-html omite el HTML).
+    Con --profile mide cada etapa y lo muestra en una tabla (y en el resumen del informe).
     """
+    output = _check_outputs(output)
+    engine = _check_engine(engine)
+    t0 = time.monotonic()
+    if profile:
+        profiling.enable()
     try:
+        # Caché de enriquecido junto al baseline (o solo en memoria con --no-cache)
+        cache_path = None if no_cache else (cache_file or baseline_file.with_name(enrich_cache.DEFAULT_CACHE_FILE.name))
+        enrich_cache.configure(cache_path)
+
         # (Opcional) Actualizar base OUI
         if update_vendors:
             try:
                 from .vendor import update_local_db
                 ok = update_local_db()
                 if ok:
+                    enrich_cache.get_cache().clear_negative_vendors()
                     print("[yellow]Base OUI actualizada correctamente.[/yellow]")
                 else:
                     print("[red]No se pudo actualizar la base OUI (se usará la caché local si existe).[/red]")
             except Exception as e:
                 print(f"[red]Error actualizando OUI:[/red] {e}")
 
-        # Autodetección si faltan parámetros
-        if not cidr or not iface:
-            di, dc = infer_default_iface_and_cidr()
-            iface = iface or di
-            cidr  = cidr or dc
+        # Segmentos a escanear (autodetección si faltan parámetros)
+        segments = plan_segments(cidr, iface, all_ifaces)
+        for seg_iface, seg_cidr in segments:
+            print(f"[bold]Interfaz:[/bold] {seg_iface}  [bold]Red:[/bold] {seg_cidr}")
+
+        # Descubrimiento de dispositivos (segmentos en paralelo)
+        devices, scan_stats = scan_segments(segments, engine=engine)
+        for st in scan_stats:
+            if st.get("error"):
+                print(f"[red]Error en {st['iface']} {st['cidr']}:[/red] {st['error']}")
+            for p in st.get("l2_passes", []):
+                print(f"[dim]{st['iface']} pasada L2 {p['pass']}: {p['sent']} enviados, {p['hits']} respuestas, {p['elapsed_s']} s[/dim]")
+            pl = st.get("pipeline")
+            if pl:
+                print(f"[dim]{st['iface']} enriquecido: {pl['hosts']} hosts durante el barrido ({pl['discover_s']} s), "
+                      f"espera final {pl['drain_s']} s; nombres {pl['name_lookups']} consultas / {pl['name_cache_hits']} caché"
+                      f"{', sin terminar: ' + str(pl['late']) if pl['late'] else ''}[/dim]")
 
-        print(f"[bold]Interfaz:[/bold] {iface}  [bold]Red:[/bold] {cidr}")
+        summary = {
+            "iface": ", ".join(dict.fromkeys(i for i, _ in segments)),
+            "cidr": ", ".join(c for _, c in segments),
+            "scan_stats": scan_stats,
+            "elapsed_s": round(time.monotonic() - t0, 3),
+        }
+        _report_inventory(devices, summary, "WiFi Guardian - Informe de escaneo",
+                          report_dir, baseline_file, aliases_file, update_baseline=True,
+                          mode="scan", output=output, no_html=no_html, textfile_dir=textfile_dir,
+                          inline_assets=inline_assets)
 
-        # Descubrimiento de dispositivos
-        devices = arp_scan(cidr=cidr, iface=iface)
+        if history_file:
+            from .history import HistoryStore
+            with HistoryStore(history_file) as h:
+                scan_id = h.record_scan(devices, source="scan", segments=summary["cidr"])
+            print(f"[green]Histórico actualizado:[/green] {history_file} (escaneo #{scan_id})")
 
-        # Aplicar alias amigables
-        try:
+    except Exception as e:
+        print(f"[red]Error:[/red] {e}")
+    finally:
+        if profile:
+            _print_profile(profiling.report())
+
+def _report_inventory(
+    devices: list,
+    summary: dict,
+    title: str,
+    report_dir: Path,
+    baseline_file: Path,
+    aliases_file: Path,
+    update_baseline: bool = True,
+    mode: str = "scan",
+    output: List[str] = (),
+    no_html: bool = False,
+    textfile_dir: Path = None,
+    inline_assets: bool = False,
+) -> None:
+    """Pasos comunes tras el descubrimiento: alias, diff con baseline, informes y baseline."""
+    # Aplicar alias amigables
+    try:
+        with profiling.stage("aliases.apply"):
             aliases = load_aliases(aliases_file)
             n_alias = apply_aliases(devices, aliases)
-            if n_alias:
-                print(f"[cyan]{n_alias} alias aplicados desde {aliases_file}[/cyan]")
-        except Exception as e:
-            print(f"[yellow]No se pudieron aplicar alias:[/yellow] {e}")
+        if n_alias:
+            print(f"[cyan]{n_alias} alias aplicados desde {aliases_file}[/cyan]")
+    except Exception as e:
+        print(f"[yellow]No se pudieron aplicar alias:[/yellow] {e}")
 
-        # Comparación con baseline anterior
-        old = load_baseline(baseline_file)
-        added, removed = diff_baseline(old, devices)
+    # Comparación con baseline anterior (identidad por MAC)
+    old = load_baseline(baseline_file)
+    changes = diff_devices(old.get("devices", []), devices)
+    added = changes["new"] + [p["new"] for p in changes["mac_changed"]]
+    removed = changes["gone"] + [p["old"] for p in changes["mac_changed"]]
 
-        anomalies = []
-        if added:
-            anomalies.append(f"Nuevos dispositivos: {len(added)}")
-        if removed:
-            anomalies.append(f"Dispositivos ausentes respecto a baseline: {len(removed)}")
+    anomalies = []
+    if added:
+        anomalies.append(f"Nuevos dispositivos: {len(added)}")
+    if removed:
+        anomalies.append(f"Dispositivos ausentes respecto a baseline: {len(removed)}")
+    for p in changes["mac_changed"]:
+        anomalies.append(f"IP {p['new'].get('ip')} con otra MAC: {p['old'].get('mac')} → {p['new'].get('mac')} "
+                         f"(posible spoof o equipo sustituido)")
+    if changes["moved_ip"]:
+        anomalies.append(f"Dispositivos que cambiaron de IP (DHCP): {len(changes['moved_ip'])}")
 
-        summary = {
-            "iface": iface,
-            "cidr": cidr,
-            "total_devices": len(devices),
-            "added_since_baseline": [d.get("ip") for d in added],
-            "removed_since_baseline": [d.get("ip") for d in removed],
-        }
+    summary = {
+        **summary,
+        "total_devices": len(devices),
+        "added_since_baseline": [d.get("ip") for d in added],
+        "removed_since_baseline": [d.get("ip") for d in removed],
+        "moved_ip": [{"mac": p["new"].get("mac"), "from": p["old"].get("ip"), "to": p["new"].get("ip")}
+                     for p in changes["moved_ip"]],
+        "mac_changed": [{"ip": p["new"].get("ip"), "from": p["old"].get("mac"), "to": p["new"].get("mac")}
+                        for p in changes["mac_changed"]],
+        "metadata_changed": [{"mac": p["new"].get("mac"), "ip": p["new"].get("ip"), "fields": p["fields"]}
+                             for p in changes["metadata_changed"]],
+    }
 
-        out = write_reports(report_dir, "WiFi Guardian - Informe de escaneo", summary, devices, anomalies)
-        print(f"[green]Informe generado:[/green] {out}")
+    if profiling.get_profiler().enabled:
+        # Lo medido hasta aquí; la escritura de informes y baseline sale en la tabla de --profile
+        summary["profile"] = profiling.report()
 
-        # Guardar baseline actual
+    _write_reports(report_dir, title, mode, summary, devices, anomalies, output, no_html, textfile_dir,
+                   inline_assets=inline_assets)
+
+    # Guardar baseline actual
+    if update_baseline:
         save_baseline(baseline_file, devices)
         print(f"[green]Baseline actualizada:[/green] {baseline_file}")
 
+def _check_outputs(output: List[str]) -> List[str]:
+    """Valida --output antes de empezar (no tras minutos de captura)."""
+    from .outputs import FORMATS
+    bad = [f for f in (output or []) if f not in FORMATS]
+    if bad:
+        print(f"[red]Error:[/red] formato de salida desconocido: {', '.join(bad)} (válidos: {', '.join(FORMATS)})")
+        raise typer.Exit(1)
+    return list(output or [])
+
+def _write_reports(
+    report_dir: Path,
+    title: str,
+    mode: str,
+    summary: dict,
+    devices: list,
+    anomalies: list,
+    output: List[str] = (),
+    no_html: bool = False,
+    textfile_dir: Path = None,
+    quiet: bool = False,
+    inline_assets: bool = False,
+) -> None:
+    """
+    Informe HTML (salvo --no-html) y salidas --output, con el mismo sufijo de fecha.
+    Sin --inline-assets el CSS/JS se incrusta solo si el informe no va paginado.
+    """
+    import datetime
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    if not no_html:
+        out = write_reports(report_dir, title, summary, devices, anomalies,
+                            inline_assets=True if inline_assets else None, stamp=stamp)
+        if not quiet:
+            print(f"[green]Informe generado:[/green] {out}")
+    if output:
+        from .outputs import write_outputs
+        for path in write_outputs(report_dir, output, mode, summary, devices, anomalies,
+                                  stamp=stamp, textfile_dir=textfile_dir):
+            if not quiet:
+                print(f"[green]Salida generada:[/green] {path}")
+
+def _print_profile(prof: dict) -> None:
+    """Tablas de --profile: etapas (tiempo sumado entre hilos), latencias por host y contadores."""
+    from rich.table import Table
+    stages = Table(title="Perfil: etapas", title_justify="left")
+    for col in ("Etapa", "Llamadas", "Total (s)", "Máx (s)"):
+        stages.add_column(col, justify="left" if col == "Etapa" else "right")
+    for name, st in prof["stages"].items():
+        stages.add_row(name, str(st["calls"]), f"{st['total_s']:.3f}", f"{st['max_s']:.3f}")
+    print(stages)
+    if prof["latency"]:
+        lat = Table(title="Perfil: latencia por host (ms)", title_justify="left")
+        for col in ("Operación", "N", "p50", "p90", "p99", "Máx"):
+            lat.add_column(col, justify="left" if col == "Operación" else "right")
+        for name, h in prof["latency"].items():
+            lat.add_row(name, str(h["n"]), str(h["p50_ms"]), str(h["p90_ms"]), str(h["p99_ms"]), str(h["max_ms"]))
+        print(lat)
+    if prof["counters"]:
+        print("[dim]" + ", ".join(f"{k}={v}" for k, v in prof["counters"].items()) + "[/dim]")
+
+def _print_replay(stats: dict) -> None:
+    """Rendimiento de una relectura de pcap (paquetes/s de extremo a extremo)."""
+    print(f"[dim]pcap: {stats.get('frames', 0)} paquetes en {stats.get('elapsed_s', 0)} s "
+          f"({stats.get('pps', 0)} pps; otros linktypes: {stats.get('skipped_linktype', 0)})[/dim]")
+
+@app.command("passive")
+def passive_cmd(
+    iface: str = typer.Option(None, help="Interfaz donde escuchar (por defecto la de scapy)"),
+    seconds: int = typer.Option(300, help="Duración de la escucha en segundos"),
+    report_dir: Path = typer.Option(Path("reports"), help="Directorio de informes"),
+    baseline_file: Path = typer.Option(Path(".wg_baseline.json"), help="Archivo de baseline"),
+    aliases_file: Path = typer.Option(Path("device_alias.json"), help="Archivo de alias amigables (IP/MAC→nombre)"),
+    update_baseline: bool = typer.Option(False, help="Guardar el inventario pasivo como nuevo baseline"),
+    cache_file: Path = typer.Option(None, help="Caché de hostnames/fabricantes (por defecto: .wg_cache.json junto al baseline)"),
+    no_cache: bool = typer.Option(False, help="No leer ni guardar la caché de enriquecido (resolver todo de nuevo)"),
+    pcap: Path = typer.Option(None, help="Analizar un fichero pcap/pcapng (a toda velocidad) en lugar de escuchar en vivo"),
+    output: List[str] = typer.Option(None, help="Salida adicional legible por máquina: jsonl | csv | prom. Repetible"),
+    no_html: bool = typer.Option(False, help="No generar el informe HTML (p. ej. en ejecuciones frecuentes)"),
+    inline_assets: bool = typer.Option(False, help="Incrustar CSS/JS también en informes paginados (por defecto solo hasta 2000 filas; si no, van a <report-dir>/assets/)"),
+    textfile_dir: Path = typer.Option(None, help="Directorio del textfile collector de node-exporter para 'prom' (por defecto --report-dir)")
+):
+    """
+    Inventario pasivo: sin enviar tráfico, descubre dispositivos por ARP, DHCP
+    (hostname, opción 12), mDNS y NBNS. Compara con el baseline y genera informe.
+    El baseline no se sobrescribe salvo --update-baseline (una escucha corta
+    puede no ver a todos los equipos).
+    """
+    output = _check_outputs(output)
+    t0 = time.monotonic()
+    try:
+        # Caché de enriquecido junto al baseline, igual que en 'scan'
+        cache_path = None if no_cache else (cache_file or baseline_file.with_name(enrich_cache.DEFAULT_CACHE_FILE.name))
+        enrich_cache.configure(cache_path)
+
+        from .passive import passive_inventory
+        replay: dict = {}
+        if pcap:
+            print(f"Analizando {pcap} (modo pasivo)...")
+        else:
+            print(f"Escuchando tráfico durante {seconds} segundos (modo pasivo)...")
+        devices = passive_inventory(iface=iface, duration_sec=seconds, pcap=pcap, stats=replay)
+        summary = {"iface": iface or "", "cidr": "", "mode": "passive", "duration_sec": seconds}
+        if pcap:
+            _print_replay(replay)
+            summary.update({"duration_sec": None, "pcap": str(pcap), "replay": replay})
+        summary["elapsed_s"] = round(time.monotonic() - t0, 3)
+        _report_inventory(devices, summary, "WiFi Guardian - Inventario pasivo",
+                          report_dir, baseline_file, aliases_file, update_baseline=update_baseline,
+                          mode="passive", output=output, no_html=no_html, textfile_dir=textfile_dir,
+                          inline_assets=inline_assets)
     except Exception as e:
         print(f"[red]Error:[/red] {e}")
 
+def _check_engine(engine: str) -> str:
+    """Valida --engine antes de empezar (un valor desconocido no debe acabar en scapy sin avisar)."""
+    from .scan import ENGINES
+    if engine not in ENGINES:
+        print(f"[red]Error:[/red] motor ARP desconocido: {engine} (válidos: {', '.join(ENGINES)})")
+        raise typer.Exit(1)
+    return engine
+
+@app.command("watch")
+def watch(
+    cidr: List[str] = typer.Option(None, help="CIDR de la subred. Repetible para varias VLAN"),
+    iface: List[str] = typer.Option(None, help="Interfaz a usar. Repetible, en el mismo orden que --cidr"),
+    all_ifaces: bool = typer.Option(False, help="Vigilar todas las interfaces IPv4 válidas"),
+    interval: int = typer.Option(60, help="Segundos entre comprobaciones de vida de los dispositivos conocidos"),
+    full_every: int = typer.Option(900, help="Segundos entre barridos completos (actualizan el baseline)"),
+    baseline_file: Path = typer.Option(Path(".wg_baseline.json"), help="Archivo de baseline"),
+    aliases_file: Path = typer.Option(Path("device_alias.json"), help="Archivo de alias amigables (IP/MAC→nombre)"),
+    cache_file: Path = typer.Option(None, help="Caché de hostnames/fabricantes (por defecto: .wg_cache.json junto al baseline)"),
+    engine: str = typer.Option("auto", help="Motor ARP L2: auto | scapy | raw"),
+    jsonl: bool = typer.Option(False, help="Emitir los eventos como JSON lines por stdout"),
+    iterations: int = typer.Option(0, help="Nº de ciclos y salir (0 = sin límite)"),
+    history_file: Path = typer.Option(None, help="Añadir cada barrido completo al histórico SQLite")
+):
+    """
+    Vigilancia continua en un único proceso (scapy, índice OUI y cachés calientes).
+    Barrido completo cada --full-every s y, entre medias, comprobación barata de
+    los dispositivos conocidos. Solo emite eventos de alta/baja/cambio de IP.
+    """
+    engine = _check_engine(engine)
+    enrich_cache.configure(cache_file or baseline_file.with_name(enrich_cache.DEFAULT_CACHE_FILE.name))
+    try:
+        segments = plan_segments(cidr, iface, all_ifaces)
+    except Exception as e:
+        print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(1)
+
+    def emit(ev: dict) -> None:
+        if jsonl:
+            typer.echo(json.dumps(ev, ensure_ascii=False))
+            return
+        color = {"join": "green", "leave": "yellow", "moved": "cyan"}.get(ev["event"], "white")
+        name = ev["alias"] or ev["hostname"]
+        moved = f" (antes {ev['old_ip']})" if ev.get("old_ip") else ""
+        print(f"[{color}]{ev['ts']} {ev['event'].upper():5}[/{color}] {ev['ip']}{moved} {ev['mac']} {name} [dim]({ev['mode']})[/dim]")
+
+    if not jsonl:
+        for seg_iface, seg_cidr in segments:
+            print(f"[bold]Vigilando[/bold] {seg_iface} {seg_cidr} (vida cada {interval}s, barrido cada {full_every}s)")
+    from .daemon import watch_loop
+    try:
+        watch_loop(segments, baseline_file, aliases_file, emit, interval=interval,
+                   full_every=full_every, engine=engine, iterations=iterations, history_file=history_file)
+    except KeyboardInterrupt:
+        pass
+
 @app.command("watch-arp")
 def watch_arp(
-    seconds: int = typer.Option(120, help="Duración de la escucha en segundos"),
-    report_dir: Path = typer.Option(Path("reports"), help="Directorio de informes")
+    seconds: int = typer.Option(120, help="Duración de la escucha en segundos (0 = sin límite, hasta Ctrl+C)"),
+    iface: str = typer.Option(None, help="Interfaz donde escuchar (por defecto todas / la de scapy)"),
+    report_dir: Path = typer.Option(Path("reports"), help="Directorio de informes"),
+    jsonl: bool = typer.Option(False, help="Emitir las alertas como JSON lines por stdout"),
+    sink: List[str] = typer.Option(None, help="Destino extra de alertas: fichero, unix:/ruta, tcp:host:puerto o udp:host:puerto. Repetible"),
+    baseline_file: Path = typer.Option(Path(".wg_baseline.json"), help="Baseline del escaneo (IP→MAC esperadas) para puntuar los cambios"),
+    threshold: int = typer.Option(50, help="Puntuación mínima (0-100) para alertar de un cambio IP→MAC"),
+    pcap: Path = typer.Option(None, help="Analizar un fichero pcap/pcapng (a toda velocidad) en lugar de escuchar en vivo"),
+    output: List[str] = typer.Option(None, help="Salida adicional legible por máquina: jsonl | csv | prom. Repetible"),
+    no_html: bool = typer.Option(False, help="No generar el informe HTML (p. ej. en ejecuciones frecuentes)"),
+    inline_assets: bool = typer.Option(False, help="Incrustar CSS/JS también en informes paginados (por defecto solo hasta 2000 filas; si no, van a <report-dir>/assets/)"),
+    textfile_dir: Path = typer.Option(None, help="Directorio del textfile collector de node-exporter para 'prom' (por defecto --report-dir)")
 ):
     """
-    Escucha ARP durante 'seconds' y registra cambios sospechosos IP→MAC.
+    Escucha ARP y avisa al instante de cambios sospechosos IP→MAC.
+    Al terminar (o con Ctrl+C) genera el informe con las alertas de la sesión.
     Sin Npcap en Windows, se generará una nota informativa en el informe.
     """
-    print(f"Escuchando ARP durante {seconds} segundos...")
-    anomalies = monitor_arp_spoof(duration_sec=seconds)
-    summary = {"duration_sec": seconds, "arp_anomalies": len(anomalies)}
-    out = write_reports(report_dir, "WiFi Guardian - Monitor ARP", summary, [], anomalies)
-    print(f"[green]Informe generado:[/green] {out}")
+    import signal
+    import threading
+    from .events import Fanout, StreamSink, open_sink
+
+    output = _check_outputs(output)
+    t0 = time.monotonic()
+    try:
+        sinks = [open_sink(spec) for spec in (sink or [])]
+    except ValueError as e:
+        print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(1)
+    if jsonl:
+        sinks.append(StreamSink())
+    fanout = Fanout(sinks)
+
+    def on_event(ev: dict) -> None:
+        fanout(ev)
+        if not jsonl:
+            print(f"[red]{ev['ts']} ARP[/red] {ev['ip']} {ev['old_mac']} → {ev['new_mac']} score {ev['score']} "
+                  f"[dim]({ev['kind']}, {ev['packets']} paquetes; {', '.join(ev['reasons'])})[/dim]")
+
+    stop = threading.Event()
+    previous = signal.signal(signal.SIGINT, lambda *_: stop.set())
+    if not jsonl:
+        if pcap:
+            print(f"Analizando ARP en {pcap}...")
+        else:
+            span = "sin límite (Ctrl+C para terminar)" if seconds <= 0 else f"durante {seconds} segundos"
+            print(f"Escuchando ARP {span}...")
+    expected = {d["ip"]: d["mac"] for d in load_baseline(baseline_file).get("devices", []) if d.get("ip") and d.get("mac")}
+    counters: dict = {}
+    try:
+        anomalies = monitor_arp_spoof(duration_sec=seconds if seconds > 0 else None, iface=iface,
+                                      stats=counters, on_event=on_event, stop=stop,
+                                      baseline=expected, threshold=threshold, pcap=pcap)
+    except (FileNotFoundError, PcapError) as e:
+        print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(1)
+    finally:
+        signal.signal(signal.SIGINT, previous)
+        fanout.close()
+    if pcap and not jsonl:
+        _print_replay(counters)
+    elif counters and not jsonl:
+        print(f"[dim]Tramas procesadas: {counters.get('frames', 0)} · ARP: {counters.get('arp', 0)} · "
+              f"descartadas por el kernel: {counters.get('kernel_drops', 0)} · "
+              f"cambios de MAC: {counters.get('mac_changes', 0)} (alertas: {counters.get('alerts', 0)})[/dim]")
+    summary = {"duration_sec": None if pcap else seconds, "iface": iface or "", "pcap": str(pcap or ""),
+               "arp_anomalies": counters.get("alerts", len(anomalies)), "counters": counters,
+               "elapsed_s": round(time.monotonic() - t0, 3)}
+    _write_reports(report_dir, "WiFi Guardian - Monitor ARP", "arp", summary, [], anomalies,
+                   output, no_html, textfile_dir, quiet=jsonl, inline_assets=inline_assets)
 
 @app.command("deauth")
 def deauth_cmd(
-    iface: str = typer.Option(..., help="Interfaz en modo monitor (Linux)"),
-    minutes: int = typer.Option(5, help="Minutos de captura"),
-    report_dir: Path = typer.Option(Path("reports"), help="Directorio de informes")
+    iface: str = typer.Option(None, help="Interfaz en modo monitor (Linux)"),
+    minutes: float = typer.Option(5, help="Minutos de captura (0 = sin límite, hasta Ctrl+C)"),
+    report_dir: Path = typer.Option(Path("reports"), help="Directorio de informes"),
+    threshold: int = typer.Option(10, help="Tramas deauth/disassoc por segundo de un mismo emisor/BSSID para alertar"),
+    jsonl: bool = typer.Option(False, help="Emitir las alertas como JSON lines por stdout"),
+    sink: List[str] = typer.Option(None, help="Destino extra de alertas: fichero, unix:/ruta, tcp:host:puerto o udp:host:puerto. Repetible"),
+    pcap: Path = typer.Option(None, help="Analizar un fichero pcap/pcapng (a toda velocidad) en lugar de escuchar en vivo"),
+    output: List[str] = typer.Option(None, help="Salida adicional legible por máquina: jsonl | csv | prom. Repetible"),
+    no_html: bool = typer.Option(False, help="No generar el informe HTML (p. ej. en ejecuciones frecuentes)"),
+    inline_assets: bool = typer.Option(False, help="Incrustar CSS/JS también en informes paginados (por defecto solo hasta 2000 filas; si no, van a <report-dir>/assets/)"),
+    textfile_dir: Path = typer.Option(None, help="Directorio del textfile collector de node-exporter para 'prom' (por defecto --report-dir)")
 ):
     """
-    Detecta tramas de desautenticación en redes Wi-Fi.
+    Detecta ráfagas de desautenticación/desasociación en redes Wi-Fi.
     Requiere Linux + interfaz en modo monitor (ej.: wlan0mon).
+    El informe incluye la serie por segundo y los principales emisor/BSSID/destino.
+    Con --pcap analiza una captura radiotap/802.11 en lugar de la interfaz.
     """
-    notes = detect_deauth(iface=iface, minutes=minutes)
-    anomalies = [n for n in notes if "0" not in n]
-    summary = {"iface": iface, "minutes": minutes, "notes": notes}
-    out = write_reports(report_dir, "WiFi Guardian - Detector Deauth", summary, [], anomalies)
-    print(f"[green]Informe generado:[/green] {out}")
+    from .events import Fanout, StreamSink, open_sink
+    output = _check_outputs(output)
+    t0 = time.monotonic()
+    if not iface and not pcap:
+        print("[red]Error:[/red] indica --iface (modo monitor) o --pcap")
+        raise typer.Exit(1)
+    try:
+        sinks = [open_sink(spec) for spec in (sink or [])]
+    except ValueError as e:
+        print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(1)
+    if jsonl:
+        sinks.append(StreamSink())
+    fanout = Fanout(sinks)
+
+    def on_event(ev: dict) -> None:
+        fanout(ev)
+        if not jsonl:
+            dest = "broadcast" if ev["broadcast"] else ev["target"]
+            print(f"[red]{ev['ts']} {ev['kind'].upper()}[/red] {ev['transmitter']} (BSSID {ev['bssid']}) → {dest}")
+
+    stats: dict = {}
+    try:
+        notes = detect_deauth(iface=iface, minutes=minutes, stats=stats, threshold=threshold,
+                              on_event=on_event, pcap=pcap)
+    except KeyboardInterrupt:
+        notes = ["Captura interrumpida."]
+    except PcapError as e:
+        print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(1)
+    except OSError as e:
+        print(f"[red]Error:[/red] no se pudo capturar en {pcap or iface}: {e}")
+        raise typer.Exit(1)
+    finally:
+        fanout.close()
+    anomalies = stats.get("alerts", [])
+    if pcap and not jsonl:
+        _print_replay(stats.get("counters", {}))
+    summary = {"iface": iface or "", "minutes": None if pcap else minutes, "pcap": str(pcap or ""),
+               "threshold_per_s": threshold, "notes": notes,
+               "counters": stats.get("counters", {}), "top": stats.get("top", []),
+               "time_series": stats.get("time_series", []), "elapsed_s": round(time.monotonic() - t0, 3)}
+    _write_reports(report_dir, "WiFi Guardian - Detector Deauth", "deauth", summary, [], anomalies,
+                   output, no_html, textfile_dir, quiet=jsonl, inline_assets=inline_assets)
 
 @app.command("vendors-update")
-def vendors_update():
+def vendors_update(
+    cache_file: Path = typer.Option(enrich_cache.DEFAULT_CACHE_FILE, help="Caché de enriquecido cuyos negativos de fabricante se olvidan")
+):
     """
     Actualiza la base de fabricantes (OUI) usada para anotar vendor:<nombre> en los informes.
     No realiza escaneo; solo actualiza la DB local.
@@ -135,11 +505,159 @@ def vendors_update():
         from .vendor import update_local_db
         ok = update_local_db()
         if ok:
+            c = enrich_cache.configure(cache_file)
+            c.clear_negative_vendors()
+            c.save()
             print("[green]Base OUI actualizada correctamente.[/green]")
         else:
             print("[red]No se pudo actualizar la base OUI (se usará la caché local si existe).[/red]")
     except Exception as e:
         print(f"[red]Error actualizando OUI:[/red] {e}")
 
+history_app = typer.Typer(help="Consultas sobre el histórico de escaneos (SQLite)")
+app.add_typer(history_app, name="history")
+
+def _open_history(history_file: Path):
+    from .history import HistoryStore
+    if not history_file.exists():
+        print(f"[red]Error:[/red] no existe el histórico {history_file}")
+        raise typer.Exit(1)
+    return HistoryStore(history_file)
+
+@history_app.command("scans")
+def history_scans(
+    history_file: Path = typer.Option(Path(".wg_history.db"), help="Histórico SQLite"),
+    limit: int = typer.Option(20, help="Nº de escaneos a mostrar")
+):
+    """Lista los últimos escaneos registrados."""
+    with _open_history(history_file) as h:
+        for sc in h.scans(limit):
+            print(f"#{sc['id']:<6} {sc['ts']}  {sc['total']:>5} dispositivos  [dim]{sc['source']} {sc['segments']}[/dim]")
+
+@history_app.command("device")
+def history_device(
+    mac: str = typer.Option("", help="MAC del dispositivo"),
+    ip: str = typer.Option("", help="IP (actual o que haya tenido)"),
+    history_file: Path = typer.Option(Path(".wg_history.db"), help="Histórico SQLite"),
+    days: float = typer.Option(0, help="Calcular el uptime solo sobre los últimos N días (0 = todo)")
+):
+    """Ficha de un dispositivo: primera/última vez visto, uptime y cambios."""
+    if not mac and not ip:
+        print("[red]Error:[/red] indica --mac o --ip")
+        raise typer.Exit(1)
+    since = time.time() - days * 86400 if days > 0 else None
+    with _open_history(history_file) as h:
+        found = h.find(mac=mac, ip=ip)
+        if not found:
+            print("[yellow]Sin registros para ese dispositivo.[/yellow]")
+            return
+        for d in found:
+            if since is not None:
+                d["uptime"] = round(h.uptime(d["id"], since=since), 4)
+            state = "[green]presente[/green]" if d["present"] else "[yellow]ausente[/yellow]"
+            print(f"[bold]{d['mac'] or '-'}[/bold] {d['ip']} {d['alias'] or d['hostname']} · {state}")
+            print(f"  primera vez: {d['first_seen']} · última vez: {d['last_seen']} · "
+                  f"uptime: {d['uptime'] * 100:.1f}% · intervalos: {d['intervals']}")
+            for c in d["changes"]:
+                print(f"  [dim]{c['ts']} {c['field']}: {c['old'] or '-'} → {c['new'] or '-'}[/dim]")
+
+@history_app.command("diff")
+def history_diff(
+    scan_a: int = typer.Argument(..., help="Escaneo de referencia"),
+    scan_b: int = typer.Argument(None, help="Escaneo a comparar (por defecto el último)"),
+    history_file: Path = typer.Option(Path(".wg_history.db"), help="Histórico SQLite")
+):
+    """Altas y bajas entre dos escaneos cualesquiera."""
+    with _open_history(history_file) as h:
+        b = scan_b or h.last_scan_id() or 0
+        added, removed = h.diff(scan_a, b)
+        print(f"[bold]#{scan_a} → #{b}[/bold]: {len(added)} nuevos, {len(removed)} ausentes")
+        for d in added:
+            print(f"  [green]+[/green] {d['ip']} {d['mac']} {d['alias'] or d['hostname']}")
+        for d in removed:
+            print(f"  [yellow]-[/yellow] {d['ip']} {d['mac']} {d['alias'] or d['hostname']}")
+
+baseline_app = typer.Typer(help="Utilidades del baseline (JSON / binario compacto .wgb)")
+app.add_typer(baseline_app, name="baseline")
+
+@baseline_app.command("convert")
+def baseline_convert(
+    src: Path = typer.Argument(..., help="Baseline de origen (.json o .wgb)"),
+    dst: Path = typer.Argument(..., help="Baseline de destino (.json o .wgb)")
+):
+    """Convierte un baseline entre JSON y el formato binario compacto (según la extensión)."""
+    from .baseline import convert_baseline
+    try:
+        n = convert_baseline(src, dst)
+    except (OSError, ValueError) as e:
+        print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(1)
+    print(f"[green]Baseline convertido:[/green] {src} → {dst} ({n} dispositivos, {dst.stat().st_size // 1024} KB)")
+
+bench_app = typer.Typer(help="Banco de pruebas reproducible con LAN simulada (sin red ni privilegios)")
+app.add_typer(bench_app, name="bench")
+
+@bench_app.command("run")
+def bench_run(
+    stage: List[str] = typer.Option(None, help="Etapa a medir (repetible; por defecto todas): finalize, diff, baseline.json, baseline.wgb, report, arpmon, deauth, passive, scan"),
+    size: List[int] = typer.Option(None, help="Nº de dispositivos / tramas (repetible; por defecto 1000, 10000 y 100000)"),
+    repeat: int = typer.Option(3, help="Repeticiones por etapa y tamaño (se usa la mediana)"),
+    budget_s: float = typer.Option(30.0, help="Tiempo máximo por etapa y tamaño antes de dejar de repetir"),
+    seed: int = typer.Option(0, help="Semilla de los datos sintéticos"),
+    latency_ms: float = typer.Option(1.0, help="Latencia simulada de DNS inversa y de cada getent/avahi (ms)"),
+    named_pct: float = typer.Option(70, help="Porcentaje de IPs que resuelven nombre por DNS"),
+    sweep_s: float = typer.Option(1.0, help="Duración del barrido ARP simulado en 'scan' (s)"),
+    out: Path = typer.Option(None, help="Fichero JSON de resultados (por defecto reports/bench-<fecha>.json)")
+):
+    """
+    Mide cada etapa con datos sintéticos y sustitutos de la LAN (motor ARP, DNS y
+    subprocesos falsos) y guarda los resultados en JSON para compararlos entre commits.
+    """
+    from .bench import run_bench, STAGES, DEFAULT_SIZES
+    import datetime
+
+    def show(r: dict) -> None:
+        print(f"[dim]{r['stage']:<14} n={r['n']:<7} mediana {r['median_s']:.4f} s  "
+              f"mejor {r['best_s']:.4f} s  ({r['items_per_s']} /s)[/dim]")
+
+    try:
+        result = run_bench(stage or STAGES, size or DEFAULT_SIZES, repeat=repeat, budget_s=budget_s, seed=seed,
+                           latency_ms=latency_ms, named_pct=named_pct, sweep_s=sweep_s, on_result=show)
+    except ValueError as e:
+        print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(1)
+    out = out or Path("reports") / f"bench-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"[green]Resultados:[/green] {out} (commit {result['meta']['commit'] or '?'})")
+
+@bench_app.command("compare")
+def bench_compare(
+    old: Path = typer.Argument(..., help="Resultados de referencia (JSON de 'bench run')"),
+    new: Path = typer.Argument(..., help="Resultados nuevos"),
+    threshold: float = typer.Option(0.10, help="Margen antes de contar como regresión (0.10 = 10 % más lento)")
+):
+    """Compara dos resultados por etapa y tamaño (mediana); sale con código 1 si hay regresiones."""
+    from rich.table import Table
+    from .bench import compare
+    try:
+        a = json.loads(old.read_text(encoding="utf-8"))
+        b = json.loads(new.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(1)
+    rows = compare(a, b, threshold)
+    table = Table(title=f"{a['meta'].get('commit') or old.name} → {b['meta'].get('commit') or new.name}", title_justify="left")
+    for col in ("Etapa", "N", "Antes (s)", "Ahora (s)", "Ratio"):
+        table.add_column(col, justify="left" if col == "Etapa" else "right")
+    for r in rows:
+        color = "red" if r["regression"] else ("green" if r["ratio"] < 1 - threshold else "white")
+        table.add_row(r["stage"], str(r["n"]), f"{r['old_s']:.4f}", f"{r['new_s']:.4f}", f"[{color}]{r['ratio']:.3f}[/{color}]")
+    print(table)
+    slower = [r for r in rows if r["regression"]]
+    if slower:
+        print(f"[red]{len(slower)} regresiones (> {threshold:.0%} más lento)[/red]")
+        raise typer.Exit(1)
+
 if __name__ == "__main__":
     app()
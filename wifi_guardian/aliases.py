@@ -12,6 +12,8 @@ from typing import Dict, Any, List
 from pathlib import Path
 import json
 
+from .device import Device
+
 def _norm_mac(mac: str) -> str:
     return (mac or "").strip().lower().replace("-", ":") if mac else ""
 
@@ -29,22 +31,28 @@ def load_aliases(path: Path) -> Dict[str, Dict[str, Dict[str, str]]]:
 
 def apply_aliases(devs: List[Dict[str, Any]], aliases: Dict[str, Dict[str, Dict[str, str]]]) -> int:
     """
-    Aplica alias a la lista de dispositivos.
-    Añade la clave 'alias' al dispositivo. Devuelve nº de alias aplicados.
+    Aplica alias a la lista de dispositivos (Device o dicts).
+    Rellena 'alias' (en dicts, además añade "alias:custom" a 'note'). Devuelve nº de alias aplicados.
     Prioridad: MAC > IP.
     """
     applied = 0
     by_mac = aliases.get("by_mac", {})
     by_ip  = aliases.get("by_ip", {})
     for d in devs:
-        mac = _norm_mac(d.get("mac", ""))
-        ip  = d.get("ip", "")
+        if isinstance(d, Device):
+            mac, ip = d.mac, d.ip
+        else:
+            mac = _norm_mac(d.get("mac", ""))
+            ip  = d.get("ip", "")
         ali = None
         if mac and mac in by_mac and by_mac[mac].get("alias"):
             ali = by_mac[mac]["alias"]
         elif ip in by_ip and by_ip[ip].get("alias"):
             ali = by_ip[ip]["alias"]
-        if ali:
+        if ali and isinstance(d, Device):
+            d.alias = ali  # 'note' ya incluye alias:custom al tener alias
+            applied += 1
+        elif ali:
             d["alias"] = ali
             note = d.get("note") or ""
             d["note"] = (note + (", " if note else "") + "alias:custom")
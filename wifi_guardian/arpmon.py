@@ -0,0 +1,355 @@
+"""
+Monitor de ARP spoofing de alto ritmo.
+
+- Captura por lotes (capture.LiveCapture) con BPF en kernel: solo ARP replies
+  y ARP gratuitos llegan a Python.
+- Decodificación directa desde bytes (sin disección de capas scapy); IPs y MACs
+  se comparan como bytes y solo se formatean al generar una alerta.
+- Contadores de tramas procesadas, ARP válidos, replies, gratuitos y
+  descartes del kernel para saber si el monitor da abasto.
+- Estado acotado (LRU + TTL) y puntuación por ritmo/cambios/baseline para
+  no alertar del churn DHCP ni de failovers legítimos.
+- Eventos en streaming: cada cambio IP→MAC se entrega al instante a 'on_event'
+  (ver events.py para stdout/socket/fichero); duración ilimitada con duration=None.
+"""
+
+from __future__ import annotations
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from collections import OrderedDict, deque
+from pathlib import Path
+import datetime
+import socket
+import threading
+
+from .capture import LiveCapture, PcapReplay, BPF_ARP_MONITOR, BPF_ARP_MONITOR_TEXT, DLT_EN10MB, Batch
+
+_ARP_FIXED = b"\x00\x01\x08\x00\x06\x04"  # Ethernet / IPv4 / hlen 6 / plen 4
+_VLAN_TYPES = (b"\x81\x00", b"\x88\xa8")
+
+
+def decode_arp(frame: bytes) -> Optional[Tuple[int, bytes, bytes, bytes, bytes]]:
+    """
+    Decodifica una trama Ethernet (con o sin 802.1Q) que lleve ARP IPv4.
+    Devuelve (op, sha, spa, tha, tpa) en bytes o None si no es ARP.
+    """
+    off = 12
+    while frame[off:off + 2] in _VLAN_TYPES:
+        off += 4
+    if frame[off:off + 2] != b"\x08\x06":
+        return None
+    a = off + 2
+    if len(frame) < a + 28 or frame[a:a + 6] != _ARP_FIXED:
+        return None
+    op = (frame[a + 6] << 8) | frame[a + 7]
+    return op, frame[a + 8:a + 14], frame[a + 14:a + 18], frame[a + 18:a + 24], frame[a + 24:a + 28]
+
+
+def fmt_mac(b: bytes) -> str:
+    return b.hex(":")
+
+
+def fmt_ip(b: bytes) -> str:
+    return socket.inet_ntoa(b)
+
+
+def fmt_ts(ts: float) -> str:
+    return datetime.datetime.fromtimestamp(ts).isoformat(timespec="milliseconds")
+
+
+class RateWindow:
+    """Contador de ventana deslizante con cubos de 1 s: memoria acotada por 'window'."""
+
+    __slots__ = ("window", "buckets", "total")
+
+    def __init__(self, window: float):
+        self.window = window
+        self.buckets: Deque[List[int]] = deque()
+        self.total = 0
+
+    def add(self, ts: float, n: int = 1) -> int:
+        sec = int(ts)
+        if self.buckets and self.buckets[-1][0] == sec:
+            self.buckets[-1][1] += n
+        else:
+            self.buckets.append([sec, n])
+        self.total += n
+        return self.count(ts)
+
+    def count(self, ts: float) -> int:
+        limit = int(ts) - self.window
+        buckets = self.buckets
+        while buckets and buckets[0][0] <= limit:
+            self.total -= buckets.popleft()[1]
+        return self.total
+
+
+class _Binding:
+    """
+    Estado de un par (IP, MAC) observado. Ritmos de replies/gratuitos con
+    contador deslizante de dos cubos (actual + anterior ponderado): O(1) en memoria.
+    """
+
+    __slots__ = ("first_seen", "last_seen", "packets", "win", "replies", "prev_replies", "gratuitous", "prev_gratuitous")
+
+    def __init__(self, ts: float):
+        self.first_seen = ts
+        self.last_seen = ts
+        self.packets = 0
+        self.win = 0
+        self.replies = self.prev_replies = 0
+        self.gratuitous = self.prev_gratuitous = 0
+
+    def rates(self, ts: float, burst_window: float) -> Tuple[int, int]:
+        """(replies, gratuitos) estimados en los últimos 'burst_window' s."""
+        pos = ts / burst_window
+        win = int(pos)
+        if win == self.win:
+            keep = 1.0 - (pos - win)
+            return int(self.replies + self.prev_replies * keep), int(self.gratuitous + self.prev_gratuitous * keep)
+        if win == self.win + 1:
+            keep = 1.0 - (pos - win)
+            return int(self.replies * keep), int(self.gratuitous * keep)
+        return 0, 0
+
+
+class _IpState:
+    """Estado por IP: MAC vigente, cambios recientes y última alerta."""
+
+    __slots__ = ("mac", "last_seen", "packets", "flips", "last_alert", "last_score")
+
+    def __init__(self, mac: bytes, ts: float):
+        self.mac = mac
+        self.last_seen = ts
+        self.packets = 0
+        self.flips: Optional[RateWindow] = None  # solo IPs que han cambiado de MAC
+        self.last_alert = 0.0
+        self.last_score = 0
+
+
+class ArpSpoofDetector:
+    """
+    Estado IP→MAC con memoria acotada y puntuación de cada cambio de MAC.
+
+    - Tablas LRU con TTL por IP y por par (IP, MAC): como mucho 'max_entries'
+      cada una; lo no visto en 'ttl' segundos se olvida.
+    - Contadores de ventana deslizante por par: replies y ARP gratuitos en
+      'burst_window' s, y cambios de MAC por IP en 'window' s.
+    - Puntuación 0-100 de cada cambio: frecuencia de cambios, ráfagas de
+      gratuitos, ritmo de replies, MAC anterior aún activa o ya caducada y
+      concordancia con el baseline del escaneo (contradecirlo basta para
+      alertar). Solo se alerta con
+      score >= 'threshold' (el churn DHCP o un failover aislado no llegan).
+    - on_event: callback con el evento estructurado, en cuanto se detecta.
+    - max_anomalies: tope de mensajes guardados para el informe final.
+    """
+
+    def __init__(
+        self,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+        max_anomalies: int = 1000,
+        baseline: Optional[Dict[str, str]] = None,
+        threshold: int = 50,
+        max_entries: int = 50000,
+        ttl: float = 3600,
+        window: float = 300,
+        burst_window: float = 10,
+        gratuitous_burst: int = 5,
+        reply_burst: int = 10,
+        stale_after: float = 120,
+        cooldown: float = 30,
+    ) -> None:
+        self.ips: "OrderedDict[bytes, _IpState]" = OrderedDict()
+        self.bindings: "OrderedDict[Tuple[bytes, bytes], _Binding]" = OrderedDict()
+        self.anomalies: List[str] = []
+        self.on_event = on_event
+        self.max_anomalies = max_anomalies
+        self.baseline: Dict[bytes, bytes] = {}
+        for ip, mac in (baseline or {}).items():
+            try:
+                self.baseline[socket.inet_aton(ip)] = bytes.fromhex(mac.replace(":", "").replace("-", ""))
+            except (OSError, ValueError):
+                continue
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.window = window
+        self.burst_window = burst_window
+        self.gratuitous_burst = gratuitous_burst
+        self.reply_burst = reply_burst
+        self.stale_after = stale_after
+        self.cooldown = cooldown
+        self.counters: Dict[str, int] = {
+            "frames": 0, "arp": 0, "replies": 0, "gratuitous": 0, "ignored": 0,
+            "mac_changes": 0, "alerts": 0, "suppressed": 0, "evicted": 0,
+        }
+
+    def process_batch(self, batch: Batch) -> None:
+        """Procesa un lote de (ts, trama). Bucle en línea: es la ruta caliente."""
+        c = self.counters
+        ips = self.ips
+        bindings = self.bindings
+        bw = self.burst_window
+        c["frames"] += len(batch)
+        ts = 0.0
+        for ts, frame in batch:
+            parsed = decode_arp(frame)
+            if parsed is None:
+                c["ignored"] += 1
+                continue
+            op, sha, spa, _, tpa = parsed
+            c["arp"] += 1
+            if op == 2:
+                c["replies"] += 1
+            elif op == 1 and spa == tpa:
+                c["gratuitous"] += 1
+            else:
+                c["ignored"] += 1
+                continue
+            if spa == b"\x00\x00\x00\x00":
+                continue  # ARP probe (RFC 5227): sin IP que defender
+
+            key = (spa, sha)
+            b = bindings.get(key)
+            if b is None:
+                b = bindings[key] = _Binding(ts)
+            else:
+                bindings.move_to_end(key)
+            b.last_seen = ts
+            b.packets += 1
+            win = int(ts / bw)
+            if win != b.win:
+                if win == b.win + 1:
+                    b.prev_replies, b.prev_gratuitous = b.replies, b.gratuitous
+                else:
+                    b.prev_replies = b.prev_gratuitous = 0
+                b.replies = b.gratuitous = 0
+                b.win = win
+            if op == 2:
+                b.replies += 1
+            else:
+                b.gratuitous += 1
+
+            st = ips.get(spa)
+            if st is None:
+                ips[spa] = st = _IpState(sha, ts)
+            else:
+                ips.move_to_end(spa)
+            st.packets += 1
+            st.last_seen = ts
+            if st.mac != sha:
+                c["mac_changes"] += 1
+                self._score_change(ts, op, spa, st, st.mac, sha, b)
+                st.mac = sha
+        if batch:
+            self._evict(ts)
+
+    def _score_change(
+        self, ts: float, op: int, ip: bytes, st: _IpState, old: bytes, new: bytes, b: _Binding
+    ) -> None:
+        reasons: List[str] = []
+        if st.flips is None:
+            st.flips = RateWindow(self.window)
+        flips = st.flips.add(ts)
+        score = min(60, 30 * flips)
+        reasons.append(f"flips:{flips}")
+        known = self.baseline.get(ip)
+        mismatch = known is not None and new != known
+        old_b = self.bindings.get((ip, old))
+        if old_b is not None:
+            idle = ts - old_b.last_seen
+            if idle >= self.stale_after and not mismatch:
+                # IP reasignada (DHCP) o equipo sustituido. No si la MAC nueva contradice el
+                # baseline: en un envenenamiento persistente la legítima también calla
+                score -= 20
+                reasons.append("previous_stale")
+            elif idle <= self.burst_window:
+                score += 15
+                reasons.append("previous_active")  # dos MACs reclamando la IP a la vez
+        if known is None and flips == 1:
+            # Suelo del primer cambio sin baseline: solo no alerta (churn DHCP), pero no
+            # queda anulado por 'previous_stale' y cualquier ráfaga lo lleva al umbral
+            score = max(score, 30)
+        replies, gratuitous = b.rates(ts, self.burst_window)
+        if gratuitous >= self.gratuitous_burst:
+            score += 25
+            reasons.append(f"gratuitous_burst:{gratuitous}")
+        if replies >= self.reply_burst:
+            score += 20
+            reasons.append(f"reply_rate:{replies}")
+        if mismatch:
+            score = max(score + 30, self.threshold)  # contradecir el baseline alerta por sí solo
+            reasons.append("baseline_mismatch")
+        elif known is not None:
+            score -= 40
+            reasons.append("baseline_match")
+        score = max(0, min(100, score))
+
+        if score < self.threshold or (ts - st.last_alert < self.cooldown and score <= st.last_score):
+            self.counters["suppressed"] += 1
+            return
+        st.last_alert, st.last_score = ts, score
+        self.counters["alerts"] += 1
+        if len(self.anomalies) < self.max_anomalies:
+            self.anomalies.append(
+                f"ARP cambio sospechoso: {fmt_ip(ip)} -> {fmt_mac(old)} ahora {fmt_mac(new)} (score {score})"
+            )
+        if self.on_event is not None:
+            self.on_event({
+                "ts": fmt_ts(ts),
+                "event": "arp_mac_change",
+                "kind": "reply" if op == 2 else "gratuitous",
+                "ip": fmt_ip(ip),
+                "old_mac": fmt_mac(old),
+                "new_mac": fmt_mac(new),
+                "packets": st.packets,
+                "score": score,
+                "reasons": reasons,
+            })
+
+    def _evict(self, now: float) -> None:
+        """LRU + TTL: el orden de inserción es el de último uso, basta mirar el principio."""
+        limit = now - self.ttl
+        for table in (self.bindings, self.ips):
+            while table:
+                oldest = next(iter(table.values()))
+                if len(table) <= self.max_entries and oldest.last_seen >= limit:
+                    break
+                table.popitem(last=False)
+                self.counters["evicted"] += 1
+
+
+def monitor_arp(
+    duration_sec: Optional[float] = 60,
+    iface: Optional[str] = None,
+    stats: Optional[Dict[str, Any]] = None,
+    on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    stop: Optional[threading.Event] = None,
+    baseline: Optional[Dict[str, str]] = None,
+    threshold: int = 50,
+    pcap: Optional[Path] = None,
+) -> List[str]:
+    """
+    Escucha ARP durante 'duration_sec' (None = sin límite, hasta 'stop' o Ctrl+C)
+    y devuelve las alertas de cambio IP→MAC. Cada alerta se entrega además al
+    instante a 'on_event'. 'baseline' ({ip: mac} del último escaneo) y 'threshold'
+    ajustan la puntuación (ver ArpSpoofDetector). Si se pasa 'stats', recibe los contadores del detector
+    y de la captura (también si se interrumpe).
+    Con 'pcap' se relee ese fichero (Ethernet) a toda velocidad en lugar de
+    escuchar en vivo; 'duration_sec' e 'iface' se ignoran.
+    Lanza excepción si no se puede capturar (sin permisos / sin pcap).
+    """
+    detector = ArpSpoofDetector(on_event=on_event, baseline=baseline, threshold=threshold)
+    if pcap is not None:
+        capture: Any = PcapReplay(pcap, {DLT_EN10MB}, snaplen=128)
+        duration_sec = None
+    else:
+        capture = LiveCapture(iface, BPF_ARP_MONITOR, BPF_ARP_MONITOR_TEXT)
+    try:
+        with capture:
+            for batch in capture.batches(duration=duration_sec, stop=stop):
+                detector.process_batch(batch)
+    finally:
+        if stats is not None:
+            stats.update(detector.counters)
+            stats.update(capture.stats)
+    return detector.anomalies
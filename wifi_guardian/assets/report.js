@@ -0,0 +1,101 @@
+// WiFi Guardian: filtro, orden y paginación del inventario (se copia una vez a <report_dir>/assets/).
+// Los datos salen de <script id="wg-data"> (JSON compacto, inventarios grandes) o de las filas
+// ya presentes en la tabla. Solo se pinta la página visible: el DOM no crece con el inventario.
+(() => {
+  const PAGE = 200;
+  const tbl = document.getElementById('devtbl');
+  if (!tbl) return;
+  const tbody = tbl.tBodies[0];
+  const q = document.getElementById('q');
+  const pager = document.getElementById('pager');
+  const dataEl = document.getElementById('wg-data');
+
+  const esc = (s) => String(s || '').replace(/[&<>"']/g, c => ({'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',"'":'&#39;'}[c]));
+  const COPY = '<svg viewBox="0 0 24 24" width="14" height="14"><rect x="9" y="9" width="13" height="13" rx="2" fill="none" stroke="currentColor" stroke-width="2"/><rect x="2" y="2" width="13" height="13" rx="2" fill="none" stroke="currentColor" stroke-width="2"/></svg>';
+  const cell = (tr, sel) => (tr.querySelector(sel)?.textContent || '').trim();
+
+  // fila JSON: [ip, mac, hostname, alias, note, vendor, flags]  (flags: 1 = alias, 2 = MAC privada)
+  function makeRow(v) {
+    const [ip, mac, host, alias, note, vendor, flags] = v;
+    const chips = (flags & 1 ? '<span class="chip alias">alias</span>' : '')
+                + (flags & 2 ? '<span class="chip muted">MAC privada</span>' : '')
+                + (vendor ? `<span class="chip vendor">${esc(vendor)}</span>` : '');
+    const tr = document.createElement('tr');
+    tr.innerHTML =
+      `<td class="ip"><span class="mono">${esc(ip)}</span><button class="copy" data-copy="${esc(ip)}" title="Copiar IP">${COPY}</button></td>` +
+      `<td class="mac"><span class="mono">${esc(mac)}</span><button class="copy" data-copy="${esc(mac)}" title="Copiar MAC">${COPY}</button></td>` +
+      `<td class="host">${esc(host)}</td><td class="alias">${esc(alias)}</td><td class="note">${esc(note)} ${chips}</td>`;
+    return tr;
+  }
+
+  const items = dataEl
+    ? JSON.parse(dataEl.textContent).map(v => ({ v, tr: null }))
+    : Array.from(tbody.rows).map(tr => ({
+        v: [cell(tr, 'td.ip .mono'), cell(tr, 'td.mac .mono'), cell(tr, 'td.host'), cell(tr, 'td.alias'), cell(tr, 'td.note')],
+        tr,
+      }));
+  items.forEach(it => { it.s = it.v.slice(0, 6).join(' ').toLowerCase(); });
+
+  let view = items, page = 0;
+
+  function render() {
+    const pages = Math.max(1, Math.ceil(view.length / PAGE));
+    page = Math.min(Math.max(page, 0), pages - 1);
+    const frag = document.createDocumentFragment();
+    for (const it of view.slice(page * PAGE, (page + 1) * PAGE)) {
+      frag.appendChild(it.tr || (it.tr = makeRow(it.v)));
+    }
+    tbody.replaceChildren(frag);
+    if (!pager) return;
+    pager.hidden = view.length <= PAGE;
+    pager.querySelector('.info').textContent =
+      view.length ? `${page * PAGE + 1}–${Math.min(view.length, (page + 1) * PAGE)} de ${view.length}` : '0 de 0';
+    pager.querySelector('.prev').disabled = page === 0;
+    pager.querySelector('.next').disabled = page >= pages - 1;
+  }
+
+  function applyFilter() {
+    const term = (q?.value || '').toLowerCase();
+    view = term ? items.filter(it => it.s.includes(term)) : items;
+    page = 0;
+    render();
+  }
+
+  // filtro rápido (con pequeño retardo para no recalcular en cada tecla)
+  let timer = null;
+  q?.addEventListener('input', () => { clearTimeout(timer); timer = setTimeout(applyFilter, 120); });
+
+  // orden por columna (IP numérica; el resto alfabético)
+  const COLS = { ip: 0, mac: 1, host: 2, alias: 3, note: 4 };
+  const ipNum = (s) => s.split('.').reduce((n, o) => n * 256 + (+o || 0), 0);
+  let sortDir = 1, lastKey = null;
+  tbl.querySelectorAll('thead th').forEach(th => {
+    th.addEventListener('click', () => {
+      const k = th.getAttribute('data-k');
+      if (!(k in COLS)) return;
+      sortDir = k === lastKey ? -sortDir : 1;
+      lastKey = k;
+      const i = COLS[k];
+      const key = k === 'ip' ? (it => ipNum(it.v[0])) : (it => (it.v[i] || '').toLowerCase());
+      items.forEach(it => { it.k = key(it); });
+      items.sort((a, b) => (a.k < b.k ? -1 : a.k > b.k ? 1 : 0) * sortDir);
+      applyFilter();
+    });
+  });
+
+  pager?.querySelector('.prev').addEventListener('click', () => { page--; render(); });
+  pager?.querySelector('.next').addEventListener('click', () => { page++; render(); });
+
+  // copiar al portapapeles (delegado: sirve también para las filas creadas al paginar)
+  tbody.addEventListener('click', async (ev) => {
+    const btn = ev.target.closest('button.copy');
+    if (!btn) return;
+    try {
+      await navigator.clipboard.writeText(btn.getAttribute('data-copy'));
+      btn.style.color = '#00ff9c';
+      setTimeout(() => btn.style.color = '', 700);
+    } catch (e) { console.log('copy fail', e); }
+  });
+
+  render();
+})();
@@ -4,42 +4,486 @@ para comparar con las siguientes y detectar nuevos/desaparecidos.
 """
 
 from pathlib import Path
+from array import array
+import gc
+import itertools
 import json
-from typing import Dict, Any, List
+import operator
+import os
+import socket
+import struct
+import sys
+from typing import Dict, Any, List, Tuple
 
+from .device import Device, parse_note, to_json
+from .profiling import timed
+
+# Campos cuyo cambio (misma MAC y misma IP) se informa como metadata_changed
+META_FIELDS = ("hostname", "alias", "note")
+
+# Formato binario compacto (elegido por extensión): ver _dump_binary
+BINARY_SUFFIXES = (".wgb",)
+_MAGIC = b"WGB1"
+_HEAD = struct.Struct("<4sII")  # magic, nº dispositivos, longitud del bloque de cadenas
+_STR_FIELDS = ("hostname", "alias", "note")
+_HAS_IP, _HAS_MAC, _HAS_ALIAS = 1, 2, 4
+
+
+def is_binary(path: Path) -> bool:
+    return path.suffix.lower() in BINARY_SUFFIXES
+
+
+_OCTETS = [str(i) for i in range(256)]
+_first = operator.itemgetter(0)
+
+
+def _ips_from_column(ipb: bytes) -> List[str]:
+    """Columna de 4 B → IPs en texto; los /24 se repiten, así que se cachea 'a.b.c.'."""
+    heads: Dict[bytes, str] = {}
+    out: List[str] = []
+    append = out.append
+    for head, last in struct.iter_unpack("3sB", ipb):
+        text = heads.get(head)
+        if text is None:
+            text = heads[head] = socket.inet_ntoa(head + b"\0")[:-1]
+        append(text + _OCTETS[last])
+    return out
+
+
+def _macs_from_column(macb: bytes) -> List[str]:
+    n = len(macb) // 6
+    return list(map(bytes.hex, map(_first, struct.iter_unpack("6s", macb)), itertools.repeat(":", n)))
+
+
+def _macs_from_column_int(macb: bytes) -> List[int]:
+    """Columna de 6 B → enteros de 48 bits: se reparte en huecos de 8 B y se desempaqueta como uint64 (en C)."""
+    n = len(macb) // 6
+    wide = bytearray(8 * n)
+    for j in range(6):
+        wide[2 + j::8] = macb[j::6]
+    return list(struct.unpack(f">{n}Q", wide))
+
+
+def _macs_to_column(macs: List[int]) -> bytes:
+    """Inverso de _macs_from_column_int."""
+    wide = struct.pack(f">{len(macs)}Q", *macs)
+    out = bytearray(6 * len(macs))
+    for j in range(6):
+        out[j::6] = wide[2 + j::8]
+    return bytes(out)
+
+
+_PLAIN_KEYS = frozenset(("ip", "mac") + _STR_FIELDS)
+
+
+def _ip_column(ips: List[str], extras: Dict[int, Dict[str, Any]]) -> Tuple[bytes, List[bool]]:
+    """IPs como 4 bytes. Camino rápido con map (todas IPv4 canónicas); si no, registro a registro."""
+    n = len(ips)
+    try:
+        packed = b"".join(map(socket.inet_aton, ips))
+        if len(packed) == 4 * n and _ips_from_column(packed) == ips:
+            return packed, [True] * n
+    except OSError:
+        pass
+    out = bytearray(4 * n)
+    has = [False] * n
+    for k, ip in enumerate(ips):
+        if not ip:
+            continue
+        try:
+            raw = socket.inet_aton(ip)
+        except OSError:
+            raw = b""
+        if raw and socket.inet_ntoa(raw) == ip:
+            out[4 * k:4 * k + 4] = raw
+            has[k] = True
+        else:
+            extras.setdefault(k, {})["ip"] = ip  # no IPv4 canónica: se guarda tal cual
+    return bytes(out), has
+
+
+def _mac_column(macs: List[str], extras: Dict[int, Dict[str, Any]]) -> Tuple[bytes, List[bool]]:
+    """MACs como 6 bytes. Camino rápido (todas aa:bb:cc:dd:ee:ff en minúsculas); si no, registro a registro."""
+    n = len(macs)
+    try:
+        packed = bytes.fromhex("".join(macs).replace(":", ""))
+        if len(packed) == 6 * n and _macs_from_column(packed) == macs:
+            return packed, [True] * n
+    except ValueError:
+        pass
+    out = bytearray(6 * n)
+    has = [False] * n
+    for k, mac in enumerate(macs):
+        if not mac:
+            continue
+        try:
+            raw = bytes.fromhex(mac.replace(":", ""))
+        except ValueError:
+            raw = b""
+        if len(raw) == 6 and raw.hex(":") == mac:
+            out[6 * k:6 * k + 6] = raw
+            has[k] = True
+        else:
+            extras.setdefault(k, {})["mac"] = mac
+    return bytes(out), has
+
+
+def _index_column(values: List[str], strings: Dict[str, int]) -> array:
+    """Interna 'values' en 'strings' (cadena → índice) y devuelve la columna de índices."""
+    for v in dict.fromkeys(values):
+        if v not in strings:
+            strings[v] = len(strings)
+    return array("I", map(strings.__getitem__, values))
+
+
+def _device_columns(devices: List[Device]) -> Tuple[bytes, List[bool], bytes, List[bool], List[str], List[str], List[str]]:
+    """
+    Columnas directamente de los slots de Device: IP y MAC ya son enteros (sin pasar
+    por texto) y 'note' se compone una vez por combinación distinta de tags/vendor/alias.
+    """
+    n = len(devices)
+    ipb = struct.pack(f">{n}I", *[d.ip_int for d in devices])
+    mac_ints = [d.mac_int for d in devices]
+    has_mac = [m is not None for m in mac_ints]
+    macb = _macs_to_column([m or 0 for m in mac_ints])
+    notes: Dict[Tuple[Any, ...], str] = {}
+    note_col: List[str] = []
+    for d in devices:
+        key = (d.tags, d.vendor, bool(d.alias))
+        note = notes.get(key)
+        if note is None:
+            note = notes[key] = d.note
+        note_col.append(note)
+    return ipb, [True] * n, macb, has_mac, [d.hostname for d in devices], [d.alias for d in devices], note_col
+
+
+def _dump_binary(devices: List[Dict[str, Any]]) -> bytes:
+    """
+    Columnas de tamaño fijo + cadenas internadas:
+      cabecera | cadenas ("\0"-separadas, índice 0 = "") | IPs (4 B) | MACs (6 B) |
+      flags (1 B) | índices hostname, alias, note y extra (uint32 cada uno)
+    IPs y MACs se guardan como enteros/bytes; hostname, alias, note y cualquier
+    campo adicional (JSON en 'extra') se guardan una sola vez aunque se repitan.
+    Se procesa por columnas (map/join en C) en lugar de registro a registro; un
+    inventario de Device se codifica desde sus slots (ver _device_columns).
+    """
+    n = len(devices)
+    extras: Dict[int, Dict[str, Any]] = {}
+    if all(type(d) is Device for d in devices):
+        ipb, has_ip, macb, has_mac, hostnames, aliases, notes = _device_columns(devices)
+        has_alias = list(map(bool, aliases))
+    else:
+        for k, d in enumerate(devices):
+            if not d.keys() <= _PLAIN_KEYS:
+                extras[k] = {key: v for key, v in d.items() if key not in _PLAIN_KEYS}
+        ipb, has_ip = _ip_column([d.get("ip") or "" for d in devices], extras)
+        macb, has_mac = _mac_column([d.get("mac") or "" for d in devices], extras)
+        has_alias = ["alias" in d for d in devices]
+        hostnames, aliases, notes = ([str(d.get(f) or "") for d in devices] for f in _STR_FIELDS)
+    flags = bytes(a * _HAS_IP | b * _HAS_MAC | c * _HAS_ALIAS for a, b, c in zip(has_ip, has_mac, has_alias))
+
+    strings: Dict[str, int] = {"": 0}
+    cols = [
+        _index_column([v.replace("\0", " ") for v in values], strings) for values in (hostnames, aliases, notes)
+    ]
+    extra_col = array("I", [0]) * n
+    for k, extra in extras.items():
+        text = json.dumps(extra, ensure_ascii=False, sort_keys=True).replace("\0", " ")
+        extra_col[k] = strings.setdefault(text, len(strings))
+    cols.append(extra_col)
+
+    blob = "\0".join(strings).encode("utf-8")
+    parts = [_HEAD.pack(_MAGIC, n, len(blob)), blob, ipb, macb, flags]
+    for col in cols:
+        if sys.byteorder == "big":
+            col.byteswap()  # en disco siempre little endian
+        parts.append(col.tobytes())
+    return b"".join(parts)
+
+
+def _load_binary(data: bytes) -> Dict[str, Any]:
+    """
+    Decodifica las columnas directamente a Device (IP/MAC enteras, note troceada una
+    vez por cadena distinta). Los registros que Device no reproduce tal cual (sin IP o
+    sin MAC, campos extra, alias vacío, note con otro orden) se devuelven como dict.
+    """
+    magic, n, blen = _HEAD.unpack_from(data, 0)
+    if magic != _MAGIC:
+        raise ValueError("Baseline binario no reconocido")
+    off = _HEAD.size
+    strings = data[off:off + blen].decode("utf-8").split("\0")
+    off += blen
+    ipb = data[off:off + 4 * n]
+    off += 4 * n
+    macb = data[off:off + 6 * n]
+    off += 6 * n
+    flags = data[off:off + n]
+    off += n
+    cols = []
+    for _ in range(len(_STR_FIELDS) + 1):
+        col = array("I")
+        col.frombytes(data[off:off + 4 * n])
+        if sys.byteorder == "big":
+            col.byteswap()
+        cols.append(col)
+        off += 4 * n
+    hostnames, aliases, notes, extras = cols
+
+    # note → tags / vendor una vez por cadena; 'odd' = (note, con alias) que Device no recompone igual
+    tags_of: Dict[int, Tuple[str, ...]] = {}
+    vendor_of: Dict[int, str] = {}
+    odd = set()
+    for k in set(notes):
+        tags, vendor = tags_of[k], vendor_of[k] = parse_note(strings[k])
+        for aliased in (False, True):
+            if Device(0, None, "", tags, vendor, "x" if aliased else "").note != strings[k]:
+                odd.add((k, aliased))
+    get = strings.__getitem__
+    # Miles de objetos seguidos disparan pasadas del recolector de ciclos sobre todo el
+    # heap; Device no forma ciclos, así que se pausa solo mientras se construyen
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        devices: List[Any] = list(map(
+            Device,
+            struct.unpack(f">{n}I", ipb),
+            _macs_from_column_int(macb),
+            map(get, hostnames),
+            map(tags_of.__getitem__, notes),
+            map(vendor_of.__getitem__, notes),
+            map(get, aliases),
+        ))
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    # Casos raros: el registro se rehace como dict con la forma exacta guardada.
+    # Comprobación en C primero: lo normal es que no haya ninguno
+    plain, with_alias = _HAS_IP | _HAS_MAC, _HAS_IP | _HAS_MAC | _HAS_ALIAS
+    if not odd and not any(extras) and not flags.translate(None, bytes((plain, with_alias))) \
+            and flags.count(with_alias) == n - aliases.count(0):
+        return {"devices": devices}
+    for k, (f, note, alias, extra) in enumerate(zip(flags, notes, aliases, extras)):
+        if not extra and f == (with_alias if alias else plain) and (note, bool(alias)) not in odd:
+            continue
+        dev = devices[k]
+        d = {"ip": dev.ip if f & _HAS_IP else "", "mac": dev.mac if f & _HAS_MAC else "",
+             "hostname": strings[hostnames[k]], "note": strings[note]}
+        if f & _HAS_ALIAS:
+            d["alias"] = strings[alias]
+        if extra:
+            d.update(json.loads(strings[extra]))
+        devices[k] = d
+    return {"devices": devices}
+
+
+@timed("baseline.load")
 def load_baseline(path: Path) -> Dict[str, Any]:
     """
-    Lee baseline desde JSON (si existe). Devuelve {} si no hay o si falla.
+    Lee baseline (JSON, o binario compacto si la extensión es .wgb). Devuelve {} si no hay o si falla.
     Estructura: {"devices": [ {ip, mac, hostname, note}, ... ]}
     """
     if path.exists():
         try:
+            if is_binary(path):
+                return _load_binary(path.read_bytes())
             return json.loads(path.read_text(encoding="utf-8"))
         except Exception:
             return {}
     return {}
 
+@timed("baseline.save")
 def save_baseline(path: Path, devices: List[Dict[str, Any]]) -> None:
     """
-    Guarda baseline (lista de dispositivos) con indentado para fácil lectura.
+    Guarda baseline (lista de dispositivos): JSON con indentado para fácil lectura,
+    o binario compacto si la extensión es .wgb (inventarios grandes / multi-sede).
+    Escritura atómica: un fallo a mitad no deja un baseline truncado.
     """
-    data = {"devices": devices}
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    if is_binary(path):
+        payload = _dump_binary(devices)
+    else:
+        payload = json.dumps({"devices": devices}, indent=2, ensure_ascii=False, default=to_json).encode("utf-8")
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(payload)
+    os.replace(tmp, path)
+
+def convert_baseline(src: Path, dst: Path) -> int:
+    """Convierte un baseline entre JSON y binario (según extensiones). Devuelve nº de dispositivos."""
+    if not src.exists():
+        raise FileNotFoundError(f"No existe el baseline: {src}")
+    devices = load_baseline(src).get("devices")
+    if devices is None:
+        raise ValueError(f"Baseline ilegible: {src}")
+    save_baseline(dst, devices)
+    return len(devices)
+
+def _pair(old: Dict[str, Any], new: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    return {"old": old, "new": new, "fields": fields}
+
+
+def _meta(d: Dict[str, Any]) -> Tuple[str, str, str]:
+    """(hostname, alias, note) = META_FIELDS; Device sin pasar por Mapping.get."""
+    if type(d) is Device:
+        return d.hostname, d.alias, d.note
+    return d.get("hostname") or "", d.get("alias") or "", d.get("note") or ""
+
+
+def _meta_changes(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    return [f for f, x, y in zip(META_FIELDS, _meta(old), _meta(new)) if x != y]
+
+
+def _same(old: Any, new: Any) -> bool:
+    """
+    Atajo del caso común (nada cambió) sin construir cadenas ni tuplas: dict == dict
+    en C, o los campos de Device tal cual. False solo significa "mirar en detalle".
+    """
+    if type(old) is dict and type(new) is dict:
+        return old == new
+    if type(old) is Device and type(new) is Device:
+        return (old.ip_int == new.ip_int and old.hostname == new.hostname and old.alias == new.alias
+                and old.vendor == new.vendor and old.tags == new.tags)
+    if type(old) is dict and type(new) is Device:  # baseline cargado vs. escaneo
+        return (old.get("ip") == new.ip and (old.get("hostname") or "") == new.hostname
+                and (old.get("alias") or "") == new.alias and (old.get("note") or "") == new.note)
+    return False
+
+
+def _ip(d: Dict[str, Any]) -> str:
+    return d.ip if type(d) is Device else d.get("ip") or ""
 
-def diff_baseline(old: Dict[str, Any], new_devices: List[Dict[str, Any]]):
+
+def _index(devices: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]], List[Any]]:
+    """
+    mac -> dispositivo para las MAC con una sola IP (caso común), mac -> {ip: dispositivo}
+    para las que tienen varias, y los dispositivos sin MAC. Sin tuplas por dispositivo:
+    el índice es un dict(zip()) y los grupos solo se construyen si hay MAC repetidas.
     """
-    Compara baseline antiguo vs. nueva detección.
+    macs = [d.mac if type(d) is Device else (d.get("mac") or "").lower() for d in devices]
+    single = dict(zip(macs, devices))
+    nomac: List[Any] = []
+    if "" in single:
+        del single[""]
+        nomac = [d for m, d in zip(macs, devices) if not m]
+    multi: Dict[str, Dict[str, Any]] = {}
+    if len(single) + len(nomac) != len(devices):
+        seen: Dict[str, Any] = {}
+        for m, d in zip(macs, devices):
+            if not m:
+                continue
+            prev = seen.setdefault(m, d)
+            if prev is not d:
+                group = multi.get(m)
+                if group is None:
+                    group = multi[m] = {_ip(prev): prev}
+                group[_ip(d)] = d
+        for m in multi:
+            del single[m]
+    return single, multi, nomac
 
-    Clave de comparación: (IP, MAC) — evita falsos positivos por DHCP si MAC coincide.
+
+@timed("baseline.diff")
+def diff_devices(old_devices: List[Dict[str, Any]], new_devices: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Diff con identidad por MAC (la IP es índice secundario). Devuelve:
+      - new / gone:        dispositivos (MAC) que aparecen / desaparecen
+      - moved_ip:          misma MAC con otra IP (renovación DHCP)
+      - mac_changed:       misma IP ocupada ahora por otra MAC (candidato a spoof o equipo sustituido)
+      - metadata_changed:  misma MAC e IP con hostname/alias/note distintos
+    Los tres últimos son pares {"old", "new", "fields"}.
+
+    Hash-join por MAC en una pasada por lado (sin ordenar); las MAC con varias IPs
+    se emparejan por grupo. Los dispositivos sin MAC (solo ICMP) se identifican por IP.
+    Las listas salen en el orden de entrada (el inventario ya viene por IP).
+    """
+    res: Dict[str, List[Dict[str, Any]]] = {
+        "new": [], "gone": [], "moved_ip": [], "mac_changed": [], "metadata_changed": [],
+    }
+    old_single, old_multi, old_nomac = _index(old_devices)
+    new_single, new_multi, new_nomac = _index(new_devices)
+    added: List[Dict[str, Any]] = []
+    moved = res["moved_ip"]
+    meta = res["metadata_changed"]
+
+    def join_groups(olds: Dict[str, Any], news: Dict[str, Any]) -> None:
+        """Misma MAC con varias IPs: mismas IPs → metadatos; el resto se empareja como movimientos."""
+        for ip in olds.keys() & news.keys():
+            fields = _meta_changes(olds[ip], news[ip])
+            if fields:
+                meta.append(_pair(olds[ip], news[ip], fields))
+        left = [olds[ip] for ip in sorted(olds.keys() - news.keys())]
+        right = [news[ip] for ip in sorted(news.keys() - olds.keys())]
+        for o, n in zip(left, right):
+            moved.append(_pair(o, n, ["ip"] + _meta_changes(o, n)))
+        gone.extend(left[len(right):])
+        added.extend(right[len(left):])
+
+    gone: List[Dict[str, Any]] = []
+    pop_single = old_single.pop
+    for mac, n in new_single.items():
+        o = pop_single(mac, None)
+        if o is None:
+            olds = old_multi.pop(mac, None)
+            if olds is None:
+                added.append(n)
+            else:
+                join_groups(olds, {_ip(n): n})
+            continue
+        # Caso común: una IP por MAC en cada lado
+        if _same(o, n):
+            continue
+        if _ip(o) != _ip(n):
+            moved.append(_pair(o, n, ["ip"] + _meta_changes(o, n)))
+        elif _meta(o) != _meta(n):
+            meta.append(_pair(o, n, _meta_changes(o, n)))
+    for mac, news in new_multi.items():
+        o = pop_single(mac, None)
+        olds = {_ip(o): o} if o is not None else old_multi.pop(mac, None)
+        if olds is None:
+            added.extend(news[ip] for ip in sorted(news))
+        else:
+            join_groups(olds, news)
+    gone.extend(old_single.values())
+    for olds in old_multi.values():
+        gone.extend(olds[ip] for ip in sorted(olds))
+    # Sin MAC: la identidad es la IP (se emparejan abajo, por el índice secundario)
+    gone.extend(old_nomac)
+    added.extend(new_nomac)
+
+    # Índice secundario por IP: una IP que cambia de dueño
+    gone_by_ip = {d.get("ip") or "": d for d in gone if d.get("ip")}
+    paired = set()
+    for n in added:
+        o = gone_by_ip.pop(n.get("ip") or "", None) if n.get("ip") else None
+        if o is None:
+            res["new"].append(n)
+            continue
+        paired.add(id(o))
+        mac_old, mac_new = o.get("mac") or "", n.get("mac") or ""
+        if mac_old and mac_new:
+            res["mac_changed"].append(_pair(o, n, ["mac"] + _meta_changes(o, n)))
+        elif mac_old or mac_new:
+            # Se aprendió (o se perdió) la MAC de la misma IP: no es un cambio de identidad
+            res["metadata_changed"].append(_pair(o, n, ["mac"] + _meta_changes(o, n)))
+        else:
+            # Sin MAC en ambos lados: mismo dispositivo (identidad por IP)
+            fields = _meta_changes(o, n)
+            if fields:
+                res["metadata_changed"].append(_pair(o, n, fields))
+    res["gone"] = [d for d in gone if id(d) not in paired]
+    return res
+
+
+def diff_baseline(old: Dict[str, Any], new_devices: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Compara baseline antiguo vs. nueva detección (ver diff_devices).
+
+    Identidad por MAC: un cambio de IP por DHCP ya no aparece como alta + baja.
     Retorna:
-      - added: dispositivos nuevos
-      - removed: dispositivos que ya no están
-    """
-    old_map = { (d.get("ip",""), d.get("mac","")): d for d in old.get("devices", []) }
-    new_map = { (d.get("ip",""), d.get("mac","")): d for d in new_devices }
-    old_keys = set(old_map.keys())
-    new_keys = set(new_map.keys())
-    added = [new_map[k] for k in new_keys - old_keys]
-    removed = [old_map[k] for k in old_keys - new_keys]
+      - added: dispositivos nuevos (incluye la MAC nueva de una IP que cambió de dueño)
+      - removed: dispositivos que ya no están (incluye la MAC anterior de esa IP)
+    """
+    res = diff_devices(old.get("devices", []), new_devices)
+    added = res["new"] + [p["new"] for p in res["mac_changed"]]
+    removed = res["gone"] + [p["old"] for p in res["mac_changed"]]
     return added, removed
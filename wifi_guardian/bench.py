@@ -0,0 +1,483 @@
+"""
+Banco de pruebas reproducible, sin red ni privilegios.
+
+- Datos sintéticos deterministas (semilla): inventarios de 1k a 100k dispositivos,
+  pcaps de ARP (con suplantaciones) y de deauth (radiotap) escritos con struct.
+- Sustitutos de la LAN (unittest.mock, solo mientras dura cada medida):
+    · motor ARP L2 falso en lugar de 'raw_arp_scan': entrega cada host a 'on_host'
+      repartido a lo largo de 'sweep_s', como un barrido real;
+    · DNS inversa (socket.gethostbyaddr) y subprocess.run (getent / avahi / nbtstat)
+      con latencia fija; solo 'named_pct' % de las IPs tiene nombre.
+- Etapas: finalize, diff, baseline.json, baseline.wgb, report, arpmon, deauth,
+  passive y 'scan' de extremo a extremo (arp_scan con el pipeline real, alias,
+  diff, informes y baseline).
+- Resultado JSON: meta (commit, python, plataforma, parámetros) y por (etapa, n)
+  los tiempos de cada repetición, mejor, mediana e items/s. 'compare' enfrenta
+  dos ficheros (p. ej. de dos commits) y marca las regresiones.
+"""
+
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from pathlib import Path
+from unittest import mock
+import datetime
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+from . import cache as enrich_cache
+from . import namer, profiling, scan
+from .aliases import apply_aliases
+from .arpmon import monitor_arp
+from .baseline import diff_devices, load_baseline, save_baseline
+from .capture import DLT_EN10MB, DLT_IEEE802_11_RADIO
+from .deauth import detect_deauth
+from .device import Device, sort_key
+from .outputs import write_outputs
+from .passive import passive_inventory
+from .report import write_reports
+
+STAGES = ("finalize", "diff", "baseline.json", "baseline.wgb", "report", "arpmon", "deauth", "passive", "scan")
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+_BASE_IP = 0x0A000001  # 10.0.0.1: los inventarios sintéticos son 10.0.0.0/8 consecutivos
+
+
+# -----------------------
+#  Datos sintéticos
+# -----------------------
+
+def _rand_mac(rng: random.Random, private_pct: float = 10) -> int:
+    mac = rng.getrandbits(48) & ~(0x01 << 40)  # unicast
+    if rng.random() * 100 < private_pct:
+        return mac | (0x02 << 40)              # localmente administrada (MAC privada)
+    return mac & ~(0x02 << 40)
+
+
+def synthetic_inventory(n: int, seed: int = 0, named_pct: float = 60) -> List[Device]:
+    """'n' dispositivos deterministas (IPs consecutivas desde 10.0.0.1, ~10 % MAC privada)."""
+    rng = random.Random(seed)
+    devices = []
+    for i in range(n):
+        name = f"host-{i}.lan" if rng.random() * 100 < named_pct else ""
+        devices.append(Device(_BASE_IP + i, _rand_mac(rng), hostname=name))
+    return devices
+
+
+def mutate_inventory(devices: List[Device], seed: int = 0, churn: float = 0.05) -> List[Device]:
+    """
+    Siguiente escaneo plausible: 'churn' de bajas y de altas, la mitad de eso en
+    cambios de IP (DHCP), una cuarta parte en IPs con otra MAC y otro tanto en
+    cambios de hostname.
+    """
+    rng = random.Random(seed + 1)
+    out = [Device(d.ip_int, d.mac_int, d.hostname, d.tags, d.vendor, d.alias) for d in devices]
+    k = int(len(out) * churn)
+    rng.shuffle(out)
+    del out[:k]                                              # bajas
+    top = _BASE_IP + len(devices)
+    for i in range(k):                                       # altas
+        out.append(Device(top + i, _rand_mac(rng)))
+    top += k
+    for d in out[:k // 2]:                                   # misma MAC, otra IP
+        d.ip_int = top
+        top += 1
+    for d in out[k // 2:k // 2 + k // 4]:                    # misma IP, otra MAC
+        d.mac_int = _rand_mac(rng)
+    for d in out[k:k + k // 4]:                              # renombrados
+        d.hostname = (d.hostname or "nuevo") + "-2"
+    out.sort(key=sort_key)
+    return out
+
+
+def _write_pcap(path: Path, linktype: int, frames: Iterable[Tuple[float, bytes]]) -> int:
+    """pcap clásico (little-endian, µs). Devuelve nº de tramas."""
+    n = 0
+    with open(path, "wb") as fh:
+        fh.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, linktype))
+        for ts, data in frames:
+            sec = int(ts)
+            fh.write(struct.pack("<IIII", sec, int((ts - sec) * 1e6), len(data), len(data)))
+            fh.write(data)
+            n += 1
+    return n
+
+
+def _arp_reply(mac: int, ip: int, dst_mac: int, dst_ip: int) -> bytes:
+    sha, tha = mac.to_bytes(6, "big"), dst_mac.to_bytes(6, "big")
+    return (tha + sha + b"\x08\x06" + struct.pack("!HHBBH", 1, 0x0800, 6, 4, 2)
+            + sha + struct.pack("!I", ip) + tha + struct.pack("!I", dst_ip))
+
+
+def write_arp_pcap(path: Path, frames: int, seed: int = 0, spoof_pct: float = 1.0) -> int:
+    """
+    Respuestas ARP de max(16, frames/50) hosts que se repiten cada ~50 tramas, 1 ms
+    entre tramas; 'spoof_pct' % de las tramas anuncian otra MAC para una IP conocida.
+    """
+    rng = random.Random(seed)
+    hosts = [(_BASE_IP + i, _rand_mac(rng, 0)) for i in range(max(16, frames // 50))]
+    gw_mac, gw_ip = _rand_mac(rng, 0), _BASE_IP + 0xFFFF
+    attacker = _rand_mac(rng, 0)
+
+    def gen():
+        t = 1_700_000_000.0
+        for _ in range(frames):
+            ip, mac = hosts[rng.randrange(len(hosts))]
+            if rng.random() * 100 < spoof_pct:
+                mac = attacker
+            yield t, _arp_reply(mac, ip, gw_mac, gw_ip)
+            t += 0.001
+    return _write_pcap(path, DLT_EN10MB, gen())
+
+
+def write_deauth_pcap(path: Path, frames: int, seed: int = 0, attack_pct: float = 80) -> int:
+    """
+    Radiotap + 802.11: 'attack_pct' % deauth/disassoc de 4 emisores contra 32 clientes
+    de 2 BSSID (ráfagas), el resto beacons; 0.2 ms entre tramas.
+    """
+    rng = random.Random(seed)
+    radiotap = struct.pack("<BBHI", 0, 0, 8, 0)
+    bssids = [_rand_mac(rng, 0).to_bytes(6, "big") for _ in range(2)]
+    clients = [_rand_mac(rng).to_bytes(6, "big") for _ in range(32)]
+    senders = [_rand_mac(rng).to_bytes(6, "big") for _ in range(4)]
+    tail = b"\x00\x00\x07\x00"  # secuencia + código de motivo
+
+    def gen():
+        t = 1_700_000_000.0
+        for _ in range(frames):
+            bssid = bssids[rng.randrange(2)]
+            if rng.random() * 100 < attack_pct:
+                fc = b"\xc0\x00" if rng.random() < 0.7 else b"\xa0\x00"  # deauth / disassoc
+                frame = fc + b"\x00\x00" + clients[rng.randrange(32)] + senders[rng.randrange(4)] + bssid + tail
+            else:
+                frame = b"\x80\x00\x00\x00" + b"\xff" * 6 + bssid + bssid + tail
+            yield t, radiotap + frame
+            t += 0.0002
+    return _write_pcap(path, DLT_IEEE802_11_RADIO, gen())
+
+
+# -----------------------
+#  Sustitutos de la LAN
+# -----------------------
+
+def _has_name(ip: str, named_pct: float) -> bool:
+    return zlib.crc32(ip.encode()) % 100 < named_pct
+
+
+def fake_resolvers(latency_ms: float = 1.0, named_pct: float = 70):
+    """
+    Contexto: DNS inversa y subprocess.run (estrategias extra de 'namer') con latencia
+    fija. Las IPs con nombre lo tienen por DNS; el resto agota también getent/avahi.
+    """
+    delay = latency_ms / 1000
+
+    def gethostbyaddr(ip: str):
+        time.sleep(delay)
+        if _has_name(ip, named_pct):
+            return f"h{ip.replace('.', '-')}.lan", [], [ip]
+        raise socket.herror(1, "Unknown host")
+
+    def run(cmd, *args, **kwargs):
+        time.sleep(delay)
+        return subprocess.CompletedProcess(cmd, 0, stdout="", stderr="")
+
+    patches = [
+        mock.patch.object(socket, "gethostbyaddr", gethostbyaddr),
+        mock.patch.object(namer.subprocess, "run", run),
+    ]
+    return _Patches(patches)
+
+
+def fake_arp_engine(devices: List[Device], sweep_s: float = 1.0):
+    """
+    Contexto: 'raw_arp_scan' falso que entrega 'devices' a 'on_host' repartidos a lo
+    largo de 'sweep_s' s (desde el hilo del llamador, como un receptor) y deja
+    l2_passes en stats; el motor raw se da por disponible.
+    """
+    def raw_arp_scan(cidr, iface, timeout=3, stats=None, on_host=None, **kwargs):
+        t0 = time.monotonic()
+        n = len(devices)
+        found = {}
+        for i, d in enumerate(devices):
+            if i % 64 == 0:
+                ahead = t0 + sweep_s * i / n - time.monotonic()
+                if ahead > 0:
+                    time.sleep(ahead)
+            ip, mac = d.ip, d.mac
+            found[ip] = mac
+            if on_host:
+                on_host(ip, mac)
+        if stats is not None:
+            stats["l2_passes"] = [{"pass": 1, "sent": n, "hits": n, "elapsed_s": round(time.monotonic() - t0, 3)}]
+            stats["engine"] = "bench"
+        return found
+
+    return _Patches([
+        mock.patch.object(scan, "raw_arp_scan", raw_arp_scan),
+        mock.patch.object(scan, "rawarp_available", lambda: True),
+    ])
+
+
+class _Patches:
+    """Varios mock.patch como un único contexto."""
+
+    def __init__(self, patches: List[Any]) -> None:
+        self.patches = patches
+
+    def __enter__(self) -> "_Patches":
+        for p in self.patches:
+            p.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for p in reversed(self.patches):
+            p.stop()
+
+
+# -----------------------
+#  Etapas
+# -----------------------
+# Cada etapa prepara sus datos (fuera de la medida) y devuelve run() → (segundos, extra).
+
+def _cidr_for(n: int) -> str:
+    """La red 10.0.0.0/x más pequeña que contiene 'n' hosts."""
+    return f"10.0.0.0/{max(8, 32 - (n + 2).bit_length())}"
+
+
+def _stage_finalize(n: int, opts: Dict[str, Any], work: Path):
+    base = synthetic_inventory(n, opts["seed"], named_pct=0)
+
+    def run():
+        devs = [Device(d.ip_int, d.mac_int) for d in base]
+        enrich_cache.configure(None)
+        with fake_resolvers(opts["latency_ms"], opts["named_pct"]):
+            t0 = time.perf_counter()
+            out = scan.finalize(devs)
+            elapsed = time.perf_counter() - t0
+        return elapsed, {"named": sum(1 for d in out if d.hostname)}
+    return run
+
+
+def _stage_diff(n: int, opts: Dict[str, Any], work: Path):
+    old = [d.to_dict() for d in synthetic_inventory(n, opts["seed"])]
+    new = mutate_inventory([Device.from_dict(d) for d in old], opts["seed"])
+
+    def run():
+        t0 = time.perf_counter()
+        ch = diff_devices(old, new)
+        elapsed = time.perf_counter() - t0
+        return elapsed, {k: len(v) for k, v in ch.items()}
+    return run
+
+
+def _stage_baseline(suffix: str):
+    def stage(n: int, opts: Dict[str, Any], work: Path):
+        devices = synthetic_inventory(n, opts["seed"])
+        path = work / f"bench-baseline{suffix}"
+
+        def run():
+            t0 = time.perf_counter()
+            save_baseline(path, devices)
+            loaded = load_baseline(path)
+            elapsed = time.perf_counter() - t0
+            return elapsed, {"bytes": path.stat().st_size, "loaded": len(loaded.get("devices", []))}
+        return run
+    return stage
+
+
+def _stage_report(n: int, opts: Dict[str, Any], work: Path):
+    devices = synthetic_inventory(n, opts["seed"])
+    summary = {"iface": "bench0", "cidr": _cidr_for(n), "total_devices": n}
+    out_dir = work / "reports"
+
+    def run():
+        t0 = time.perf_counter()
+        html_path = write_reports(out_dir, "bench", summary, devices, [], stamp="bench")
+        paths = write_outputs(out_dir, ["jsonl", "csv"], "scan", summary, devices, [], stamp="bench")
+        elapsed = time.perf_counter() - t0
+        return elapsed, {"bytes": sum(p.stat().st_size for p in [html_path, *paths])}
+    return run
+
+
+def _stage_pcap(kind: str):
+    def stage(n: int, opts: Dict[str, Any], work: Path):
+        path = work / f"bench-{kind}-{n}.pcap"
+        if kind == "deauth":
+            write_deauth_pcap(path, n, opts["seed"])
+        else:
+            write_arp_pcap(path, n, opts["seed"])
+
+        def run():
+            stats: Dict[str, Any] = {}
+            t0 = time.perf_counter()
+            if kind == "arpmon":
+                notes = monitor_arp(pcap=path, stats=stats)
+                extra = {"alerts": len(notes)}
+            elif kind == "deauth":
+                detect_deauth(pcap=path, stats=stats)
+                extra = {"alerts": len(stats.get("alerts", []))}
+            else:
+                enrich_cache.configure(None)
+                devs = passive_inventory(pcap=path, stats=stats)
+                extra = {"devices": len(devs)}
+            elapsed = time.perf_counter() - t0
+            frames = stats.get("frames") or stats.get("counters", {}).get("frames", 0)
+            return elapsed, {**extra, "frames": frames}
+        return run
+    return stage
+
+
+def _stage_scan(n: int, opts: Dict[str, Any], work: Path):
+    """arp_scan (motor falso + pipeline real) → alias → diff con baseline → HTML/jsonl → baseline."""
+    inventory = synthetic_inventory(n, opts["seed"], named_pct=0)
+    previous = mutate_inventory(inventory, opts["seed"])
+    cidr = _cidr_for(n)
+    baseline_file = work / "bench-scan-baseline.json"
+    out_dir = work / "scan-reports"
+    aliases = {d.mac: f"alias-{i}" for i, d in enumerate(inventory[: max(1, n // 100)])}
+
+    def run():
+        save_baseline(baseline_file, previous)
+        enrich_cache.configure(None)
+        was = profiling.get_profiler().enabled
+        profiling.enable()
+        stats: Dict[str, Any] = {}
+        try:
+            with fake_resolvers(opts["latency_ms"], opts["named_pct"]), fake_arp_engine(inventory, opts["sweep_s"]):
+                t0 = time.perf_counter()
+                devices = scan.arp_scan(cidr, "bench0", stats=stats, engine="raw")
+                apply_aliases(devices, aliases)
+                old = load_baseline(baseline_file)
+                changes = diff_devices(old.get("devices", []), devices)
+                summary = {"iface": "bench0", "cidr": cidr, "scan_stats": [stats], "total_devices": len(devices)}
+                write_reports(out_dir, "bench", summary, devices, [], stamp="bench")
+                write_outputs(out_dir, ["jsonl"], "scan", summary, devices, [], stamp="bench")
+                save_baseline(baseline_file, devices)
+                elapsed = time.perf_counter() - t0
+            prof = profiling.report()
+        finally:
+            profiling.enable(was)
+        return elapsed, {
+            "devices": len(devices),
+            "new": len(changes["new"]),
+            "pipeline": stats.get("pipeline", {}),
+            "stages": {k: v["total_s"] for k, v in prof["stages"].items()},
+        }
+    return run
+
+
+_STAGE_FUNCS: Dict[str, Callable[[int, Dict[str, Any], Path], Callable[[], Tuple[float, Dict[str, Any]]]]] = {
+    "finalize": _stage_finalize,
+    "diff": _stage_diff,
+    "baseline.json": _stage_baseline(".json"),
+    "baseline.wgb": _stage_baseline(".wgb"),
+    "report": _stage_report,
+    "arpmon": _stage_pcap("arpmon"),
+    "deauth": _stage_pcap("deauth"),
+    "passive": _stage_pcap("passive"),
+    "scan": _stage_scan,
+}
+
+
+# -----------------------
+#  API pública
+# -----------------------
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=Path(__file__).resolve().parent, timeout=5)
+        return out.stdout.strip()
+    except Exception:
+        return ""
+
+
+def run_bench(
+    stages: Iterable[str] = STAGES,
+    sizes: Iterable[int] = DEFAULT_SIZES,
+    repeat: int = 3,
+    budget_s: float = 30.0,
+    seed: int = 0,
+    latency_ms: float = 1.0,
+    named_pct: float = 70,
+    sweep_s: float = 1.0,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Ejecuta cada etapa con cada tamaño. Cada (etapa, n) se repite 'repeat' veces, o
+    menos si ya lleva 'budget_s' s (al menos una). Los datos se generan en un
+    directorio temporal que se borra al terminar. 'on_result' recibe cada resultado
+    al momento. Lanza ValueError si una etapa no existe.
+    """
+    stages = list(stages)
+    unknown = [s for s in stages if s not in _STAGE_FUNCS]
+    if unknown:
+        raise ValueError(f"Etapa desconocida: {', '.join(unknown)} (válidas: {', '.join(STAGES)})")
+    opts = {"seed": seed, "latency_ms": latency_ms, "named_pct": named_pct, "sweep_s": sweep_s}
+    results: List[Dict[str, Any]] = []
+    work = Path(tempfile.mkdtemp(prefix="wg-bench-"))
+    try:
+        for name in stages:
+            for n in sizes:
+                run = _STAGE_FUNCS[name](n, opts, work)
+                times: List[float] = []
+                extra: Dict[str, Any] = {}
+                while len(times) < max(1, repeat):
+                    elapsed, extra = run()
+                    times.append(elapsed)
+                    if sum(times) >= budget_s:
+                        break
+                best, median = min(times), statistics.median(times)
+                res = {
+                    "stage": name, "n": n,
+                    "runs_s": [round(t, 4) for t in times],
+                    "best_s": round(best, 4), "median_s": round(median, 4),
+                    "items_per_s": round(n / median) if median > 0 else 0,
+                    "extra": extra,
+                }
+                results.append(res)
+                if on_result:
+                    on_result(res)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+        enrich_cache.configure(None)
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count() or 1,
+            "params": {**opts, "repeat": repeat, "budget_s": budget_s},
+        },
+        "results": results,
+    }
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float = 0.10) -> List[Dict[str, Any]]:
+    """
+    Enfrenta dos resultados por (etapa, n) usando la mediana. 'ratio' = nuevo / antiguo
+    (> 1 es más lento); 'regression' si supera 1 + threshold. Solo pares presentes en ambos.
+    """
+    before = {(r["stage"], r["n"]): r for r in old.get("results", [])}
+    rows = []
+    for r in new.get("results", []):
+        o = before.get((r["stage"], r["n"]))
+        if o is None or not o["median_s"]:
+            continue
+        ratio = r["median_s"] / o["median_s"]
+        rows.append({
+            "stage": r["stage"], "n": r["n"],
+            "old_s": o["median_s"], "new_s": r["median_s"],
+            "ratio": round(ratio, 3), "regression": ratio > 1 + threshold,
+        })
+    return rows
@@ -0,0 +1,158 @@
+"""
+Caché persistente del enriquecido (hostnames y fabricantes).
+
+- Hostnames por (IP, MAC); fabricantes por OUI (prefijo de 24 bits).
+- TTL propio para cada tipo y para los resultados negativos, de modo que
+  los equipos que nunca resuelven no se reintentan en cada ejecución.
+- Se guarda en JSON junto al baseline (por defecto '.wg_cache.json').
+Estructura:
+{
+  "hosts":   { "192.168.1.10|aa:bb:cc:dd:ee:ff": {"name": "nas", "src": "dns", "ts": 1700000000} },
+  "vendors": { "aa:bb:cc": {"name": "Synology", "ts": 1700000000} }
+}
+"""
+
+from __future__ import annotations
+from typing import Any, Dict, Optional, Tuple
+from pathlib import Path
+import json
+import os
+import threading
+import time
+
+DEFAULT_CACHE_FILE = Path(".wg_cache.json")
+
+HOST_TTL = 7 * 24 * 3600        # nombres: cambian poco
+VENDOR_TTL = 90 * 24 * 3600     # OUI: prácticamente estáticos
+NEGATIVE_TTL = 24 * 3600        # "no resuelve": reintentar una vez al día
+
+
+def _host_key(ip: str, mac: str) -> str:
+    return f"{ip}|{(mac or '').strip().lower().replace('-', ':')}"
+
+
+def oui_of(mac: str) -> str:
+    """Prefijo OUI normalizado ('aa:bb:cc') o "" si la MAC no es válida."""
+    mac = (mac or "").strip().lower().replace("-", ":")
+    parts = mac.split(":")
+    if len(parts) < 3 or any(len(p) != 2 for p in parts[:3]):
+        return ""
+    return ":".join(parts[:3])
+
+
+class EnrichmentCache:
+    """Caché en memoria con persistencia JSON. Segura para uso desde varios hilos."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = DEFAULT_CACHE_FILE,
+        host_ttl: float = HOST_TTL,
+        vendor_ttl: float = VENDOR_TTL,
+        negative_ttl: float = NEGATIVE_TTL,
+    ):
+        self.path = path
+        self.host_ttl = host_ttl
+        self.vendor_ttl = vendor_ttl
+        self.negative_ttl = negative_ttl
+        self.hosts: Dict[str, Dict[str, Any]] = {}
+        self.vendors: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    # ---------- persistencia ----------
+
+    def _load(self) -> None:
+        if not self.path or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception:
+            return
+        now = time.time()
+        # Al cargar descartamos lo caducado para que el archivo no crezca sin límite
+        self.hosts = {
+            k: v for k, v in (data.get("hosts") or {}).items()
+            if self._fresh(v, self.host_ttl, now)
+        }
+        self.vendors = {
+            k: v for k, v in (data.get("vendors") or {}).items()
+            if self._fresh(v, self.vendor_ttl, now)
+        }
+
+    def save(self) -> None:
+        """Escribe la caché (atómicamente) si hubo cambios. Best-effort."""
+        if not self.path or not self._dirty:
+            return
+        # Bajo el lock: varios segmentos pueden terminar a la vez
+        with self._lock:
+            data = {"hosts": self.hosts, "vendors": self.vendors}
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_name(self.path.name + ".tmp")
+                tmp.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+                os.replace(tmp, self.path)
+                self._dirty = False
+            except Exception:
+                pass
+
+    # ---------- consultas ----------
+
+    def _fresh(self, entry: Dict[str, Any], ttl: float, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        limit = ttl if entry.get("name") else min(ttl, self.negative_ttl)
+        return now - float(entry.get("ts", 0)) < limit
+
+    def get_hostname(self, ip: str, mac: str = "") -> Optional[Tuple[str, str]]:
+        """
+        Devuelve (nombre, origen) si hay entrada vigente; ("", "") es un negativo cacheado.
+        None = no hay entrada (hay que resolver).
+        """
+        entry = self.hosts.get(_host_key(ip, mac))
+        if entry is None or not self._fresh(entry, self.host_ttl):
+            return None
+        return entry.get("name", ""), entry.get("src", "")
+
+    def put_hostname(self, ip: str, mac: str, name: str, source: str = "") -> None:
+        with self._lock:
+            self.hosts[_host_key(ip, mac)] = {"name": name or "", "src": source if name else "", "ts": int(time.time())}
+            self._dirty = True
+
+    def get_vendor(self, mac: str) -> Optional[str]:
+        """Fabricante cacheado por OUI; "" es un negativo cacheado; None = sin entrada."""
+        entry = self.vendors.get(oui_of(mac))
+        if entry is None or not self._fresh(entry, self.vendor_ttl):
+            return None
+        return entry.get("name", "")
+
+    def put_vendor(self, mac: str, name: str) -> None:
+        oui = oui_of(mac)
+        if not oui:
+            return
+        with self._lock:
+            self.vendors[oui] = {"name": name or "", "ts": int(time.time())}
+            self._dirty = True
+
+    def clear_negative_vendors(self) -> None:
+        """Olvida los OUI sin fabricante (p. ej. tras actualizar la base OUI)."""
+        with self._lock:
+            self.vendors = {k: v for k, v in self.vendors.items() if v.get("name")}
+            self._dirty = True
+
+
+# Singleton simple (como el de vendor.py): lo configura la CLI junto al baseline
+_cache: Optional[EnrichmentCache] = None
+
+
+def configure(path: Optional[Path], **ttls: float) -> EnrichmentCache:
+    """Fija la ruta de la caché (None = solo en memoria, sin persistir)."""
+    global _cache
+    _cache = EnrichmentCache(path, **ttls)
+    return _cache
+
+
+def get_cache() -> EnrichmentCache:
+    global _cache
+    if _cache is None:
+        _cache = EnrichmentCache(DEFAULT_CACHE_FILE)
+    return _cache
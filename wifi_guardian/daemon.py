@@ -0,0 +1,122 @@
+"""
+Modo vigilancia continua ('watch').
+
+Un único proceso de larga duración mantiene calientes scapy, el índice OUI
+y la caché de enriquecido, y alterna:
+  - barridos completos cada 'full_every' segundos (scan_segments + alias + baseline),
+  - comprobaciones baratas de vida entre medias: ARP solo a los dispositivos
+    conocidos (ICMP si no hay L2).
+Se emiten altas/bajas (identidad por MAC, ver 'diff_devices') y cambios de IP.
+"""
+
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pathlib import Path
+import datetime
+import ipaddress
+import threading
+import time
+
+from .scan import arp_probe, scan_segments
+from .sweep import icmp_sweep
+from .aliases import load_aliases, apply_aliases
+from .baseline import load_baseline, save_baseline, diff_devices
+from .history import HistoryStore
+
+
+def check_liveness(known: List[Dict[str, Any]], segments: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Comprueba qué dispositivos conocidos siguen vivos, sin barrer la subred entera.
+    Devuelve copias de los registros conocidos que respondieron (con la MAC observada por ARP).
+    """
+    alive: List[Dict[str, Any]] = []
+    for iface, cidr in segments:
+        net = ipaddress.IPv4Network(cidr, strict=False)
+        devs = [d for d in known if d.get("ip") and ipaddress.IPv4Address(d["ip"]) in net]
+        if not devs:
+            continue
+        ips = [d["ip"] for d in devs]
+        try:
+            seen = arp_probe(ips, iface, timeout=1.5, quiet=0.3, max_passes=2)
+        except Exception:
+            seen = {ip: "" for ip in icmp_sweep(ips, timeout=1.0)}
+        for d in devs:
+            if d["ip"] not in seen:
+                continue
+            cur = dict(d)
+            if seen[d["ip"]]:
+                cur["mac"] = seen[d["ip"]]
+            alive.append(cur)
+    return alive
+
+
+def _event(kind: str, d: Dict[str, Any], mode: str, **extra: Any) -> Dict[str, Any]:
+    return {
+        "ts": datetime.datetime.now().isoformat(timespec="seconds"),
+        "event": kind,
+        "mode": mode,
+        "ip": d.get("ip", ""),
+        "mac": d.get("mac", ""),
+        "hostname": d.get("hostname", ""),
+        "alias": d.get("alias", ""),
+        **extra,
+    }
+
+
+def watch_loop(
+    segments: List[Tuple[str, str]],
+    baseline_file: Path,
+    aliases_file: Path,
+    emit: Callable[[Dict[str, Any]], None],
+    interval: float = 60,
+    full_every: float = 900,
+    engine: str = "auto",
+    iterations: int = 0,
+    stop: Optional[threading.Event] = None,
+    history_file: Optional[Path] = None,
+) -> None:
+    """
+    Bucle del daemon. Cada 'interval' s hace una comprobación de vida de los conocidos
+    y, cada 'full_every' s, un barrido completo que además actualiza el baseline.
+    'emit' recibe cada evento {"event": "join"|"leave"|"moved", ...}; una IP que
+    cambia de MAC se emite como baja de la MAC anterior + alta de la nueva.
+    iterations=0 → sin límite (hasta Ctrl+C o 'stop').
+    Con 'history_file', cada barrido completo se añade además al histórico SQLite.
+    """
+    stop = stop or threading.Event()
+    # Estado inicial = baseline: el primer barrido informa igual que 'scan'
+    present: List[Dict[str, Any]] = list(load_baseline(baseline_file).get("devices", []))
+    known = list(present)
+    last_full: Optional[float] = None
+    n = 0
+    while not stop.is_set():
+        t0 = time.monotonic()
+        full = last_full is None or t0 - last_full >= full_every
+        if full:
+            devices, seg_stats = scan_segments(segments, engine=engine)
+            # Un segmento fallido deja el inventario vacío o parcial: no se difunde como
+            # bajas ni pisa el baseline; esta vuelta es de vida y el barrido se reintenta
+            full = not any(st.get("error") for st in seg_stats)
+        if full:
+            apply_aliases(devices, load_aliases(aliases_file))
+            save_baseline(baseline_file, devices)
+            if history_file is not None:
+                with HistoryStore(history_file) as h:
+                    h.record_scan(devices, source="watch", segments=", ".join(c for _, c in segments))
+            known, last_full, mode = devices, t0, "full"
+        else:
+            devices, mode = check_liveness(known, segments), "liveness"
+
+        changes = diff_devices(present, devices)
+        for d in changes["new"] + [p["new"] for p in changes["mac_changed"]]:
+            emit(_event("join", d, mode))
+        for d in changes["gone"] + [p["old"] for p in changes["mac_changed"]]:
+            emit(_event("leave", d, mode))
+        for p in changes["moved_ip"]:
+            emit(_event("moved", p["new"], mode, old_ip=p["old"].get("ip", "")))
+        present = devices
+
+        n += 1
+        if iterations and n >= iterations:
+            break
+        stop.wait(max(0.0, interval - (time.monotonic() - t0)))
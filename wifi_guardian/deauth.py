@@ -1,42 +1,266 @@
 """
-Detección de tramas 802.11 de desautenticación (deauth).
+Detección de tramas 802.11 de desautenticación (deauth) y desasociación.
 Requiere Linux + interfaz en modo monitor (ej.: wlan0mon).
+
+Pensado para entornos RF ruidosos (decenas de miles de tramas/s):
+  - Filtro BPF en kernel: solo gestión deauth/disassoc llegan a Python.
+  - Captura por lotes en crudo (capture.LiveCapture) y decodificación directa
+    de la cabecera radiotap + 802.11 (addr1 = destino, addr2 = emisor, addr3 = BSSID).
+  - Agregación en cubos de 1 s: serie temporal global y totales por
+    (emisor, BSSID, destino), con memoria acotada.
+  - Alerta en el momento en que un (emisor, BSSID) alcanza 'threshold' tramas en un segundo.
 """
 
-from typing import List
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from pathlib import Path
+import datetime
 import platform
-from scapy.all import Dot11, Dot11Deauth, sniff  # type: ignore
+import threading
+
+from .capture import LiveCapture, PcapReplay, Batch, DLT_IEEE802_11, DLT_IEEE802_11_RADIO
+from .arpmon import fmt_ts
+
+ARPHRD_IEEE80211 = 801
+ARPHRD_IEEE80211_RADIOTAP = 803
+BROADCAST = b"\xff" * 6
+
+_DEAUTH, _DISASSOC = 0xC0, 0xA0  # byte 0 del Frame Control (subtipo 12 / 10, tipo gestión)
+
+# X = longitud radiotap (little endian en [2:4]); fc = [x+0] & 0xFC; deauth o disassoc → accept
+BPF_DEAUTH_RADIOTAP: List[Tuple[int, int, int, int]] = [
+    (0x30, 0, 0, 3),
+    (0x64, 0, 0, 8),
+    (0x07, 0, 0, 0),
+    (0x30, 0, 0, 2),
+    (0x4C, 0, 0, 0),
+    (0x07, 0, 0, 0),
+    (0x50, 0, 0, 0),
+    (0x54, 0, 0, 0xFC),
+    (0x15, 1, 0, _DEAUTH),
+    (0x15, 0, 1, _DISASSOC),
+    (0x06, 0, 0, 0xFFFF),
+    (0x06, 0, 0, 0),
+]
+# Sin radiotap (ARPHRD_IEEE80211): la cabecera 802.11 empieza en el byte 0
+BPF_DEAUTH_80211: List[Tuple[int, int, int, int]] = [
+    (0x30, 0, 0, 0),
+    (0x54, 0, 0, 0xFC),
+    (0x15, 1, 0, _DEAUTH),
+    (0x15, 0, 1, _DISASSOC),
+    (0x06, 0, 0, 0xFFFF),
+    (0x06, 0, 0, 0),
+]
+BPF_DEAUTH_TEXT = "type mgt and (subtype deauth or subtype disassoc)"
+
+
+def _fmt_mac(b: bytes) -> str:
+    return b.hex(":")
+
+
+def iface_linktype(iface: str) -> int:
+    """ARPHRD de la interfaz (803 = radiotap, 801 = 802.11 sin radiotap); 0 si no se sabe."""
+    try:
+        return int(Path(f"/sys/class/net/{iface}/type").read_text().strip())
+    except (OSError, ValueError):
+        return 0
+
+
+class DeauthDetector:
+    """
+    Agrega tramas deauth/disassoc por segundo y por (emisor, BSSID, destino).
+    - threshold: tramas/s de un mismo (emisor, BSSID) que disparan una alerta.
+    - cooldown: segundos sin repetir alerta para el mismo (emisor, BSSID).
+    - max_keys / max_series: topes de memoria (claves distintas / segundos de serie).
+    - on_event: callback con cada alerta estructurada, en cuanto se detecta.
+    """
+
+    def __init__(
+        self,
+        radiotap: bool = True,
+        threshold: int = 10,
+        cooldown: float = 10,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+        max_keys: int = 10000,
+        max_series: int = 86400,
+        max_alerts: int = 1000,
+    ) -> None:
+        self.radiotap = radiotap
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.on_event = on_event
+        self.max_keys = max_keys
+        self.max_series = max_series
+        self.max_alerts = max_alerts
+        self.series: "OrderedDict[int, List[int]]" = OrderedDict()  # segundo → [deauth, disassoc]
+        self.by_key: Dict[Tuple[bytes, bytes, bytes], List[int]] = {}
+        self.alerts: List[str] = []
+        self.counters: Dict[str, int] = {
+            "frames": 0, "deauth": 0, "disassoc": 0, "ignored": 0, "alerts": 0, "keys_overflow": 0,
+        }
+        self._sec = -1
+        self._bucket: List[int] = [0, 0]
+        self._per_sec: Dict[Tuple[bytes, bytes], int] = {}
+        self._last_alert: Dict[Tuple[bytes, bytes], float] = {}
+
+    def _roll(self, sec: int) -> None:
+        self._sec = sec
+        self._per_sec = {}
+        bucket = self.series.get(sec)
+        if bucket is None:
+            bucket = self.series[sec] = [0, 0]
+            while len(self.series) > self.max_series:
+                self.series.popitem(last=False)
+        self._bucket = bucket
+
+    def process_batch(self, batch: Batch) -> None:
+        """Procesa un lote de (ts, trama). Bucle en línea: es la ruta caliente."""
+        c = self.counters
+        by_key = self.by_key
+        radiotap = self.radiotap
+        threshold = self.threshold
+        c["frames"] += len(batch)
+        for ts, frame in batch:
+            off = (frame[2] | (frame[3] << 8)) if radiotap and len(frame) >= 4 else 0
+            if len(frame) < off + 22:
+                c["ignored"] += 1
+                continue
+            fc = frame[off] & 0xFC
+            if fc == _DEAUTH:
+                kind = 0
+                c["deauth"] += 1
+            elif fc == _DISASSOC:
+                kind = 1
+                c["disassoc"] += 1
+            else:
+                c["ignored"] += 1
+                continue
+            target = frame[off + 4:off + 10]
+            tx = frame[off + 10:off + 16]
+            bssid = frame[off + 16:off + 22]
+
+            sec = int(ts)
+            if sec != self._sec:
+                self._roll(sec)
+            self._bucket[kind] += 1
+
+            key = (tx, bssid, target)
+            counts = by_key.get(key)
+            if counts is None:
+                if len(by_key) >= self.max_keys:
+                    c["keys_overflow"] += 1
+                    counts = None
+                else:
+                    counts = by_key[key] = [0, 0]
+            if counts is not None:
+                counts[kind] += 1
+
+            pair = (tx, bssid)
+            n = self._per_sec.get(pair, 0) + 1
+            self._per_sec[pair] = n
+            if n == threshold:
+                self._alert(ts, tx, bssid, target, kind)
+
+    def _alert(self, ts: float, tx: bytes, bssid: bytes, target: bytes, kind: int) -> None:
+        pair = (tx, bssid)
+        if ts - self._last_alert.get(pair, float("-inf")) < self.cooldown:
+            return
+        if len(self._last_alert) >= self.max_keys:
+            self._last_alert.clear()
+        self._last_alert[pair] = ts
+        self.counters["alerts"] += 1
+        what = "deauth" if kind == 0 else "disassoc"
+        dest = "broadcast" if target == BROADCAST else _fmt_mac(target)
+        if len(self.alerts) < self.max_alerts:
+            self.alerts.append(
+                f"Ráfaga {what}: {_fmt_mac(tx)} (BSSID {_fmt_mac(bssid)}) → {dest}, ≥{self.threshold} tramas/s"
+            )
+        if self.on_event is not None:
+            self.on_event({
+                "ts": fmt_ts(ts),
+                "event": "deauth_burst",
+                "kind": what,
+                "transmitter": _fmt_mac(tx),
+                "bssid": _fmt_mac(bssid),
+                "target": _fmt_mac(target),
+                "broadcast": target == BROADCAST,
+                "threshold": self.threshold,  # se emite al alcanzarlo, antes de cerrar el segundo
+            })
+
+    def time_series(self) -> List[Dict[str, Any]]:
+        """Serie por segundo (solo segundos con actividad): [{t, deauth, disassoc}]."""
+        return [
+            {"t": datetime.datetime.fromtimestamp(sec).isoformat(timespec="seconds"), "deauth": d, "disassoc": a}
+            for sec, (d, a) in self.series.items()
+        ]
+
+    def top(self, n: int = 10) -> List[Dict[str, Any]]:
+        """Los n (emisor, BSSID, destino) con más tramas."""
+        ranked = sorted(self.by_key.items(), key=lambda kv: kv[1][0] + kv[1][1], reverse=True)[:n]
+        return [
+            {"transmitter": _fmt_mac(tx), "bssid": _fmt_mac(bssid), "target": _fmt_mac(target),
+             "deauth": d, "disassoc": a}
+            for (tx, bssid, target), (d, a) in ranked
+        ]
+
+    def notes(self) -> List[str]:
+        """Notas resumen para el informe (total + top emisores)."""
+        c = self.counters
+        notes = [f"Deauth frames totales: {c['deauth']} (disassoc: {c['disassoc']})"]
+        by_tx: Dict[bytes, int] = {}
+        for (tx, _, _), (d, a) in self.by_key.items():
+            by_tx[tx] = by_tx.get(tx, 0) + d + a
+        for tx, n in sorted(by_tx.items(), key=lambda x: x[1], reverse=True)[:5]:
+            notes.append(f"Posible emisor de deauth {_fmt_mac(tx)}: {n} frames")
+        if c["deauth"] + c["disassoc"] == 0:
+            notes.append("No se observaron deauth en el periodo.")
+        return notes
+
 
-def detect_deauth(iface: str, minutes: int = 5) -> List[str]:
+def detect_deauth(
+    iface: Optional[str] = None,
+    minutes: float = 5,
+    stats: Optional[Dict[str, Any]] = None,
+    threshold: int = 10,
+    on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    stop: Optional[threading.Event] = None,
+    pcap: Optional[Path] = None,
+) -> List[str]:
     """
-    Captura durante 'minutes' en 'iface' y cuenta tramas deauth.
-    También muestra top emisores (dirección MAC fuente) si los hay.
+    Captura durante 'minutes' en 'iface' (0 = sin límite) o relee 'pcap' con radiotap / 802.11
+    a toda velocidad, y agrega tramas deauth/disassoc.
+    Devuelve notas (total y top emisores). Si se pasa 'stats', recibe contadores,
+    alertas, serie temporal por segundo y top (emisor, BSSID, destino).
 
     Importante:
       - En Windows, el modo monitor no está soportado de forma general con Scapy.
       - En Linux, habilita modo monitor antes (airmon-ng/iw).
     """
-    if platform.system().lower() != "linux":
-        return ["Dectector de deauth solo soportado en Linux con modo monitor."]
-
-    count = {"total": 0}
-    offenders = {}  # mac → nº de deauth observadas
-
-    def handler(pkt):
-        # Un frame de deauth lleva capa Dot11Deauth; Dot11 tiene direcciones MAC.
-        if pkt.haslayer(Dot11Deauth) and pkt.haslayer(Dot11):
-            count["total"] += 1
-            src = pkt[Dot11].addr2 or "desconocido"
-            offenders[src] = offenders.get(src, 0) + 1
-
-    sniff(iface=iface, prn=handler, store=False, timeout=minutes*60)
-
-    # Preparamos notas para el informe
-    notes = [f"Deauth frames totales: {count['total']}"]
-    if offenders:
-        top = sorted(offenders.items(), key=lambda x: x[1], reverse=True)[:5]
-        for mac, c in top:
-            notes.append(f"Posible emisor de deauth {mac}: {c} frames")
-    if count["total"] == 0:
-        notes.append("No se observaron deauth en el periodo.")
-    return notes
+    if pcap is not None:
+        capture: Any = PcapReplay(pcap, {DLT_IEEE802_11_RADIO, DLT_IEEE802_11}, snaplen=128)
+        detector = DeauthDetector(threshold=threshold, on_event=on_event)
+        duration = None
+    else:
+        if platform.system().lower() != "linux":
+            return ["Dectector de deauth solo soportado en Linux con modo monitor."]
+        linktype = iface_linktype(iface)
+        radiotap = linktype != ARPHRD_IEEE80211
+        program = BPF_DEAUTH_RADIOTAP if linktype == ARPHRD_IEEE80211_RADIOTAP else (
+            BPF_DEAUTH_80211 if linktype == ARPHRD_IEEE80211 else None)
+        detector = DeauthDetector(radiotap=radiotap, threshold=threshold, on_event=on_event)
+        capture = LiveCapture(iface, program, BPF_DEAUTH_TEXT, snaplen=128)
+        duration = minutes * 60 if minutes > 0 else None
+    try:
+        with capture:
+            for batch in capture.batches(duration=duration, stop=stop):
+                if pcap is not None:
+                    detector.radiotap = capture.linktype == DLT_IEEE802_11_RADIO
+                detector.process_batch(batch)
+    finally:
+        if stats is not None:
+            stats["counters"] = {**detector.counters, **capture.stats}
+            stats["alerts"] = detector.alerts
+            stats["time_series"] = detector.time_series()
+            stats["top"] = detector.top()
+    return detector.notes()
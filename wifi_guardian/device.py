@@ -0,0 +1,197 @@
+"""
+Registro compacto de dispositivo del inventario.
+
+Sustituye a los dicts {ip, mac, hostname, note} en el camino caliente
+(escaneo → enriquecido → alias → informe):
+  - IP y MAC como enteros (menos memoria que cadenas; ordenar por IP es comparar ints,
+    ver 'sort_key').
+  - Etiquetas, fabricante y alias como campos propios en lugar de texto
+    concatenado en 'note' que luego hay que volver a trocear.
+  - __slots__: sin dict por instancia.
+Sigue comportándose como un mapping de solo lectura con la forma de siempre
+(d["ip"], d.get("note"), dict(d), "alias" in d...), así que baseline, histórico,
+diff y eventos no necesitan cambios; 'to_dict' da el dict/JSON de siempre.
+"""
+
+from __future__ import annotations
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from collections.abc import Mapping
+import socket
+import struct
+
+ALIAS_TAG = "alias:custom"
+VENDOR_PREFIX = "vendor:"
+PRIVATE_TAG = "mac:private"
+
+_IP = struct.Struct("!I")
+
+
+def ip_to_int(ip: str) -> int:
+    """'192.168.1.10' → entero. ValueError si no es una IPv4."""
+    try:
+        return _IP.unpack(socket.inet_aton(ip))[0]
+    except (OSError, TypeError):
+        raise ValueError(f"IPv4 inválida: {ip!r}") from None
+
+
+def int_to_ip(value: int) -> str:
+    return socket.inet_ntoa(_IP.pack(value))
+
+
+def mac_to_int(mac: str) -> Optional[int]:
+    """'aa:bb:cc:dd:ee:ff' / 'AA-BB-...' → entero de 48 bits; None si vacía o inválida."""
+    digits = (mac or "").strip().replace(":", "").replace("-", "")
+    if len(digits) != 12:
+        return None
+    try:
+        return int(digits, 16)
+    except ValueError:
+        return None
+
+
+def int_to_mac(value: Optional[int]) -> str:
+    return "" if value is None else value.to_bytes(6, "big").hex(":")
+
+
+class Device(Mapping):
+    """
+    Dispositivo del inventario.
+    - ip_int / mac_int: IPv4 y MAC como enteros (mac_int=None si no se conoce).
+    - tags: etiquetas en orden de llegada ("icmp+os-arp", "name:extra", "mac:private"...).
+    - vendor: fabricante por OUI ("" si no se conoce).
+    - alias: alias amigable ("" si no tiene).
+    'note' se compone al vuelo con el formato de siempre: tags, "vendor:X" y "alias:custom".
+    """
+
+    __slots__ = ("ip_int", "mac_int", "hostname", "alias", "vendor", "tags")
+
+    def __init__(
+        self,
+        ip: Union[str, int],
+        mac: Union[str, int, None] = "",
+        hostname: str = "",
+        tags: Tuple[str, ...] = (),
+        vendor: str = "",
+        alias: str = "",
+    ) -> None:
+        self.ip_int = ip if isinstance(ip, int) else ip_to_int(ip)
+        self.mac_int = mac if mac is None or isinstance(mac, int) else mac_to_int(mac)
+        self.hostname = hostname or ""
+        self.tags = tuple(tags)
+        self.vendor = vendor or ""
+        self.alias = alias or ""
+
+    # --- Campos derivados ---
+
+    @property
+    def ip(self) -> str:
+        return int_to_ip(self.ip_int)
+
+    @property
+    def mac(self) -> str:
+        return int_to_mac(self.mac_int)
+
+    @property
+    def note(self) -> str:
+        parts = list(self.tags)
+        if self.vendor:
+            parts.append(VENDOR_PREFIX + self.vendor)
+        if self.alias:
+            parts.append(ALIAS_TAG)
+        return ", ".join(parts)
+
+    @property
+    def private_mac(self) -> bool:
+        """MAC 'locally administered' (aleatoria/privada)."""
+        return self.mac_int is not None and bool((self.mac_int >> 40) & 0x02)
+
+    def add_tag(self, tag: str) -> None:
+        self.tags += (tag,)
+
+    # --- Compatibilidad con el dict de siempre ---
+
+    def _keys(self) -> Tuple[str, ...]:
+        return ("ip", "mac", "hostname", "note", "alias") if self.alias else ("ip", "mac", "hostname", "note")
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "ip":
+            return self.ip
+        if key == "mac":
+            return self.mac
+        if key == "hostname":
+            return self.hostname
+        if key == "note":
+            return self.note
+        if key == "alias" and self.alias:
+            return self.alias
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key == "ip":
+            self.ip_int = ip_to_int(value)
+        elif key == "mac":
+            self.mac_int = mac_to_int(value)
+        elif key == "hostname":
+            self.hostname = value or ""
+        elif key == "alias":
+            self.alias = value or ""
+        elif key == "note":
+            self.tags, self.vendor = parse_note(value or "")
+        else:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return 5 if self.alias else 4
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys()
+
+    def __repr__(self) -> str:
+        return f"Device({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Forma de siempre: {ip, mac, hostname, note[, alias]}."""
+        d = {"ip": self.ip, "mac": self.mac, "hostname": self.hostname, "note": self.note}
+        if self.alias:
+            d["alias"] = self.alias
+        return d
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Device":
+        """Desde el dict de siempre; 'note' se separa en tags / vendor (alias:custom lo implica 'alias')."""
+        tags, vendor = parse_note(d.get("note") or "")
+        return cls(d["ip"], d.get("mac") or "", d.get("hostname") or "", tags, vendor, d.get("alias") or "")
+
+
+def parse_note(note: str) -> Tuple[Tuple[str, ...], str]:
+    """'a, vendor:X, alias:custom' → (("a",), "X"); alias:custom se deduce de 'alias'."""
+    tags: List[str] = []
+    vendor = ""
+    for part in note.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if part.lower().startswith(VENDOR_PREFIX):
+            vendor = part[len(VENDOR_PREFIX):].strip()
+        elif part != ALIAS_TAG:
+            tags.append(part)
+    return tuple(tags), vendor
+
+
+def as_device(d: Union[Device, Dict[str, Any]]) -> Device:
+    return d if isinstance(d, Device) else Device.from_dict(d)
+
+
+def sort_key(d: Union[Device, Dict[str, Any]]) -> int:
+    """Clave de orden por IP para Device o dict."""
+    return d.ip_int if isinstance(d, Device) else ip_to_int(d["ip"])
+
+
+def to_json(obj: Any) -> Any:
+    """'default' para json.dumps: serializa Device con la forma de siempre."""
+    if isinstance(obj, Device):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,148 @@
+"""
+Salidas de eventos en streaming (una línea JSON por evento).
+
+Destinos ('--sink'):
+  -                   stdout
+  unix:/ruta.sock     socket Unix de tipo stream (ej. 'socat UNIX-LISTEN:/ruta.sock -')
+  tcp:host:puerto     conexión TCP
+  udp:host:puerto     datagramas UDP (uno por evento)
+  cualquier otra cosa fichero JSONL (se añade al final, flush por evento)
+Un destino caído no detiene el monitor: se descarta el evento y se reintenta
+la conexión como mucho cada 'retry' segundos.
+"""
+
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, TextIO
+from pathlib import Path
+import json
+import socket
+import sys
+import threading
+import time
+
+Emit = Callable[[Dict[str, Any]], None]
+
+
+def to_line(ev: Dict[str, Any]) -> str:
+    return json.dumps(ev, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+class StreamSink:
+    """JSON lines a un fichero de texto abierto (stdout por defecto)."""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream or sys.stdout
+
+    def __call__(self, ev: Dict[str, Any]) -> None:
+        self.stream.write(to_line(ev))
+        self.stream.flush()
+
+    def close(self) -> None:
+        pass
+
+
+class FileSink(StreamSink):
+    """JSON lines añadidas a un fichero (se crea el directorio si falta)."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(path.open("a", encoding="utf-8"))
+
+    def close(self) -> None:
+        self.stream.close()
+
+
+class SocketSink:
+    """JSON lines por socket (unix/tcp/udp) con reconexión perezosa."""
+
+    def __init__(self, family: int, kind: int, address: Any, timeout: float = 0.5, retry: float = 5.0):
+        self.family, self.kind, self.address = family, kind, address
+        self.timeout, self.retry = timeout, retry
+        self.dropped = 0
+        self._sock: Optional[socket.socket] = None
+        self._next_try = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> Optional[socket.socket]:
+        if self._sock is not None:
+            return self._sock
+        now = time.monotonic()
+        if now < self._next_try:
+            return None
+        try:
+            s = socket.socket(self.family, self.kind)
+            s.settimeout(self.timeout)
+            s.connect(self.address)
+            self._sock = s
+        except OSError:
+            self._next_try = now + self.retry
+        return self._sock
+
+    def __call__(self, ev: Dict[str, Any]) -> None:
+        data = to_line(ev).encode("utf-8")
+        with self._lock:
+            s = self._connect()
+            if s is None:
+                self.dropped += 1
+                return
+            try:
+                s.sendall(data)
+            except OSError:
+                self.dropped += 1
+                self._close_sock()
+                self._next_try = time.monotonic() + self.retry
+
+    def _close_sock(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_sock()
+
+
+def _host_port(spec: str) -> tuple:
+    host, _, port = spec.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Destino inválido (se esperaba host:puerto): {spec}")
+    return host.strip("[]"), int(port)
+
+
+def open_sink(spec: str):
+    """Crea el destino descrito por 'spec' (ver cabecera del módulo)."""
+    if spec == "-":
+        return StreamSink()
+    if spec.startswith("unix:"):
+        if not hasattr(socket, "AF_UNIX"):
+            raise ValueError("Sockets Unix no disponibles en esta plataforma")
+        return SocketSink(socket.AF_UNIX, socket.SOCK_STREAM, spec[len("unix:"):])
+    if spec.startswith("tcp:"):
+        return SocketSink(socket.AF_INET, socket.SOCK_STREAM, _host_port(spec[len("tcp:"):]))
+    if spec.startswith("udp:"):
+        return SocketSink(socket.AF_INET, socket.SOCK_DGRAM, _host_port(spec[len("udp:"):]))
+    return FileSink(Path(spec))
+
+
+class Fanout:
+    """Reparte cada evento entre varios destinos; el fallo de uno no afecta al resto."""
+
+    def __init__(self, sinks: List[Any]):
+        self.sinks = list(sinks)
+
+    def __call__(self, ev: Dict[str, Any]) -> None:
+        for sink in self.sinks:
+            try:
+                sink(ev)
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception:
+                pass
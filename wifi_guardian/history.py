@@ -0,0 +1,272 @@
+"""
+Histórico de escaneos en SQLite (solo se añade; un fichero, sin dependencias).
+
+En lugar de guardar la foto completa en cada escaneo se guardan deltas:
+  - devices:   un registro por identidad (MAC; o IP si no hay MAC) con sus
+               últimos metadatos (ip, hostname, alias, note).
+  - presence:  intervalos de presencia [start_scan, end_scan) por dispositivo;
+               end_scan NULL = presente en el último escaneo.
+  - changes:   cambios de metadatos (campo, antes, después) por escaneo.
+  - scans:     un registro por escaneo (ts, origen, segmentos, total).
+Un dispositivo que sigue igual no escribe nada: un año de escaneos por minuto
+solo crece con las altas, bajas y cambios. Índices por MAC, IP, escaneo y
+presencia abierta: el estado actual, "visto por primera/última vez", el % de
+tiempo presente y el diff entre dos escaneos cualesquiera se consultan sin
+leer el histórico entero.
+"""
+
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+import datetime
+import sqlite3
+import time
+
+DEFAULT_HISTORY_FILE = Path(".wg_history.db")
+
+_FIELDS = ("ip", "hostname", "alias", "note")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    source TEXT NOT NULL DEFAULT '',
+    segments TEXT NOT NULL DEFAULT '',
+    total INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS scans_ts ON scans(ts);
+CREATE TABLE IF NOT EXISTS devices (
+    id INTEGER PRIMARY KEY,
+    identity TEXT NOT NULL UNIQUE,
+    mac TEXT NOT NULL DEFAULT '',
+    ip TEXT NOT NULL DEFAULT '',
+    hostname TEXT NOT NULL DEFAULT '',
+    alias TEXT NOT NULL DEFAULT '',
+    note TEXT NOT NULL DEFAULT '',
+    first_scan INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS devices_mac ON devices(mac);
+CREATE INDEX IF NOT EXISTS devices_ip ON devices(ip);
+CREATE TABLE IF NOT EXISTS presence (
+    device_id INTEGER NOT NULL,
+    start_scan INTEGER NOT NULL,
+    end_scan INTEGER
+);
+CREATE INDEX IF NOT EXISTS presence_device ON presence(device_id, start_scan);
+CREATE INDEX IF NOT EXISTS presence_open ON presence(device_id) WHERE end_scan IS NULL;
+CREATE INDEX IF NOT EXISTS presence_range ON presence(start_scan, end_scan);
+CREATE TABLE IF NOT EXISTS changes (
+    scan_id INTEGER NOT NULL,
+    device_id INTEGER NOT NULL,
+    field TEXT NOT NULL,
+    old TEXT NOT NULL,
+    new TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS changes_device ON changes(device_id, scan_id);
+CREATE INDEX IF NOT EXISTS changes_ip ON changes(field, new);
+"""
+
+
+def identity_of(d: Dict[str, Any]) -> str:
+    """Clave estable del dispositivo: la MAC; si no la hay (solo ICMP), la IP."""
+    mac = (d.get("mac") or "").lower()
+    return mac if mac else f"ip:{d.get('ip', '')}"
+
+
+def _iso(ts: Optional[float]) -> str:
+    return datetime.datetime.fromtimestamp(ts).isoformat(timespec="seconds") if ts else ""
+
+
+class HistoryStore:
+    """
+    Acceso al histórico. Uso:
+        with HistoryStore(path) as h:
+            scan_id = h.record_scan(devices, source="scan")
+            added, removed = h.diff(scan_id - 1, scan_id)
+    """
+
+    def __init__(self, path: Path = DEFAULT_HISTORY_FILE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> "HistoryStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---------- escritura ----------
+
+    def record_scan(
+        self,
+        devices: List[Dict[str, Any]],
+        ts: Optional[float] = None,
+        source: str = "scan",
+        segments: str = "",
+    ) -> int:
+        """
+        Añade un escaneo como delta frente al estado actual (presencias abiertas):
+        altas, bajas y cambios de metadatos. Devuelve el id del escaneo.
+        Se asume que 'devices' es el inventario completo (igual que el baseline).
+        """
+        incoming: Dict[str, Dict[str, Any]] = {}
+        for d in devices:
+            incoming[identity_of(d)] = d
+        with self.db:
+            cur = self.db.execute(
+                "INSERT INTO scans(ts, source, segments, total) VALUES (?, ?, ?, ?)",
+                (ts or time.time(), source, segments, len(incoming)),
+            )
+            scan_id = int(cur.lastrowid)
+            open_rows = {
+                r["identity"]: r
+                for r in self.db.execute(
+                    "SELECT d.* FROM presence p JOIN devices d ON d.id = p.device_id WHERE p.end_scan IS NULL"
+                )
+            }
+            # Bajas: presentes en el estado actual y ausentes ahora
+            gone = [(scan_id, open_rows[k]["id"]) for k in open_rows.keys() - incoming.keys()]
+            self.db.executemany("UPDATE presence SET end_scan = ? WHERE device_id = ? AND end_scan IS NULL", gone)
+
+            for key, d in incoming.items():
+                row = open_rows.get(key)
+                if row is None:
+                    row = self.db.execute("SELECT * FROM devices WHERE identity = ?", (key,)).fetchone()
+                    if row is None:
+                        cur = self.db.execute(
+                            "INSERT INTO devices(identity, mac, ip, hostname, alias, note, first_scan) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (key, (d.get("mac") or "").lower(), *(d.get(f) or "" for f in _FIELDS), scan_id),
+                        )
+                        self.db.execute("INSERT INTO presence(device_id, start_scan) VALUES (?, ?)",
+                                        (cur.lastrowid, scan_id))
+                        continue
+                    self.db.execute("INSERT INTO presence(device_id, start_scan) VALUES (?, ?)", (row["id"], scan_id))
+                self._record_changes(scan_id, row, d)
+        return scan_id
+
+    def _record_changes(self, scan_id: int, row: sqlite3.Row, d: Dict[str, Any]) -> None:
+        changed = [(f, row[f], d.get(f) or "") for f in _FIELDS if (d.get(f) or "") != row[f]]
+        if not changed:
+            return
+        self.db.executemany(
+            "INSERT INTO changes(scan_id, device_id, field, old, new) VALUES (?, ?, ?, ?, ?)",
+            [(scan_id, row["id"], f, old, new) for f, old, new in changed],
+        )
+        self.db.execute(
+            f"UPDATE devices SET {', '.join(f'{f} = ?' for f, _, _ in changed)} WHERE id = ?",
+            (*(new for _, _, new in changed), row["id"]),
+        )
+
+    # ---------- consultas ----------
+
+    def last_scan_id(self) -> Optional[int]:
+        row = self.db.execute("SELECT MAX(id) FROM scans").fetchone()
+        return row[0]
+
+    def scans(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Últimos escaneos (más reciente primero)."""
+        rows = self.db.execute("SELECT * FROM scans ORDER BY id DESC LIMIT ?", (limit,))
+        return [{**dict(r), "ts": _iso(r["ts"])} for r in rows]
+
+    def current(self) -> List[Dict[str, Any]]:
+        """Dispositivos presentes en el último escaneo (solo presencias abiertas)."""
+        rows = self.db.execute(
+            "SELECT d.* FROM presence p JOIN devices d ON d.id = p.device_id WHERE p.end_scan IS NULL"
+        )
+        return [self._device_dict(r) for r in rows]
+
+    def snapshot(self, scan_id: int) -> List[Dict[str, Any]]:
+        """Dispositivos presentes en 'scan_id' (metadatos: los últimos conocidos)."""
+        rows = self.db.execute(
+            "SELECT d.* FROM presence p JOIN devices d ON d.id = p.device_id "
+            "WHERE p.start_scan <= ? AND (p.end_scan IS NULL OR p.end_scan > ?)",
+            (scan_id, scan_id),
+        )
+        return [self._device_dict(r) for r in rows]
+
+    def diff(self, a: int, b: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """(altas, bajas) entre los escaneos 'a' y 'b' (cualesquiera, no solo consecutivos)."""
+        sa = {identity_of(d): d for d in self.snapshot(a)}
+        sb = {identity_of(d): d for d in self.snapshot(b)}
+        return [sb[k] for k in sb.keys() - sa.keys()], [sa[k] for k in sa.keys() - sb.keys()]
+
+    def find(self, mac: str = "", ip: str = "") -> List[Dict[str, Any]]:
+        """
+        Dispositivos por MAC o por IP (la actual o cualquiera que haya tenido),
+        con first_seen, last_seen, present y uptime (fracción de escaneos presente).
+        """
+        if mac:
+            rows = self.db.execute("SELECT * FROM devices WHERE mac = ?", (mac.lower(),)).fetchall()
+        else:
+            rows = self.db.execute(
+                "SELECT * FROM devices WHERE ip = ? OR id IN "
+                "(SELECT device_id FROM changes WHERE field = 'ip' AND (new = ? OR old = ?))",
+                (ip, ip, ip),
+            ).fetchall()
+        return [self.device_info(r["id"]) for r in rows]
+
+    def device_info(self, device_id: int, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, Any]:
+        """Ficha del dispositivo: metadatos, primera/última vez visto, uptime y cambios."""
+        row = self.db.execute("SELECT * FROM devices WHERE id = ?", (device_id,)).fetchone()
+        last = self.last_scan_id() or 0
+        intervals = self.db.execute(
+            "SELECT start_scan, end_scan FROM presence WHERE device_id = ? ORDER BY start_scan", (device_id,)
+        ).fetchall()
+        first_ts = self._scan_ts(intervals[0]["start_scan"]) if intervals else None
+        tail = intervals[-1] if intervals else None
+        present = bool(tail) and tail["end_scan"] is None
+        if present:
+            last_seen = self._scan_ts(last)
+        elif tail:
+            prev = self.db.execute("SELECT MAX(id) FROM scans WHERE id < ?", (tail["end_scan"],)).fetchone()[0]
+            last_seen = self._scan_ts(prev)
+        else:
+            last_seen = None
+        changes = self.db.execute(
+            "SELECT c.field, c.old, c.new, s.ts FROM changes c JOIN scans s ON s.id = c.scan_id "
+            "WHERE c.device_id = ? ORDER BY c.scan_id DESC LIMIT 20",
+            (device_id,),
+        )
+        return {
+            **self._device_dict(row),
+            "first_seen": _iso(first_ts),
+            "last_seen": _iso(last_seen),
+            "present": present,
+            "uptime": round(self.uptime(device_id, since, until), 4),
+            "intervals": len(intervals),
+            "changes": [{**dict(c), "ts": _iso(c["ts"])} for c in changes],
+        }
+
+    def uptime(self, device_id: int, since: Optional[float] = None, until: Optional[float] = None) -> float:
+        """Fracción de escaneos (en [since, until]) en los que el dispositivo estaba presente."""
+        lo = since if since is not None else 0.0
+        hi = until if until is not None else float("inf")
+        total = self.db.execute("SELECT COUNT(*) FROM scans WHERE ts >= ? AND ts <= ?", (lo, hi)).fetchone()[0]
+        if not total:
+            return 0.0
+        seen = self.db.execute(
+            "SELECT COUNT(*) FROM presence p JOIN scans s "
+            "ON s.id >= p.start_scan AND (p.end_scan IS NULL OR s.id < p.end_scan) "
+            "WHERE p.device_id = ? AND s.ts >= ? AND s.ts <= ?",
+            (device_id, lo, hi),
+        ).fetchone()[0]
+        return seen / total
+
+    def _scan_ts(self, scan_id: Optional[int]) -> Optional[float]:
+        if scan_id is None:
+            return None
+        row = self.db.execute("SELECT ts FROM scans WHERE id = ?", (scan_id,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _device_dict(r: sqlite3.Row) -> Dict[str, Any]:
+        return {"id": r["id"], "mac": r["mac"], **{f: r[f] for f in _FIELDS}}
@@ -3,27 +3,44 @@ Estrategias extra para resolver nombres de host cuando DNS inverso falla.
 - Windows: 'nbtstat -A <ip>' (NetBIOS)
 - Linux/macOS: 'getent hosts <ip>' o 'avahi-resolve -a <ip>' si está disponible
 Todas las llamadas son 'best-effort': si fallan, devolvemos "".
+
+'resolve_many' resuelve muchas IPs a la vez con hilos daemon acotados,
+con plazo por host y plazo global (ambos se cumplen aunque gethostbyaddr se cuelgue).
 """
 
 import platform
+import queue
 import subprocess
 import re
-from typing import Optional
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from .profiling import count, observe, timed
+from .utils import try_reverse_dns
+
+# Margen sobre 'per_host_timeout' antes de abandonar una IP (las estrategias extra ya
+# respetan el plazo; lo que se pasa de largo es la DNS inversa)
+HOST_GRACE = 0.5
 
-def _run(cmd: list[str]) -> str:
+def _run(cmd: list[str], timeout: float = 3) -> str:
+    t0 = time.monotonic()
+    count("namer.subprocess")
     try:
-        out = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="ignore", timeout=3)
+        out = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="ignore", timeout=timeout)
         return out.stdout or ""
     except Exception:
         return ""
+    finally:
+        observe(f"namer.exec.{cmd[0]}", time.monotonic() - t0)
 
-def resolve_extra(ip: str) -> str:
+def resolve_extra(ip: str, timeout: float = 3) -> str:
     osname = platform.system().lower()
 
     if "windows" in osname:
         # nbtstat -A <ip> devuelve un bloque con nombres NetBIOS
         # Buscamos la primera línea con <nombre> <TIPO> <ESTADO>
-        text = _run(["nbtstat", "-A", ip])
+        text = _run(["nbtstat", "-A", ip], timeout=timeout)
         # Ejemplos de línea (ES): "Nombre de nodo           Tipo         Estado"
         # Buscamos líneas con el nombre y <00> o similar
         for line in text.splitlines():
@@ -38,7 +55,8 @@ def resolve_extra(ip: str) -> str:
 
     # Linux / macOS
     # 1) getent hosts <ip>
-    text = _run(["getent", "hosts", ip])
+    deadline = time.monotonic() + timeout
+    text = _run(["getent", "hosts", ip], timeout=timeout)
     # Formato típico: "192.168.1.10   hostname.local"
     m = re.search(r"\b([A-Za-z0-9\-\_\.]+)\b\s*$", text.strip(), re.MULTILINE)
     if m:
@@ -47,7 +65,10 @@ def resolve_extra(ip: str) -> str:
             return name
 
     # 2) avahi-resolve -a <ip>  → "ip\tname.local"
-    text = _run(["avahi-resolve", "-a", ip])
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        return ""
+    text = _run(["avahi-resolve", "-a", ip], timeout=remaining)
     m = re.search(r"\b([A-Za-z0-9\-\_\.]+)\b\s*$", text.strip(), re.MULTILINE)
     if m:
         name = m.group(1)
@@ -55,3 +76,101 @@ def resolve_extra(ip: str) -> str:
             return name
 
     return ""
+
+
+def resolve_name(ip: str, timeout: float = 3, mac: str = "") -> Tuple[str, str]:
+    """
+    DNS inversa y, si no hay nombre, estrategias extra dentro del plazo 'timeout'.
+    Devuelve (nombre, origen) con origen "dns", "extra" o "" si no se resolvió.
+    """
+    start = time.monotonic()
+    name = try_reverse_dns(ip, mac)
+    after_dns = time.monotonic()
+    observe("namer.reverse_dns", after_dns - start)
+    if name:
+        observe("namer.resolve_name", after_dns - start)
+        return name, "dns"
+    remaining = timeout - (after_dns - start)
+    if remaining <= 0:
+        observe("namer.resolve_name", after_dns - start)
+        return "", ""
+    name = resolve_extra(ip, timeout=remaining)
+    end = time.monotonic()
+    observe("namer.resolve_extra", end - after_dns)
+    observe("namer.resolve_name", end - start)
+    return (name, "extra") if name else ("", "")
+
+@timed("namer.resolve_many")
+def resolve_many(
+    ips: Iterable[str],
+    workers: int = 32,
+    per_host_timeout: float = 3,
+    deadline: float = 15,
+    macs: Optional[Dict[str, str]] = None,
+) -> Dict[str, Tuple[str, str]]:
+    """
+    Resuelve en paralelo cada IP (una sola vez) con 'resolve_name'.
+    Devuelve {ip: (nombre, origen)} para las IPs terminadas antes de 'deadline' (s);
+    ("", "") indica que se intentó y no hubo nombre. Las IPs ausentes agotaron el plazo.
+    'macs' (ip -> mac) se usa como parte de la clave de la caché.
+
+    Los hilos son daemon y nadie los espera: gethostbyaddr no admite timeout, así que
+    una IP que supera 'per_host_timeout' se abandona (su hilo se sustituye por otro
+    para que la cola siga avanzando) y a 'deadline' se vuelve sí o sí, sin que los
+    rezagados retrasen la salida del proceso.
+    """
+    unique = list(dict.fromkeys(ip for ip in ips if ip))
+    if not unique:
+        return {}
+    macs = macs or {}
+    todo: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+    for ip in unique:
+        todo.put(ip)
+    results: Dict[str, Tuple[str, str]] = {}
+    running: Dict[str, float] = {}  # ip -> inicio, solo las que están en curso
+    cond = threading.Condition()
+    left = len(unique)
+
+    def worker() -> None:
+        nonlocal left
+        while True:
+            try:
+                ip = todo.get_nowait()
+            except queue.Empty:
+                return
+            with cond:
+                running[ip] = time.monotonic()
+            try:
+                res: Optional[Tuple[str, str]] = resolve_name(ip, per_host_timeout, macs.get(ip, ""))
+            except Exception:
+                res = None
+            with cond:
+                if running.pop(ip, None) is None:
+                    return  # abandonada por el plazo: otro hilo ocupa ya este puesto
+                if res is not None:
+                    results[ip] = res
+                left -= 1
+                cond.notify()
+
+    def spawn() -> None:
+        threading.Thread(target=worker, name="wg-namer", daemon=True).start()
+
+    for _ in range(max(1, min(workers, len(unique)))):
+        spawn()
+
+    limit = time.monotonic() + deadline
+    host_limit = per_host_timeout + HOST_GRACE
+    with cond:
+        while left > 0:
+            now = time.monotonic()
+            if now >= limit:
+                break
+            for ip, t in list(running.items()):
+                if now - t >= host_limit:
+                    del running[ip]
+                    left -= 1
+                    spawn()
+            if left > 0:
+                wake = min((t + host_limit for t in running.values()), default=limit)
+                cond.wait(max(0.01, min(limit, wake) - now))
+        return dict(results)
@@ -0,0 +1,287 @@
+"""
+Tabla de vecinos (ARP) del sistema sin lanzar procesos ('ip neigh' / 'arp -a').
+
+Linux:
+  - rtnetlink RTM_GETNEIGH: volcado de la tabla con el estado NUD de cada entrada
+    (REACHABLE, STALE, FAILED...), en una sola llamada y sin regex.
+  - /proc/net/arp como alternativa (sin estado NUD: solo completa / incompleta).
+  - NeighborWatch: suscripción a los eventos RTM_NEWNEIGH del kernel para esperar
+    a que se resuelvan unas IPs concretas en lugar de dormir un tiempo fijo.
+Resto de plataformas: available() es False y el llamador usa su camino de siempre.
+"""
+
+from __future__ import annotations
+from typing import Dict, Iterable, List, NamedTuple, Set
+from pathlib import Path
+import select
+import socket
+import struct
+import sys
+import time
+
+NETLINK_ROUTE = 0
+RTMGRP_NEIGH = 0x4
+RTM_NEWNEIGH, RTM_DELNEIGH, RTM_GETNEIGH = 28, 29, 30
+NLM_F_REQUEST, NLM_F_DUMP = 0x1, 0x300
+NLMSG_ERROR, NLMSG_DONE = 2, 3
+NDA_DST, NDA_LLADDR = 1, 2
+
+# Estados NUD (include/uapi/linux/neighbour.h)
+NUD_INCOMPLETE = 0x01
+NUD_REACHABLE = 0x02
+NUD_STALE = 0x04
+NUD_DELAY = 0x08
+NUD_PROBE = 0x10
+NUD_FAILED = 0x20
+NUD_NOARP = 0x40
+NUD_PERMANENT = 0x80
+NUD_NAMES = {
+    NUD_INCOMPLETE: "INCOMPLETE", NUD_REACHABLE: "REACHABLE", NUD_STALE: "STALE", NUD_DELAY: "DELAY",
+    NUD_PROBE: "PROBE", NUD_FAILED: "FAILED", NUD_NOARP: "NOARP", NUD_PERMANENT: "PERMANENT",
+}
+# Con MAC válida: la resolución ARP terminó (aunque luego envejezca a STALE)
+NUD_VALID = NUD_REACHABLE | NUD_STALE | NUD_DELAY | NUD_PROBE | NUD_PERMANENT | NUD_NOARP
+
+_NLMSGHDR = struct.Struct("=LHHLL")   # len, type, flags, seq, pid
+_NDMSG = struct.Struct("=BBHiHBB")    # family, pad1, pad2, ifindex, state, flags, type
+_RTATTR = struct.Struct("=HH")        # len, type
+
+PROC_ARP = Path("/proc/net/arp")
+ATF_COM = 0x02  # /proc/net/arp: entrada completa
+
+
+class Neighbor(NamedTuple):
+    ip: str
+    mac: str       # "" si aún no hay MAC (INCOMPLETE / FAILED)
+    state: int     # NUD_* (0 si no se conoce, p. ej. desde /proc/net/arp)
+    ifindex: int
+
+    @property
+    def state_name(self) -> str:
+        return NUD_NAMES.get(self.state, str(self.state))
+
+    @property
+    def resolved(self) -> bool:
+        return bool(self.mac) and (self.state == 0 or bool(self.state & NUD_VALID))
+
+
+def available() -> bool:
+    """True si hay rtnetlink (Linux)."""
+    return sys.platform.startswith("linux") and hasattr(socket, "AF_NETLINK")
+
+
+def _parse(data: bytes) -> Iterable[Neighbor]:
+    """Mensajes RTM_NEWNEIGH (IPv4) de un buffer de netlink. Para en NLMSG_DONE."""
+    off = 0
+    while off + _NLMSGHDR.size <= len(data):
+        length, kind, _, _, _ = _NLMSGHDR.unpack_from(data, off)
+        if length < _NLMSGHDR.size:
+            return
+        if kind == NLMSG_DONE:
+            return
+        if kind == NLMSG_ERROR:
+            (err,) = struct.unpack_from("=i", data, off + _NLMSGHDR.size)
+            if err:
+                raise OSError(-err, "netlink RTM_GETNEIGH")
+        elif kind in (RTM_NEWNEIGH, RTM_DELNEIGH):
+            family, _, _, ifindex, state, _, _ = _NDMSG.unpack_from(data, off + _NLMSGHDR.size)
+            if family == socket.AF_INET:
+                ip = mac = ""
+                a = off + _NLMSGHDR.size + _NDMSG.size
+                end = off + length
+                while a + _RTATTR.size <= end:
+                    alen, atype = _RTATTR.unpack_from(data, a)
+                    if alen < _RTATTR.size:
+                        break
+                    value = data[a + _RTATTR.size:a + alen]
+                    if atype == NDA_DST and len(value) == 4:
+                        ip = socket.inet_ntoa(value)
+                    elif atype == NDA_LLADDR and len(value) == 6 and value != b"\x00" * 6:
+                        mac = value.hex(":")
+                    a += (alen + 3) & ~3
+                if ip:
+                    # Una baja se trata como FAILED: la entrada ya no sirve
+                    yield Neighbor(ip, mac if kind == RTM_NEWNEIGH else "",
+                                   state if kind == RTM_NEWNEIGH else NUD_FAILED, ifindex)
+        off += (length + 3) & ~3
+
+
+def _dump_request(seq: int = 1) -> bytes:
+    body = _NDMSG.pack(socket.AF_INET, 0, 0, 0, 0, 0, 0)
+    return _NLMSGHDR.pack(_NLMSGHDR.size + len(body), RTM_GETNEIGH, NLM_F_REQUEST | NLM_F_DUMP, seq, 0) + body
+
+
+def _dump(sock: socket.socket, timeout: float = 2.0) -> List[Neighbor]:
+    """Volcado RTM_GETNEIGH por 'sock' (ya abierto); lee hasta NLMSG_DONE."""
+    sock.sendto(_dump_request(), (0, 0))
+    out: List[Neighbor] = []
+    deadline = time.monotonic() + timeout
+    while True:
+        left = deadline - time.monotonic()
+        if left <= 0 or not select.select([sock], [], [], left)[0]:
+            raise TimeoutError("netlink RTM_GETNEIGH sin respuesta")
+        data = sock.recv(1 << 16)
+        out.extend(_parse(data))
+        if _has_done(data):
+            return out
+
+
+def _has_done(data: bytes) -> bool:
+    off = 0
+    while off + _NLMSGHDR.size <= len(data):
+        length, kind, _, _, _ = _NLMSGHDR.unpack_from(data, off)
+        if kind == NLMSG_DONE:
+            return True
+        if length < _NLMSGHDR.size:
+            return False
+        off += (length + 3) & ~3
+    return False
+
+
+def dump_neighbors() -> List[Neighbor]:
+    """Tabla de vecinos IPv4 vía rtnetlink (con estado NUD)."""
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE) as sock:
+        sock.bind((0, 0))
+        return _dump(sock)
+
+
+def read_proc_arp(path: Path = PROC_ARP) -> List[Neighbor]:
+    """Tabla ARP desde /proc/net/arp (sin estado NUD; MAC "" si la entrada está incompleta)."""
+    out: List[Neighbor] = []
+    with open(path, encoding="ascii", errors="ignore") as fh:
+        next(fh, None)  # cabecera
+        for line in fh:
+            parts = line.split()
+            if len(parts) < 6:
+                continue
+            complete = int(parts[2], 16) & ATF_COM
+            out.append(Neighbor(parts[0], parts[3].lower() if complete else "", 0 if complete else NUD_INCOMPLETE, 0))
+    return out
+
+
+def read_table() -> Dict[str, str]:
+    """{ip: mac} de las entradas resueltas (netlink y, si falla, /proc/net/arp)."""
+    try:
+        entries = dump_neighbors()
+    except (OSError, TimeoutError):
+        entries = read_proc_arp()
+    return {n.ip: n.mac for n in entries if n.resolved}
+
+
+class NeighborWatch:
+    """
+    Suscripción a los eventos de vecinos del kernel (grupo RTMGRP_NEIGH).
+    Uso: abrir ANTES de generar el tráfico que dispara ARP, y después 'wait(ips)':
+
+        with NeighborWatch() as watch:
+            for ip in ips: tocar(ip)
+            macs = watch.wait(ips, timeout=2)
+
+    'wait' vuelve en cuanto todas las IPs tienen un estado final (MAC resuelta o
+    FAILED) o vence el plazo; así no se duerme de más en redes rápidas ni de menos
+    en redes lentas.
+    Para intercalarlo con otro bucle (p. ej. el "touch" TCP de touch.py): 'expect(ips)',
+    registrar el watch en un selector (tiene fileno()), 'drain()' cuando sea legible
+    y 'done(ip)' para saber si una IP ya no necesita más tráfico.
+    """
+
+    def __init__(self, rcvbuf: int = 1 << 20) -> None:
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        except OSError:
+            pass
+        self.sock.bind((0, RTMGRP_NEIGH))
+        self.stats: Dict[str, int] = {"events": 0, "resolved": 0, "failed": 0}
+        self.found: Dict[str, str] = {}   # ip -> mac de las IPs esperadas ya resueltas
+        self._pending: Set[str] = set()
+        self._failed: Set[str] = set()
+
+    def __enter__(self) -> "NeighborWatch":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.sock.close()
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def done(self, ip: str) -> bool:
+        """True si 'ip' ya tiene estado final (MAC resuelta o FAILED)."""
+        return ip in self.found or ip in self._failed
+
+    def _take(self, n: Neighbor) -> bool:
+        """Aplica una entrada; True si con ella una IP esperada queda resuelta o FAILED."""
+        if n.ip not in self._pending:
+            return False
+        if n.resolved:
+            self.found[n.ip] = n.mac
+            self.stats["resolved"] += 1
+        elif n.state & NUD_FAILED:
+            self._failed.add(n.ip)
+            self.stats["failed"] += 1
+        else:
+            return False
+        self._pending.discard(n.ip)
+        return True
+
+    def _refresh(self) -> List[str]:
+        """Pasada por la tabla completa (eventos perdidos o entradas ya resueltas)."""
+        try:
+            entries = dump_neighbors()
+        except (OSError, TimeoutError):
+            try:
+                entries = read_proc_arp()
+            except OSError:
+                return []
+        return [n.ip for n in entries if self._take(n)]
+
+    def expect(self, ips: Iterable[str]) -> List[str]:
+        """
+        Añade IPs a esperar y toma las que ya estén en la tabla (el barrido ICMP
+        suele haber resuelto muchas). Devuelve las que ya tienen estado final.
+        """
+        new = [ip for ip in ips if ip not in self._pending and not self.done(ip)]
+        if not new:
+            return []
+        self._pending.update(new)
+        return self._refresh()
+
+    def drain(self) -> List[str]:
+        """
+        Procesa los eventos ya recibidos, sin bloquear. Devuelve las IPs esperadas
+        que acaban de quedar resueltas o FAILED.
+        """
+        settled: List[str] = []
+        while True:
+            try:
+                data = self.sock.recv(1 << 16, socket.MSG_DONTWAIT)
+            except (BlockingIOError, InterruptedError):
+                return settled
+            except OSError:  # ENOBUFS: se perdieron eventos; se recuperan del volcado
+                return settled + self._refresh()
+            for n in _parse(data):
+                self.stats["events"] += 1
+                if self._take(n):
+                    settled.append(n.ip)
+
+    def wait(self, ips: Iterable[str] = (), timeout: float = 2.0) -> Dict[str, str]:
+        """
+        Espera a que se resuelvan 'ips' (y las ya pasadas a 'expect'). Devuelve
+        {ip: mac} de las resueltas, incluidas las que ya estaban en la tabla.
+        """
+        self.expect(ips)
+        deadline = time.monotonic() + timeout
+        while self._pending:
+            left = deadline - time.monotonic()
+            if left <= 0 or not select.select([self.sock], [], [], left)[0]:
+                break
+            self.drain()
+
+        if self._pending:
+            # Última pasada: eventos perdidos o entradas que no cambiaron de estado
+            self._refresh()
+        return dict(self.found)
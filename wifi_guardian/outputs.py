@@ -0,0 +1,142 @@
+"""
+Salidas legibles por máquina del informe, junto al HTML (o en su lugar con --no-html).
+
+Formatos ('--output', repetible):
+  jsonl   report-<stamp>.jsonl: una línea "summary", una por dispositivo y una por anomalía
+  csv     report-<stamp>.csv: inventario (ip, mac, hostname, alias, vendor, private_mac, note)
+  prom    wifi_guardian_<modo>.prom: textfile collector de node-exporter (nombre fijo,
+          se sobrescribe en cada ejecución; un fichero por modo para no pisarse)
+Todas se escriben en un .tmp y se renombran: quien lea (node-exporter, un tail, un
+ETL) nunca ve un fichero a medias.
+"""
+
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from pathlib import Path
+import csv
+import datetime
+import json
+import os
+import time
+
+from .device import as_device, to_json
+from .profiling import timed
+
+FORMATS = ("jsonl", "csv", "prom")
+
+
+def _atomic_write(path: Path, write: Callable[[Any], None], newline: Optional[str] = None) -> Path:
+    """Escribe con 'write(fh)' en <path>.tmp y lo renombra a 'path'."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8", newline=newline) as fh:
+            write(fh)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+    return path
+
+
+def _device_row(d: Dict[str, Any]) -> Dict[str, Any]:
+    dev = as_device(d)
+    return {
+        "ip": dev.ip, "mac": dev.mac, "hostname": dev.hostname, "alias": dev.alias,
+        "vendor": dev.vendor, "private_mac": dev.private_mac, "note": dev.note,
+    }
+
+
+def write_jsonl(path: Path, mode: str, summary: Dict[str, Any], devices: Iterable[Dict[str, Any]],
+                anomalies: List[str]) -> Path:
+    def write(fh) -> None:
+        dumps = json.dumps
+        fh.write(dumps({"type": "summary", "mode": mode, **summary}, ensure_ascii=False,
+                       separators=(",", ":"), default=to_json) + "\n")
+        for d in devices:
+            fh.write(dumps({"type": "device", **_device_row(d)}, ensure_ascii=False, separators=(",", ":")) + "\n")
+        for a in anomalies:
+            fh.write(dumps({"type": "anomaly", "message": a}, ensure_ascii=False, separators=(",", ":")) + "\n")
+    return _atomic_write(path, write)
+
+
+CSV_FIELDS = ("ip", "mac", "hostname", "alias", "vendor", "private_mac", "note")
+
+
+def write_csv(path: Path, devices: Iterable[Dict[str, Any]]) -> Path:
+    def write(fh) -> None:
+        w = csv.DictWriter(fh, fieldnames=CSV_FIELDS)
+        w.writeheader()
+        for d in devices:
+            w.writerow(_device_row(d))
+    return _atomic_write(path, write, newline="")
+
+
+def _n(value: Any) -> int:
+    """Longitud de una lista del resumen (o el número tal cual)."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    return len(value or [])
+
+
+def prom_metrics(mode: str, summary: Dict[str, Any], anomalies: List[str], now: Optional[float] = None) -> str:
+    """Texto en formato de exposición de Prometheus (node-exporter textfile collector)."""
+    metrics = []
+    if "total_devices" in summary:
+        # Solo en modos de inventario (scan / passive); watch-arp y deauth no tienen dispositivos
+        metrics += [
+            ("devices", "Dispositivos en el inventario", summary["total_devices"]),
+            ("devices_new", "Dispositivos nuevos respecto al baseline", _n(summary.get("added_since_baseline"))),
+            ("devices_removed", "Dispositivos ausentes respecto al baseline", _n(summary.get("removed_since_baseline"))),
+            ("devices_moved_ip", "Dispositivos que cambiaron de IP (misma MAC)", _n(summary.get("moved_ip"))),
+            ("devices_mac_changed", "IPs ocupadas por otra MAC", _n(summary.get("mac_changed"))),
+        ]
+    metrics += [
+        ("anomalies", "Anomalías del informe", len(anomalies)),
+        ("run_duration_seconds", "Duración de la ejecución", summary.get("elapsed_s", 0) or 0),
+        ("last_run_timestamp_seconds", "Fin de la última ejecución (epoch)", round(now or time.time(), 3)),
+    ]
+    lines: List[str] = []
+    for name, help_text, value in metrics:
+        lines.append(f"# HELP wifi_guardian_{name} {help_text}")
+        lines.append(f"# TYPE wifi_guardian_{name} gauge")
+        lines.append(f'wifi_guardian_{name}{{mode="{mode}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prom(path: Path, mode: str, summary: Dict[str, Any], anomalies: List[str]) -> Path:
+    text = prom_metrics(mode, summary, anomalies)
+    return _atomic_write(path, lambda fh: fh.write(text))
+
+
+@timed("report.outputs")
+def write_outputs(
+    report_dir: Path,
+    formats: Iterable[str],
+    mode: str,
+    summary: Dict[str, Any],
+    devices: List[Dict[str, Any]],
+    anomalies: List[str],
+    stamp: Optional[str] = None,
+    textfile_dir: Optional[Path] = None,
+) -> List[Path]:
+    """
+    Escribe los formatos pedidos (ver cabecera). 'stamp' enlaza los nombres con el
+    informe HTML de la misma ejecución; 'textfile_dir' es el directorio del textfile
+    collector (por defecto, report_dir). Devuelve las rutas escritas.
+    """
+    stamp = stamp or datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    out: List[Path] = []
+    for fmt in dict.fromkeys(formats):
+        if fmt == "jsonl":
+            out.append(write_jsonl(report_dir / f"report-{stamp}.jsonl", mode, summary, devices, anomalies))
+        elif fmt == "csv":
+            out.append(write_csv(report_dir / f"report-{stamp}.csv", devices))
+        elif fmt == "prom":
+            out.append(write_prom((textfile_dir or report_dir) / f"wifi_guardian_{mode}.prom", mode, summary, anomalies))
+        else:
+            raise ValueError(f"Formato de salida desconocido: {fmt} (válidos: {', '.join(FORMATS)})")
+    return out
@@ -0,0 +1,207 @@
+"""
+Inventario pasivo: descubre dispositivos solo escuchando (sin enviar nada).
+
+Fuentes observadas:
+  - ARP (requests y replies): IP y MAC del emisor.
+  - DHCP (cliente → servidor): MAC, IP solicitada/asignada y hostname (opción 12).
+  - mDNS (respuestas con registros A): nombre '.local' e IP.
+  - NBNS (registros/respuestas NetBIOS): nombre e IP.
+También puede releer un pcap/pcapng (Ethernet) en lugar de escuchar en vivo.
+Produce los mismos dicts de dispositivo (ip, mac, hostname, note) que el
+escaneo activo, listos para 'finalize', alias y diff con baseline.
+"""
+
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+from pathlib import Path
+import ipaddress
+
+from scapy.all import ARP, Ether, IP, UDP, sniff  # type: ignore
+from scapy.layers.dhcp import BOOTP, DHCP  # type: ignore
+from scapy.layers.dns import DNS  # type: ignore
+from scapy.layers.netbios import NBNSRegistrationRequest, NBNSQueryResponse  # type: ignore
+
+from .scan import finalize
+from .capture import PcapReplay, DLT_EN10MB
+from .arpmon import decode_arp, fmt_ip, fmt_mac
+from .device import Device
+
+PASSIVE_BPF = "arp or (udp and (port 67 or port 68 or port 5353 or port 137))"
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", errors="ignore")
+    return str(value or "").strip().rstrip(".\x00 ")
+
+
+_BROADCAST = ipaddress.IPv4Address("255.255.255.255")
+
+
+def _valid_ip(ip: str) -> bool:
+    """IPv4 asignable a un equipo: descarta 0.0.0.0, loopback, multicast (224/4) y broadcast limitado."""
+    try:
+        addr = ipaddress.IPv4Address(ip)
+    except ValueError:
+        return False
+    return not (addr.is_unspecified or addr.is_loopback or addr.is_multicast or addr == _BROADCAST)
+
+
+class PassiveInventory:
+    """Acumula lo observado; un dispositivo por IP (la última MAC vista gana)."""
+
+    def __init__(self) -> None:
+        self.by_ip: Dict[str, Dict[str, Any]] = {}
+        self._sources: Dict[str, set] = {}
+        self._names_by_mac: Dict[str, str] = {}  # DHCP: el hostname puede llegar antes que la IP
+        self.packets = 0
+
+    def _upsert(self, ip: str, mac: str = "", hostname: str = "", source: str = "") -> None:
+        if ip not in self.by_ip and not _valid_ip(ip):  # una IP ya guardada ya se validó
+            return
+        d = self.by_ip.setdefault(ip, {"ip": ip, "mac": "", "hostname": "", "note": ""})
+        if mac and mac != "00:00:00:00:00:00":
+            d["mac"] = mac.lower()
+        hostname = hostname or self._names_by_mac.get(d["mac"], "")
+        if hostname and not d["hostname"]:
+            d["hostname"] = hostname
+        if source:
+            self._sources.setdefault(ip, set()).add(source)
+
+    def observe(self, pkt) -> None:
+        """Procesa un paquete scapy (callback de 'sniff' o lectura de pcap)."""
+        self.packets += 1
+        src_mac = pkt[Ether].src if pkt.haslayer(Ether) else ""
+
+        if pkt.haslayer(ARP):
+            arp = pkt[ARP]
+            self._upsert(arp.psrc, arp.hwsrc, source="arp")
+            return
+
+        if pkt.haslayer(DHCP) and pkt.haslayer(BOOTP):
+            self._observe_dhcp(pkt)
+            return
+
+        if pkt.haslayer(DNS) and pkt.haslayer(UDP) and pkt[UDP].sport == 5353:
+            dns = pkt[DNS]
+            if dns.qr == 1:
+                for rr in list(dns.an or []) + list(dns.ar or []):
+                    if getattr(rr, "type", None) == 1:  # A
+                        name = _text(rr.rrname)
+                        if name.endswith(".local"):
+                            name = name[: -len(".local")]
+                        ip = str(rr.rdata)
+                        self._upsert(ip, src_mac if pkt.haslayer(IP) and pkt[IP].src == ip else "", name, "mdns")
+            return
+
+        if pkt.haslayer(NBNSRegistrationRequest):
+            reg = pkt[NBNSRegistrationRequest]
+            self._upsert(str(reg.NB_ADDRESS), src_mac, _text(reg.QUESTION_NAME), "nbns")
+        elif pkt.haslayer(NBNSQueryResponse):
+            resp = pkt[NBNSQueryResponse]
+            name = _text(resp.RR_NAME)
+            for entry in getattr(resp, "ADDR_ENTRY", []) or []:
+                self._upsert(str(entry.NB_ADDRESS), src_mac, name, "nbns")
+
+    def _observe_dhcp(self, pkt) -> None:
+        bootp = pkt[BOOTP]
+        mac = bytes(bootp.chaddr[:6]).hex(":")
+        opts: Dict[str, Any] = {}
+        for opt in pkt[DHCP].options:
+            if isinstance(opt, tuple) and len(opt) >= 2:
+                opts[opt[0]] = opt[1]
+        hostname = _text(opts.get("hostname"))
+        if hostname:
+            self._names_by_mac[mac] = hostname
+        # IP: la asignada (ACK), la solicitada (REQUEST) o la actual del cliente
+        for ip in (bootp.yiaddr, opts.get("requested_addr"), bootp.ciaddr):
+            if _valid_ip(str(ip or "")):
+                self._upsert(str(ip), mac, hostname, "dhcp")
+                break
+        else:
+            # Sin IP todavía: si ya conocemos la MAC, al menos completamos el nombre
+            for d in self.by_ip.values():
+                if d["mac"] == mac and hostname and not d["hostname"]:
+                    d["hostname"] = hostname
+
+    def devices(self) -> List[Device]:
+        """Dispositivos observados, con las fuentes pasivas como tags (passive:arp, passive:dhcp...)."""
+        return [
+            Device(ip, d["mac"], d["hostname"], tuple(f"passive:{s}" for s in sorted(self._sources.get(ip, ()))))
+            for ip, d in self.by_ip.items()
+        ]
+
+
+def passive_sniff(inventory: PassiveInventory, iface: Optional[str] = None, duration_sec: int = 60) -> None:
+    """
+    Escucha en 'iface' durante 'duration_sec' alimentando 'inventory'.
+    Usa filtro BPF en kernel si se puede compilar; si no, filtra en Python.
+    """
+    kwargs: Dict[str, Any] = {"prn": inventory.observe, "store": False, "timeout": duration_sec}
+    if iface:
+        kwargs["iface"] = iface
+    try:
+        sniff(filter=PASSIVE_BPF, **kwargs)
+    except Exception as e:
+        if "filter" not in str(e).lower():
+            raise
+        # Sin libpcap para compilar el BPF
+        sniff(lfilter=lambda p: p.haslayer(ARP) or p.haslayer(UDP), **kwargs)
+
+
+_PASSIVE_UDP_PORTS = (67, 68, 5353, 137)
+
+
+def _wanted_udp(frame: bytes) -> bool:
+    """Parte UDP de PASSIVE_BPF en bytes: solo se disecciona con scapy lo que interesa."""
+    if frame[12:14] != b"\x08\x00" or len(frame) < 34 or frame[23] != 17:
+        return False
+    off = 14 + (frame[14] & 0x0F) * 4
+    if len(frame) < off + 4:
+        return False
+    sport = (frame[off] << 8) | frame[off + 1]
+    dport = (frame[off + 2] << 8) | frame[off + 3]
+    return sport in _PASSIVE_UDP_PORTS or dport in _PASSIVE_UDP_PORTS
+
+
+def passive_replay(inventory: PassiveInventory, pcap: Path, stats: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Alimenta 'inventory' con un pcap/pcapng (Ethernet) a toda velocidad y en streaming.
+    ARP se decodifica desde bytes; DHCP/mDNS/NBNS se diseccionan con scapy tras
+    un filtro en bytes. 'stats' recibe frames/pps.
+    """
+    replay = PcapReplay(pcap, {DLT_EN10MB})
+    try:
+        with replay:
+            for batch in replay.batches():
+                for ts, frame in batch:
+                    arp = decode_arp(frame)
+                    if arp is not None:
+                        inventory.packets += 1
+                        inventory._upsert(fmt_ip(arp[2]), fmt_mac(arp[1]), source="arp")
+                    elif _wanted_udp(frame):
+                        pkt = Ether(frame)
+                        pkt.time = ts
+                        inventory.observe(pkt)
+    finally:
+        if stats is not None:
+            stats.update(replay.stats)
+            stats["observed"] = inventory.packets
+
+
+def passive_inventory(
+    iface: Optional[str] = None,
+    duration_sec: int = 60,
+    pcap: Optional[Path] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> List[Device]:
+    """
+    Inventario pasivo completo: escucha (o relee 'pcap'), y después dedupe/fabricante/orden
+    con 'finalize' (sin resolver nombres por la red: solo los anunciados por DHCP/mDNS/NBNS).
+    """
+    inventory = PassiveInventory()
+    if pcap is not None:
+        passive_replay(inventory, pcap, stats=stats)
+    else:
+        passive_sniff(inventory, iface=iface, duration_sec=duration_sec)
+    return finalize(inventory.devices(), resolve_names=False)
@@ -0,0 +1,236 @@
+"""
+Pipeline del escaneo: descubrimiento y enriquecido solapados.
+
+    motor ARP / ICMP ──on_host(ip, mac)──▶ cola acotada ──▶ hilos de enriquecido
+    (productor, mientras barre)                             (nombre + fabricante)
+
+- Cada host que responde entra en la cola al momento; los hilos resuelven su
+  nombre (caché persistente delante, DNS inversa / NetBIOS / avahi detrás) y su
+  fabricante mientras el barrido sigue. Al terminar el barrido solo queda por
+  esperar la cola pendiente: el tiempo total tiende a max(barrido, enriquecido)
+  en lugar de la suma.
+- Contrapresión: si la cola se llena, el productor espera (stats["backpressure_s"]).
+- Plazos: 'deadline' s tras el fin del barrido, y un host que pasa de
+  'per_host_timeout' no se espera; lo que no haya terminado se entrega sin nombre
+  (como 'resolve_many'). Los hilos son daemon: uno colgado en gethostbyaddr no
+  retiene el proceso ni toca el resultado ya entregado.
+- Tiempos por etapa en 'stats' (ver ScanPipeline).
+Hilos y queue.Queue, no asyncio: los motores entregan las respuestas desde sus
+hilos de captura (sniffer de scapy, receptor AF_PACKET).
+"""
+
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+import queue
+import threading
+import time
+
+from .cache import get_cache
+from .device import Device, PRIVATE_TAG, int_to_mac, sort_key
+from .namer import HOST_GRACE, resolve_name
+from .profiling import count
+from .vendor import vendors_for_macs
+
+
+def apply_name(dev: Device, name: str, source: str) -> None:
+    """Pone el nombre resuelto ('name:extra' si no vino de DNS)."""
+    if name and not dev.hostname:
+        dev.hostname = name
+        if source == "extra":
+            dev.add_tag("name:extra")
+
+
+def apply_vendor(dev: Device, vendor: str) -> None:
+    """Fabricante por OUI; sin él, etiqueta 'mac:private' (y pista de iPhone) si aplica."""
+    if vendor:
+        dev.vendor = vendor
+    elif dev.private_mac:
+        dev.add_tag(PRIVATE_TAG)
+        if "iphone" in dev.hostname.lower():
+            dev.add_tag("guess:Apple(iOS private MAC)")
+
+
+class ScanPipeline:
+    """
+    Productor/consumidor del escaneo de un segmento:
+
+        with ScanPipeline() as pipe:
+            raw_arp_scan(cidr, iface, on_host=pipe.on_host)
+            devices = pipe.finish()
+
+    stats (segundos salvo contadores):
+      hosts, discover_s (inicio → finish), drain_s (espera de la cola tras el barrido),
+      total_s, names_s / vendor_s (tiempo de trabajo sumado de los hilos),
+      name_lookups / name_cache_hits, queue_max, backpressure_s y late (hosts
+      entregados sin terminar por el plazo).
+    """
+
+    def __init__(
+        self,
+        resolve_names: bool = True,
+        workers: int = 32,
+        queue_size: int = 4096,
+        per_host_timeout: float = 3.0,
+        deadline: float = 15.0,
+    ) -> None:
+        self.resolve_names = resolve_names
+        self.workers = max(1, workers)
+        self.per_host_timeout = per_host_timeout
+        self.deadline = deadline
+        self.queue: "queue.Queue[Optional[Device]]" = queue.Queue(maxsize=queue_size)
+        self.stats: Dict[str, Any] = {
+            "hosts": 0, "discover_s": 0.0, "drain_s": 0.0, "total_s": 0.0,
+            "names_s": 0.0, "vendor_s": 0.0, "name_lookups": 0, "name_cache_hits": 0,
+            "queue_max": 0, "backpressure_s": 0.0, "late": 0,
+        }
+        self._devices: Dict[int, Device] = {}
+        self._done: set = set()           # ip_int ya enriquecidas
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._running: Dict[int, float] = {}  # ip_int -> inicio, hosts en manos de un hilo
+        self._closing = threading.Event()
+        self._closed = False              # resultado entregado: los rezagados ya no escriben
+        self._threads: List[threading.Thread] = []
+        self._t0 = 0.0
+
+    def __enter__(self) -> "ScanPipeline":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self._closing.set()
+
+    def start(self) -> "ScanPipeline":
+        vendors_for_macs([])  # carga el índice OUI una vez, antes de que compitan los hilos
+        self._t0 = time.monotonic()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"wg-enrich-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    # --- Productor ---
+
+    def on_host(self, ip: str, mac: str = "", tags: Tuple[str, ...] = ()) -> None:
+        """Host descubierto (seguro desde cualquier hilo). Una IP repetida solo actualiza la MAC."""
+        with self._lock:
+            dev = Device(ip, mac, tags=tags)
+            prev = self._devices.get(dev.ip_int)
+            if prev is not None:
+                if dev.mac_int is None or dev.mac_int == prev.mac_int:
+                    return
+                # Último visto, como finalize: otra MAC para la IP → fabricante de nuevo.
+                # Lo derivado de la MAC anterior (vendor, mac:private, guess:) ya no vale
+                prev.mac_int = dev.mac_int
+                prev.vendor = ""
+                prev.tags = tuple(t for t in prev.tags if t != PRIVATE_TAG and not t.startswith("guess:"))
+                self._done.discard(prev.ip_int)
+                dev = prev
+            else:
+                self._devices[dev.ip_int] = dev
+                self.stats["hosts"] += 1
+        try:
+            self.queue.put_nowait(dev)
+        except queue.Full:
+            t = time.monotonic()
+            self.queue.put(dev)
+            with self._lock:
+                self.stats["backpressure_s"] += time.monotonic() - t
+        depth = self.queue.qsize()
+        if depth > self.stats["queue_max"]:
+            self.stats["queue_max"] = depth
+
+    # --- Consumidores ---
+
+    def _worker(self) -> None:
+        cache = get_cache()
+        while True:
+            try:
+                dev = self.queue.get(timeout=0.2)
+            except queue.Empty:
+                if self._closing.is_set():  # cierre por excepción (sin 'finish')
+                    return
+                continue
+            if dev is None:  # fin del barrido (ver 'finish')
+                return
+            t0 = time.monotonic()
+            with self._lock:
+                self._running[dev.ip_int] = t0
+                mac_int = dev.mac_int  # si cambia entretanto, el fabricante lo pone la nueva entrada
+            name = source = ""
+            lookup = hit = False
+            if self.resolve_names and not dev.hostname:
+                ip, mac = dev.ip, dev.mac
+                cached = cache.get_hostname(ip, mac)
+                if cached is not None:
+                    name, source = cached
+                    hit = True
+                else:
+                    try:
+                        name, source = resolve_name(ip, self.per_host_timeout, mac)
+                    except Exception:
+                        name, source = "", ""
+                    cache.put_hostname(ip, mac, name, source)  # incluye negativos
+                    lookup = True
+            t1 = time.monotonic()
+            vendor = vendors_for_macs([int_to_mac(mac_int)])[0] if mac_int is not None else ""
+            t2 = time.monotonic()
+            with self._lock:
+                if self._closed:
+                    return
+                self._running.pop(dev.ip_int, None)
+                apply_name(dev, name, source)
+                if dev.ip_int not in self._done and dev.mac_int == mac_int:
+                    apply_vendor(dev, vendor)
+                    self._done.add(dev.ip_int)
+                self._cond.notify_all()
+                st = self.stats
+                st["names_s"] += t1 - t0
+                st["vendor_s"] += t2 - t1
+                st["name_lookups"] += lookup
+                st["name_cache_hits"] += hit
+            count("namer.cache_hits", hit)
+
+    # --- Cierre ---
+
+    def finish(self) -> List[Device]:
+        """
+        Fin del barrido: espera la cola (hasta 'deadline' s), guarda la caché y
+        devuelve el inventario deduplicado y ordenado por IP.
+        """
+        t_end = time.monotonic()
+        self.stats["discover_s"] = round(t_end - self._t0, 3)
+        limit = t_end + self.deadline
+        host_limit = self.per_host_timeout + HOST_GRACE
+        try:
+            for _ in self._threads:  # un fin por hilo, detrás de lo pendiente
+                self.queue.put_nowait(None)
+        except queue.Full:
+            pass  # cola llena: los hilos salen por '_closing' al vaciarla
+        self._closing.set()
+        with self._cond:
+            while len(self._done) < len(self._devices):
+                now = time.monotonic()
+                if now >= limit:
+                    break
+                queued = len(self._devices) - len(self._done) - len(self._running)
+                if queued <= 0 and all(now - t >= host_limit for t in self._running.values()):
+                    break  # solo quedan hosts colgados (p. ej. en gethostbyaddr)
+                wake = min([t + host_limit for t in self._running.values()] + [limit])
+                self._cond.wait(max(0.01, wake - now))
+            self._closed = True
+            devices = list(self._devices.values())
+            late = [d for d in devices if d.ip_int not in self._done]
+        # Sin plazo para el fabricante (índice local): solo los nombres se quedan sin resolver
+        for d, v in zip(late, vendors_for_macs([d.mac for d in late])):
+            apply_vendor(d, v)
+        get_cache().save()
+        devices.sort(key=sort_key)
+        now = time.monotonic()
+        st = self.stats
+        st["late"] = len(late)
+        st["drain_s"] = round(now - t_end, 3)
+        st["total_s"] = round(now - self._t0, 3)
+        st["names_s"] = round(st["names_s"], 3)
+        st["vendor_s"] = round(st["vendor_s"], 3)
+        st["backpressure_s"] = round(st["backpressure_s"], 3)
+        return devices
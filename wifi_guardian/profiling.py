@@ -0,0 +1,179 @@
+"""
+Perfilado del escaneo: tiempos por etapa, latencias por host y contadores.
+
+- Desactivado por defecto: 'stage' y 'timed' cuestan una comprobación de bandera.
+- stage("scan.icmp_sweep")   → contexto; acumula llamadas, tiempo total y máximo.
+- @timed("baseline.diff")    → lo mismo como decorador.
+- observe("namer.reverse_dns", s) → latencia de un host (histograma y percentiles).
+- count("scan.arp_requests", n)   → contadores (paquetes, consultas, aciertos de caché).
+- report() → dict serializable en JSON (sección "profile" del resumen del informe).
+Seguro entre hilos: las etapas de segmentos en paralelo se suman (total_s puede
+superar el tiempo de reloj). Nombres con prefijo de módulo: scan.*, namer.*,
+vendor.*, baseline.*, report.*.
+"""
+
+from __future__ import annotations
+from typing import Any, Callable, Dict, List
+import bisect
+import functools
+import threading
+import time
+
+# Límites superiores (ms) de los cubos del histograma; el último cubo es "> 5000"
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+_BUCKET_LABELS = [f"<={b}" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"]
+MAX_SAMPLES = 100_000  # por nombre; más allá solo se cuentan en el histograma
+
+
+class _Stage:
+    __slots__ = ("prof", "name", "t0")
+
+    def __init__(self, prof: "Profiler", name: str) -> None:
+        self.prof = prof
+        self.name = name
+        self.t0 = 0.0
+
+    def __enter__(self) -> "_Stage":
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.prof.add_stage(self.name, time.perf_counter() - self.t0)
+
+
+class _Null:
+    __slots__ = ()
+
+    def __enter__(self) -> "_Null":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NULL = _Null()
+
+
+class Profiler:
+    """Acumulador de etapas, latencias y contadores (ver el docstring del módulo)."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages: Dict[str, List[float]] = {}    # nombre -> [llamadas, total_s, max_s]
+            self.samples: Dict[str, List[float]] = {}   # nombre -> latencias (s)
+            self.buckets: Dict[str, List[int]] = {}     # nombre -> cuentas por cubo
+            self.counters: Dict[str, int] = {}
+
+    def stage(self, name: str):
+        return _Stage(self, name) if self.enabled else _NULL
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            st = self.stages.get(name)
+            if st is None:
+                self.stages[name] = [1, seconds, seconds]
+            else:
+                st[0] += 1
+                st[1] += seconds
+                if seconds > st[2]:
+                    st[2] = seconds
+
+    def observe(self, name: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        slot = bisect.bisect_left(BUCKETS_MS, seconds * 1000)
+        with self._lock:
+            samples = self.samples.setdefault(name, [])
+            if len(samples) < MAX_SAMPLES:
+                samples.append(seconds)
+            self.buckets.setdefault(name, [0] * (len(BUCKETS_MS) + 1))[slot] += 1
+
+    def count(self, name: str, n: int = 1) -> None:
+        if not self.enabled or not n:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self) -> Dict[str, Any]:
+        """{"stages": {...}, "latency": {...}, "counters": {...}} con tiempos en s redondeados."""
+        with self._lock:
+            stages = {
+                name: {"calls": int(n), "total_s": round(total, 4), "max_s": round(mx, 4)}
+                for name, (n, total, mx) in sorted(self.stages.items())
+            }
+            latency = {}
+            for name in sorted(self.buckets):
+                s = sorted(self.samples.get(name, ()))
+                counts = self.buckets[name]
+                latency[name] = {
+                    "n": sum(counts),
+                    "p50_ms": _pct_ms(s, 0.50),
+                    "p90_ms": _pct_ms(s, 0.90),
+                    "p99_ms": _pct_ms(s, 0.99),
+                    "max_ms": round(s[-1] * 1000, 1) if s else 0.0,
+                    "histogram_ms": {label: c for label, c in zip(_BUCKET_LABELS, counts) if c},
+                }
+            counters = dict(sorted(self.counters.items()))
+        return {"stages": stages, "latency": latency, "counters": counters}
+
+
+def _pct_ms(sorted_samples: List[float], q: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    k = min(len(sorted_samples) - 1, int(q * len(sorted_samples)))
+    return round(sorted_samples[k] * 1000, 1)
+
+
+# -----------------------
+#  API del módulo (instancia única)
+# -----------------------
+
+_profiler = Profiler()
+
+
+def get_profiler() -> Profiler:
+    return _profiler
+
+
+def enable(on: bool = True) -> Profiler:
+    """Activa (y vacía) el perfilado del proceso; on=False lo desactiva."""
+    _profiler.reset()
+    _profiler.enabled = on
+    return _profiler
+
+
+def stage(name: str):
+    """Contexto que mide una etapa: 'with stage("baseline.load"): ...'."""
+    return _profiler.stage(name)
+
+
+def timed(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorador equivalente a envolver la función en 'stage(name)'."""
+    def deco(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _profiler.enabled:
+                return fn(*args, **kwargs)
+            with _Stage(_profiler, name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def observe(name: str, seconds: float) -> None:
+    """Latencia de una operación por host (segundos)."""
+    _profiler.observe(name, seconds)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Suma 'n' al contador 'name'."""
+    _profiler.count(name, n)
+
+
+def report() -> Dict[str, Any]:
+    return _profiler.report()
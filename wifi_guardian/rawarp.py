@@ -0,0 +1,193 @@
+"""
+Motor ARP L2 sobre socket AF_PACKET (solo Linux) para subredes grandes (/16 y más).
+
+- Una única trama plantilla preasignada: solo se parchea la IP destino (4 bytes).
+- Envío a ritmo controlado (paquetes/segundo), sin crear objetos por objetivo:
+  las IPs se recorren como enteros y solo se guardan las que responden.
+- Filtro BPF en kernel (ARP replies) y un hilo receptor que parsea bytes crudos.
+- Mismo esquema adaptativo que el motor scapy: reintento solo a quien no
+  respondió y corte tras un periodo de silencio.
+scapy sigue siendo el motor por defecto / fallback en el resto de casos.
+"""
+
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import errno
+import ipaddress
+import socket
+import struct
+import sys
+import threading
+import time
+
+import psutil
+
+from .capture import attach_bpf
+
+ETH_P_ARP = 0x0806
+
+# BPF clásico ensamblado a mano: "arp and arp[6:2] = 2" (ARP reply) sobre Ethernet
+#   ldh [12]; jeq #0x806 ? sigue : drop; ldh [20]; jeq #2 ? accept : drop
+BPF_ARP_REPLY: List[Tuple[int, int, int, int]] = [
+    (0x28, 0, 0, 12),
+    (0x15, 0, 3, ETH_P_ARP),
+    (0x28, 0, 0, 20),
+    (0x15, 0, 1, 2),
+    (0x06, 0, 0, 0xFFFF),
+    (0x06, 0, 0, 0),
+]
+
+
+def available() -> bool:
+    """True si la plataforma ofrece AF_PACKET (Linux)."""
+    return sys.platform.startswith("linux") and hasattr(socket, "AF_PACKET")
+
+
+def _iface_addrs(iface: str) -> Tuple[bytes, bytes]:
+    """(MAC, IPv4) de la interfaz; IP 0.0.0.0 si no tiene (ARP probe)."""
+    mac = b""
+    ip = b"\x00\x00\x00\x00"
+    for a in psutil.net_if_addrs().get(iface, []):
+        if a.family == psutil.AF_LINK and a.address:
+            mac = bytes.fromhex(a.address.replace(":", "").replace("-", ""))
+        elif a.family == socket.AF_INET and a.address:
+            ip = socket.inet_aton(a.address)
+    if len(mac) != 6:
+        raise RuntimeError(f"No se pudo obtener la MAC de {iface}")
+    return mac, ip
+
+
+def _request_template(src_mac: bytes, src_ip: bytes) -> bytearray:
+    """Ethernet broadcast + ARP who-has; la IP destino va en [38:42]."""
+    eth = b"\xff" * 6 + src_mac + struct.pack("!H", ETH_P_ARP)
+    arp = struct.pack("!HHBBH", 1, 0x0800, 6, 4, 1) + src_mac + src_ip + b"\x00" * 6 + b"\x00" * 4
+    return bytearray(eth + arp)
+
+
+def _host_range(cidr: str) -> range:
+    """Rango de enteros de las IPs de host (sin red/broadcast salvo /31 y /32)."""
+    net = ipaddress.IPv4Network(cidr, strict=False)
+    first, last = int(net.network_address), int(net.broadcast_address)
+    if net.prefixlen < 31:
+        first, last = first + 1, last - 1
+    return range(first, last + 1)
+
+
+def parse_arp_reply(frame: bytes) -> Optional[Tuple[int, str]]:
+    """(IP origen como entero, MAC origen) si 'frame' es un ARP reply Ethernet."""
+    if len(frame) < 42 or frame[12:14] != b"\x08\x06" or frame[20:22] != b"\x00\x02":
+        return None
+    mac = frame[22:28].hex(":")
+    (ip,) = struct.unpack_from("!I", frame, 28)
+    return ip, mac
+
+
+def raw_arp_scan(
+    cidr: str,
+    iface: str,
+    rate: float = 20000,
+    timeout: float = 3,
+    quiet: float = 0.5,
+    max_passes: int = 3,
+    stats: Optional[Dict[str, Any]] = None,
+    on_host: Optional[Callable[[str, str], None]] = None,
+) -> Dict[str, str]:
+    """
+    Escaneo ARP adaptativo sobre AF_PACKET. Devuelve {ip: mac}.
+    - rate: paquetes por segundo.
+    - timeout/quiet/max_passes: como en el motor scapy (ver scan._arp_scan_layer2).
+    - on_host: callback opcional (ip, mac) por cada host nuevo, desde el hilo receptor.
+    Requiere root/CAP_NET_RAW; lanza OSError/RuntimeError si no es posible.
+    """
+    if not available():
+        raise RuntimeError("AF_PACKET no disponible en esta plataforma")
+    targets = _host_range(cidr)
+    lo, hi = targets.start, targets.stop
+    src_mac, src_ip = _iface_addrs(iface)
+    frame = _request_template(src_mac, src_ip)
+    (own_ip,) = struct.unpack("!I", src_ip)
+
+    sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ARP))
+    found: Dict[int, str] = {}
+    last_hit = [0.0]
+    stop = threading.Event()
+    passes: List[Dict[str, Any]] = []
+
+    def receiver() -> None:
+        while not stop.is_set():
+            try:
+                data = sock.recv(128)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            parsed = parse_arp_reply(data)
+            if not parsed:
+                continue
+            ip, mac = parsed
+            # Ignorar nuestros propios replies (AF_PACKET también ve el tráfico saliente)
+            if lo <= ip < hi and ip != own_ip and ip not in found:
+                found[ip] = mac
+                last_hit[0] = time.monotonic()
+                if on_host:
+                    on_host(socket.inet_ntoa(struct.pack("!I", ip)), mac)
+
+    rx: Optional[threading.Thread] = None
+    try:
+        sock.bind((iface, ETH_P_ARP))
+        try:
+            attach_bpf(sock, BPF_ARP_REPLY)
+        except OSError:
+            pass  # sin filtro en kernel: parse_arp_reply descarta el resto
+        sock.settimeout(0.2)
+        rx = threading.Thread(target=receiver, name="wg-rawarp-rx", daemon=True)
+        rx.start()
+
+        for n in range(1, max_passes + 1):
+            before = len(found)
+            t0 = time.monotonic()
+            sent = _send_pass(sock, frame, (ip for ip in targets if ip != own_ip and ip not in found), rate)
+            if not sent:
+                break
+            sent_at = time.monotonic()
+            while True:
+                now = time.monotonic()
+                if now - max(sent_at, last_hit[0]) >= quiet or now - sent_at >= timeout:
+                    break
+                time.sleep(0.02)
+            hits = len(found) - before
+            passes.append({"pass": n, "sent": sent, "hits": hits, "elapsed_s": round(time.monotonic() - t0, 3)})
+            if n > 1 and hits == 0:
+                break
+    finally:
+        stop.set()
+        if rx is not None:
+            rx.join()  # como mucho un timeout de recv (0.2 s); después 'found' ya no cambia
+        sock.close()
+        if stats is not None:
+            stats["l2_passes"] = passes
+            stats["engine"] = "af_packet"
+
+    return {socket.inet_ntoa(struct.pack("!I", ip)): mac for ip, mac in sorted(found.items())}
+
+
+def _send_pass(sock: socket.socket, frame: bytearray, ips: Iterator[int], rate: float) -> int:
+    """Envía la plantilla parcheada para cada IP respetando 'rate' (pps). Devuelve nº enviados."""
+    sent = 0
+    start = time.monotonic()
+    for ip in ips:
+        struct.pack_into("!I", frame, 38, ip)
+        if rate > 0:
+            ahead = sent / rate - (time.monotonic() - start)
+            if ahead > 0.001:
+                time.sleep(ahead)
+        while True:
+            try:
+                sock.send(frame)
+                break
+            except OSError as e:
+                if e.errno != errno.ENOBUFS:  # cola llena: esperar un poco
+                    raise
+                time.sleep(0.001)
+        sent += 1
+    return sent
@@ -1,9 +1,14 @@
 from __future__ import annotations
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import json
 import datetime
+import hashlib
 import html
+import os
+
+from .device import Device, PRIVATE_TAG
+from .profiling import timed
 
 
 # =============== helpers ===============
@@ -20,15 +25,9 @@ def _fmt_dt(ts: datetime.datetime | None = None) -> str:
     return ts.strftime("%Y-%m-%d %H:%M:%S")
 
 def _chip(text: str, kind: str = "info") -> str:
-    colors = {
-        "info":   ("#0e1b17", "#00ff9c"),
-        "alias":  ("#10122b", "#9aa0ff"),
-        "vendor": ("#122018", "#2affc8"),
-        "warn":   ("#281325", "#ff2bd6"),
-        "muted":  ("#1a1f24", "#8b9aa0"),
-    }
-    bg, fg = colors.get(kind, colors["info"])
-    return f'<span class="chip" style="background:{bg};color:{fg}">{_escape(text)}</span>'
+    # colores por clase en assets/report.css (info, alias, vendor, warn, muted)
+    cls = kind if kind in ("alias", "vendor", "warn", "muted") else "info"
+    return f'<span class="chip {cls}">{_escape(text)}</span>'
 
 def _icon(name: str) -> str:
     # inline SVGs (stroke inherits currentColor)
@@ -42,6 +41,29 @@ def _icon(name: str) -> str:
     }
     return icons.get(name, "")
 
+_COPY_ICON = _icon("copy")  # una vez: se repite en cada fila
+
+def _series_svg(points: List[Dict[str, Any]], width: int = 1040, height: int = 120) -> str:
+    """
+    Gráfico de barras (SVG inline) de una serie por segundo [{t, clave: n, ...}].
+    Cada barra es la suma de los valores numéricos del punto; el 't' va en el tooltip.
+    """
+    if not points:
+        return ""
+    totals = [sum(v for k, v in p.items() if k != "t" and isinstance(v, (int, float))) for p in points]
+    peak = max(totals) or 1
+    bar_w = max(1.0, width / len(points))
+    bars = []
+    for i, (p, total) in enumerate(zip(points, totals)):
+        h = max(1.0, (height - 4) * total / peak) if total else 0
+        bars.append(
+            f'<rect x="{i * bar_w:.1f}" y="{height - h:.1f}" width="{max(1.0, bar_w - 1):.1f}" height="{h:.1f}">'
+            f'<title>{_escape(str(p.get("t", "")))}: {total}</title></rect>'
+        )
+    return (f'<svg viewBox="0 0 {width} {height}" width="100%" height="{height}" preserveAspectRatio="none" '
+            f'style="fill:var(--magenta)">{"".join(bars)}</svg>'
+            f'<div class="lbl" style="font-size:12px;color:var(--muted)">{len(points)} s con actividad · pico {peak}/s</div>')
+
 # ======== Autor / Branding ========
 
 ts_now = _fmt_dt()
@@ -51,63 +73,132 @@ AUTHOR_LINKED = "https://www.linkedin.com/in/enriqueforte"
 
 # =============== main writer ===============
 
+def _device_flags(d: Dict[str, Any]) -> Tuple[str, bool, bool]:
+    """(vendor, tiene alias, MAC privada) del dispositivo."""
+    if isinstance(d, Device):
+        # campos estructurados: sin re-trocear 'note'
+        return d.vendor, bool(d.alias), PRIVATE_TAG in d.tags
+    # dicts: vendor chip (si viene anotado en note como "vendor:XYZ")
+    vendor, aliased, private = "", False, False
+    for part in (d.get("note", "") or "").split(","):
+        part = part.strip()
+        if part.lower().startswith("vendor:"):
+            vendor = part.split(":",1)[1].strip()
+        if part.lower().startswith("alias"):
+            aliased = True
+        if part.lower().startswith(PRIVATE_TAG):
+            private = True
+    return vendor, aliased, private
+
+def _row_html(d: Dict[str, Any]) -> str:
+    ip   = _escape(d.get("ip",""))
+    mac  = _escape(d.get("mac",""))
+    host = _escape(d.get("hostname",""))
+    alias = _escape(d.get("alias",""))
+    note_txt = _escape(d.get("note","") or "")
+    vendor, aliased, private = _device_flags(d)
+    chips = []
+    if aliased:
+        chips.append(_chip("alias", "alias"))
+    if private:
+        chips.append(_chip("MAC privada", "muted"))
+    if vendor:
+        chips.append(_chip(vendor, "vendor"))
+    return (
+        f'<tr><td class="ip"><span class="mono">{ip}</span>'
+        f'<button class="copy" data-copy="{ip}" title="Copiar IP">{_COPY_ICON}</button></td>'
+        f'<td class="mac"><span class="mono">{mac}</span>'
+        f'<button class="copy" data-copy="{mac}" title="Copiar MAC">{_COPY_ICON}</button></td>'
+        f'<td class="host">{host}</td><td class="alias">{alias}</td>'
+        f'<td class="note">{note_txt} {" ".join(chips)}</td></tr>\n'
+    )
+
+def _row_values(d: Dict[str, Any]) -> List[Any]:
+    """Fila compacta para el modo paginado: [ip, mac, hostname, alias, note, vendor, flags]."""
+    vendor, aliased, private = _device_flags(d)
+    if isinstance(d, Device):
+        return [d.ip, d.mac, d.hostname, d.alias, d.note, vendor, aliased | (private << 1)]
+    return [d.get("ip",""), d.get("mac",""), d.get("hostname",""), d.get("alias",""), d.get("note","") or "",
+            vendor, aliased | (private << 1)]
+
+def _rows_json(devices: List[Dict[str, Any]], chunk: int = 1000):
+    """JSON de las filas en trozos de 'chunk' (un json.dumps por trozo, memoria acotada)."""
+    for i in range(0, len(devices), chunk):
+        text = json.dumps([_row_values(d) for d in devices[i:i + chunk]], ensure_ascii=False, separators=(",", ":"))
+        # "<" escapado: el JSON va dentro de <script> y no puede cerrar la etiqueta
+        yield ("," if i else "") + text[1:-1].replace("<", "\\u003c")
+
+# =============== assets estáticos ===============
+
+ASSETS_DIR = Path(__file__).with_name("assets")
+_assets: Dict[str, Tuple[str, str]] = {}  # nombre → (nombre con hash, contenido); se leen una vez
+
+def _asset(name: str) -> Tuple[str, str]:
+    if name not in _assets:
+        text = (ASSETS_DIR / name).read_text(encoding="utf-8")
+        stem, ext = name.rsplit(".", 1)
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:10]
+        _assets[name] = (f"{stem}-{digest}.{ext}", text)
+    return _assets[name]
+
+def _asset_tags(report_dir: Path, inline: bool) -> Tuple[str, str]:
+    """
+    (<link>/<style>, <script>) para el CSS/JS del informe.
+    inline=True los incrusta (informe autocontenido, p. ej. para enviarlo por correo).
+    Si no, se copian una sola vez a <report_dir>/assets/ con hash en el nombre
+    (caché del navegador compartida entre informes; un cambio de versión crea otro fichero).
+    """
+    css_name, css = _asset("report.css")
+    js_name, js = _asset("report.js")
+    if inline:
+        return f"<style>\n{css}</style>", f"<script>\n{js}</script>"
+    target = report_dir / "assets"
+    target.mkdir(parents=True, exist_ok=True)
+    for fname, text in ((css_name, css), (js_name, js)):
+        dest = target / fname
+        if not dest.exists():
+            tmp = dest.with_name(dest.name + ".tmp")
+            tmp.write_text(text, encoding="utf-8")
+            os.replace(tmp, dest)
+    return (f'<link rel="stylesheet" href="assets/{css_name}" />',
+            f'<script src="assets/{js_name}"></script>')
+
+# =============== main writer ===============
+
+# Por encima de este nº de dispositivos, el inventario va como JSON compacto y el
+# navegador pinta solo la página visible (ver assets/report.js)
+INLINE_ROWS_MAX = 2000
+
+@timed("report.html")
 def write_reports(
     report_dir: Path,
     title: str,
     summary: Dict[str, Any],
     devices: List[Dict[str, Any]],
-    anomalies: List[str]
+    anomalies: List[str],
+    inline_assets: Optional[bool] = None,
+    stamp: Optional[str] = None,
 ) -> Path:
+    """
+    Escribe el informe HTML en streaming: cabecera, filas (o JSON) y pie van directos
+    al fichero, sin montar el documento entero en memoria. Se escribe en un .tmp y se
+    renombra al final (un informe a medias nunca queda con el nombre definitivo).
+    'stamp' fija el sufijo del nombre (para emparejarlo con las salidas de outputs.py).
+    'inline_assets': None (por defecto) incrusta el CSS/JS si el informe no va paginado
+    (hasta INLINE_ROWS_MAX filas), de modo que el .html basta por sí solo; True los
+    incrusta siempre y False los enlaza siempre desde <report_dir>/assets/.
+    """
     report_dir.mkdir(parents=True, exist_ok=True)
     ts = datetime.datetime.now()
-    stamp = ts.strftime("%Y%m%d-%H%M%S")
+    stamp = stamp or ts.strftime("%Y%m%d-%H%M%S")
     out_html = report_dir / f"report-{stamp}.html"
 
     # counts
     total = len(devices)
     added = len(summary.get("added_since_baseline") or [])
     removed = len(summary.get("removed_since_baseline") or [])
-
-    # build device rows
-    rows = []
-    for d in devices:
-        ip   = _escape(d.get("ip",""))
-        mac  = _escape(d.get("mac",""))
-        host = _escape(d.get("hostname",""))
-        alias = _escape(d.get("alias",""))
-        note = d.get("note","") or ""
-
-        chips = []
-        # vendor chip (si viene anotado en note como "vendor:XYZ")
-        vendor = ""
-        for part in note.split(","):
-            part = part.strip()
-            if part.lower().startswith("vendor:"):
-                vendor = part.split(":",1)[1].strip()
-            if part.lower().startswith("alias"):
-                chips.append(_chip("alias", "alias"))
-            if part.lower().startswith("mac:private"):
-                chips.append(_chip("MAC privada", "muted"))
-        if vendor:
-            chips.append(_chip(vendor, "vendor"))
-
-        note_txt = _escape(note)
-
-        rows.append(f"""
-        <tr>
-          <td class="ip">
-            <span class="mono">{ip}</span>
-            <button class="copy" data-copy="{ip}" title="Copiar IP">{_icon('copy')}</button>
-          </td>
-          <td class="mac">
-            <span class="mono">{mac}</span>
-            <button class="copy" data-copy="{mac}" title="Copiar MAC">{_icon('copy')}</button>
-          </td>
-          <td class="host">{host}</td>
-          <td class="alias">{alias}</td>
-          <td class="note">{note_txt} {' '.join(chips)}</td>
-        </tr>
-        """)
+    paged = total > INLINE_ROWS_MAX
+    css_tag, js_tag = _asset_tags(report_dir, not paged if inline_assets is None else inline_assets)
 
     # anomalies list
     anomalies_html = ""
@@ -120,96 +211,23 @@ def write_reports(
         </div>
         """
 
-    # summary JSON pretty
-    summary_json = _escape(json.dumps(summary, indent=2, ensure_ascii=False))
+    # serie temporal (ej. deauth por segundo)
+    series_html = ""
+    if summary.get("time_series"):
+        series_html = f"""
+        <section class="card" style="margin-bottom:12px">
+          <div class="panel-title">Serie temporal (por segundo)</div>
+          {_series_svg(summary["time_series"])}
+        </section>
+        """
 
-    html_text = f"""<!DOCTYPE html>
+    head = f"""<!DOCTYPE html>
 <html lang="es">
 <head>
 <meta charset="utf-8" />
 <meta name="viewport" content="width=device-width, initial-scale=1" />
 <title>{_escape(title)}</title>
-<style>
-  :root {{
-    --bg:#0b0f10;
-    --panel:#0e1417;
-    --panel-2:#10161a;
-    --grid:#0f171b;
-    --text:#d6f5ea;
-    --muted:#9ec7b8;
-    --neon:#00ff9c;
-    --magenta:#ff2bd6;
-    --cyan:#2affc8;
-    --card-shadow: 0 0 0 1px rgba(0,255,156,0.10), 0 6px 24px rgba(0,0,0,0.4);
-  }}
-  * {{ box-sizing:border-box }}
-  html,body {{ margin:0; background:var(--bg); color:var(--text); font-family: ui-sans-serif, system-ui, -apple-system, Segoe UI, Roboto, "Helvetica Neue", Arial; }}
-  code, .mono {{ font-family: ui-monospace, SFMono-Regular, Menlo, Consolas, "Liberation Mono", monospace; }}
-  a {{ color: var(--neon); text-decoration:none }}
-  .wrap {{ max-width: 1100px; margin: 24px auto; padding: 0 16px; }}
-
-  header {{
-    display:flex; align-items:center; gap:14px; margin-bottom:18px;
-  }}
-  .logo {{ display:inline-flex; align-items:center; gap:10px; color:var(--neon); }}
-  .logo .badge {{ font-weight:700; letter-spacing:1px; }}
-  .title {{ font-size:26px; font-weight:800; }}
-  .subtitle {{ color:var(--muted); font-size:14px; }}
-
-  .grid {{
-    display:grid; gap:14px; grid-template-columns: repeat(12, 1fr);
-  }}
-  .col-4 {{ grid-column: span 4; }}
-  .col-8 {{ grid-column: span 8; }}
-  .card {{
-    background: radial-gradient(1200px 350px at -10% -10%, rgba(0,255,156,0.06), transparent 60%), var(--panel);
-    border-radius: 14px; padding: 16px; box-shadow: var(--card-shadow);
-  }}
-  .kpi {{ display:flex; align-items:center; gap:10px; }}
-  .kpi .num {{ font-size:28px; font-weight:800; color:var(--neon); }}
-  .kpi .lbl {{ font-size:12px; color:var(--muted); }}
-  .split {{ display:flex; justify-content:space-between; align-items:center; }}
-
-  .search {{
-    display:flex; gap:10px; align-items:center; margin: 6px 0 10px;
-  }}
-  .search input {{
-    width: 100%; padding: 10px 12px; border-radius: 10px; background: var(--panel-2); color: var(--text); border: 1px solid #142025;
-    outline: none;
-  }}
-
-  table {{
-    width:100%; border-collapse:separate; border-spacing:0 6px;
-  }}
-  thead th {{
-    position: sticky; top: 0; z-index: 1;
-    background: linear-gradient(0deg, rgba(0,255,156,0.04), rgba(0,255,156,0.06));
-    color: var(--text); text-align: left; padding: 10px 12px; font-size: 12px; letter-spacing: 0.5px;
-    border-bottom: 1px solid rgba(255,255,255,0.06);
-    cursor: pointer;
-  }}
-  tbody tr {{
-    background: var(--grid); box-shadow: 0 1px 0 rgba(255,255,255,0.05) inset, 0 -1px 0 rgba(255,255,255,0.03) inset;
-  }}
-  tbody td {{ padding: 10px 12px; vertical-align: middle; font-size: 14px; }}
-  tbody td .copy {{
-    margin-left: 8px; background: transparent; border: 0; color: var(--muted); cursor: pointer;
-  }}
-  tbody tr:hover {{ outline: 1px solid rgba(0,255,156,0.18); }}
-  .chip {{
-    display:inline-block; padding: 3px 8px; border-radius: 999px; font-size: 12px; margin-left: 6px; border: 1px solid rgba(255,255,255,0.06);
-  }}
-  .panel.warn {{ background: linear-gradient(180deg, rgba(255,43,214,0.07), rgba(0,0,0,0)); border:1px solid rgba(255,43,214,0.25); }}
-  .panel-title {{ font-weight:700; color:#ffd5f4; margin-bottom:6px; display:flex; align-items:center; gap:8px; }}
-
-  pre.json {{ background: #0a1113; border: 1px solid #112025; padding: 12px; border-radius: 12px; overflow: auto; max-height: 300px; }}
-
-  @media (max-width: 900px) {{
-    .col-4 {{ grid-column: span 12; }}
-    .col-8 {{ grid-column: span 12; }}
-    thead th:nth-child(3), tbody td:nth-child(3) {{ display:none; }} /* oculta Hostname en pantallas pequeñas */
-  }}
-</style>
+{css_tag}
 </head>
 <body>
   <div class="wrap">
@@ -235,6 +253,8 @@ def write_reports(
 
     {anomalies_html}
 
+    {series_html}
+
     <section class="card">
       <div class="split">
         <h3 style="margin:0">Inventario</h3>
@@ -254,12 +274,23 @@ def write_reports(
             </tr>
           </thead>
           <tbody>
-            {''.join(rows)}
-          </tbody>
+"""
+
+    middle = """          </tbody>
         </table>
       </div>
+      <div class="pager" id="pager" hidden>
+        <button class="prev" type="button">‹ Anterior</button>
+        <span class="info"></span>
+        <button class="next" type="button">Siguiente ›</button>
+      </div>
     </section>
+"""
 
+    # summary JSON pretty
+    summary_json = _escape(json.dumps(summary, indent=2, ensure_ascii=False))
+
+    tail = f"""
     <section class="card" style="margin-top:12px">
       <div class="panel-title">Resumen técnico (JSON)</div>
       <pre class="json"><code>{summary_json}</code></pre>
@@ -284,64 +315,24 @@ def write_reports(
     </footer>
 
   </div>
-
-<script>
-  // filtro rápido
-  const q = document.getElementById('q');
-  const tbody = document.querySelector('#devtbl tbody');
-  const rows = Array.from(tbody.querySelectorAll('tr'));
-
-  function norm(s) {{ return (s||'').toLowerCase(); }}
-
-  q.addEventListener('input', () => {{
-    const term = norm(q.value);
-    rows.forEach(tr => {{
-      const txt = norm(tr.innerText);
-      tr.style.display = txt.includes(term) ? '' : 'none';
-    }});
-  }});
-
-  // sort básico por columna
-  let sortDir = 1, lastKey = null;
-  document.querySelectorAll('#devtbl thead th').forEach(th => {{
-    th.addEventListener('click', () => {{
-      const k = th.getAttribute('data-k');
-      if (!k) return;
-      if (k === lastKey) sortDir *= -1; else sortDir = 1;
-      lastKey = k;
-
-      const getVal = (tr) => {{
-        if (k === 'ip')   return tr.querySelector('td.ip .mono')?.textContent.trim() || '';
-        if (k === 'mac')  return tr.querySelector('td.mac .mono')?.textContent.trim() || '';
-        if (k === 'host') return tr.querySelector('td.host')?.textContent.trim() || '';
-        if (k === 'alias')return tr.querySelector('td.alias')?.textContent.trim() || '';
-        return tr.querySelector('td.note')?.textContent.trim() || '';
-      }};
-      rows.sort((a,b) => {{
-        const va = getVal(a).toLowerCase();
-        const vb = getVal(b).toLowerCase();
-        if (va < vb) return -1 * sortDir;
-        if (va > vb) return  1 * sortDir;
-        return 0;
-      }});
-      rows.forEach(r => tbody.appendChild(r));
-    }});
-  }});
-
-  // copiar al portapapeles
-  document.querySelectorAll('button.copy').forEach(btn => {{
-    btn.addEventListener('click', async () => {{
-      const txt = btn.getAttribute('data-copy');
-      try {{
-        await navigator.clipboard.writeText(txt);
-        btn.style.color = '#00ff9c';
-        setTimeout(() => btn.style.color = '', 700);
-      }} catch(e) {{ console.log('copy fail', e); }}
-    }});
-  }});
-</script>
+{js_tag}
 </body>
 </html>
 """
-    out_html.write_text(html_text, encoding="utf-8")
+
+    tmp = out_html.with_name(out_html.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(head)
+        if paged:
+            # tbody vacío: el JS pinta la página visible desde el JSON
+            fh.write(middle)
+            fh.write('    <script type="application/json" id="wg-data">[')
+            fh.writelines(_rows_json(devices))
+            fh.write("]</script>\n")
+        else:
+            for d in devices:
+                fh.write(_row_html(d))
+            fh.write(middle)
+        fh.write(tail)
+    os.replace(tmp, out_html)
     return out_html
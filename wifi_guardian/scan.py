@@ -1,18 +1,23 @@
 """
 Escaneo de red y monitorización ARP sin 'netifaces'.
 
-- Inferencia de interfaz/red (ignorando interfaces virtuales comunes).
-- Intento preferido: ARP L2 (srp) con doble pasada y reintentos.
-- Fallback: ICMP sweep + lectura de ARP del SO, con "touch" TCP para poblar ARP.
-- Enriquecimiento de hostnames (NetBIOS/getent/avahi) y fabricante (OUI).
+- Inferencia de interfaz/red (ignorando interfaces virtuales comunes) y escaneo
+  de varios segmentos (VLAN/NIC) en paralelo.
+- Intento preferido: ARP L2 adaptativo (reintenta solo a quien no respondió, corta al haber silencio);
+  en Linux y subredes grandes, motor AF_PACKET sin objetos scapy por paquete (rawarp.py).
+- Fallback: ICMP sweep concurrente + lectura de ARP del SO, con "touch" TCP para poblar ARP.
+- Enriquecimiento de hostnames en paralelo (DNS/NetBIOS/getent/avahi) y fabricante (OUI),
+  con caché persistente (TTL y negativos) para no repetir consultas.
 - Etiqueta 'mac:private' para MAC localmente administradas (iOS/Android MAC privada).
-- Monitor ARP spoof con manejo cuando no hay pcap/permisos.
+- Monitor ARP spoof (BPF en kernel, lotes, bytes crudos) con manejo cuando no hay pcap/permisos.
+- Tiempos por etapa y paquetes enviados/recibidos para '--profile' (ver profiling.py).
 
 Requiere: scapy, psutil. Para vendor: mac-vendor-lookup.
 """
 
 from __future__ import annotations
-from typing import List, Dict, Any, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pathlib import Path
 import socket
 import ipaddress
 import psutil
@@ -20,18 +25,34 @@ import platform
 import subprocess
 import re
 import time
-import socket as pysock
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from scapy.all import (  # type: ignore
-    ARP, Ether, srp, conf, sniff,
-    IP, ICMP, sr1
+    ARP, Ether, sendp, conf, AsyncSniffer
 )
 
-from .utils import cidr_from_ip_mask, try_reverse_dns
-from .namer import resolve_extra
-from .vendor import vendor_from_mac
+from .utils import cidr_from_ip_mask
+from .namer import resolve_many
+from .vendor import vendors_for_macs
+from .sweep import icmp_sweep
+from .touch import tcp_touch
+from .cache import get_cache
+from .rawarp import raw_arp_scan, available as rawarp_available
+from .arpmon import monitor_arp
+from .capture import PcapError
+from .device import Device, as_device, sort_key
+from . import neigh
+from .pipeline import ScanPipeline, apply_name, apply_vendor
+from .profiling import count, stage, timed
 
 
+# Motores ARP L2 válidos para 'engine'
+ENGINES = ("auto", "scapy", "raw")
+
+# A partir de este nº de direcciones, "auto" usa el motor AF_PACKET (memoria plana)
+RAW_ENGINE_MIN_HOSTS = 1024
+
 # Interfaces que solemos querer ignorar para la autodetección
 BAD_IFACE_KEYWORDS = (
     "vEthernet", "Hyper-V", "Loopback", "VirtualBox", "VMware",
@@ -39,10 +60,10 @@ BAD_IFACE_KEYWORDS = (
 )
 
 
-def infer_default_iface_and_cidr() -> Tuple[str, str]:
+def list_candidate_ifaces() -> List[Tuple[str, str]]:
     """
-    Determina interfaz “principal” y su red en CIDR sin 'netifaces'.
-    Ignora interfaces virtuales conocidas.
+    Lista (interfaz, CIDR) IPv4 válidos sin 'netifaces', el “principal” primero.
+    Ignora loopback e interfaces virtuales conocidas.
     """
     # 1) IP local “de salida” (no envía tráfico real)
     primary_ip = None
@@ -74,69 +95,133 @@ def infer_default_iface_and_cidr() -> Tuple[str, str]:
                     score = 1 if (primary_ip and a.address == primary_ip) else 0
                     candidates.append((score, iface, cidr))
 
+    candidates.sort(reverse=True)
+    return list(dict.fromkeys((iface, cidr) for _, iface, cidr in candidates))
+
+
+def infer_default_iface_and_cidr() -> Tuple[str, str]:
+    """
+    Determina interfaz “principal” y su red en CIDR sin 'netifaces'.
+    Ignora interfaces virtuales conocidas.
+    """
+    candidates = list_candidate_ifaces()
     if not candidates:
         raise RuntimeError("No se pudo inferir una interfaz IPv4 válida para calcular el CIDR.")
+    return candidates[0]
 
-    candidates.sort(reverse=True)
-    _, best_iface, best_cidr = candidates[0]
-    return best_iface, best_cidr
+
+@timed("scan.plan_segments")
+def plan_segments(
+    cidrs: Optional[List[str]] = None,
+    ifaces: Optional[List[str]] = None,
+    all_ifaces: bool = False,
+) -> List[Tuple[str, str]]:
+    """
+    Empareja interfaces y redes a escanear → [(iface, cidr)].
+    - all_ifaces: todas las candidatas de list_candidate_ifaces().
+    - Mismo nº de --iface y --cidr: por posición (una sola --iface vale para todas).
+    - Solo --cidr: la interfaz candidata que solapa con cada red (o la principal).
+    - Solo --iface: la red de cada interfaz.
+    - Nada: la interfaz/red principal.
+    """
+    cidrs, ifaces = list(cidrs or []), list(ifaces or [])
+    candidates = list_candidate_ifaces() if (all_ifaces or not (cidrs and ifaces)) else []
+    if all_ifaces:
+        segments = candidates
+    elif cidrs and ifaces:
+        if len(ifaces) == 1:
+            ifaces = ifaces * len(cidrs)
+        if len(ifaces) != len(cidrs):
+            raise ValueError("Indica una --iface por cada --cidr (o una sola para todas).")
+        segments = list(zip(ifaces, cidrs))
+    elif cidrs:
+        segments = []
+        for c in cidrs:
+            net = ipaddress.IPv4Network(c, strict=False)
+            match = [i for i, cc in candidates if ipaddress.IPv4Network(cc).overlaps(net)]
+            if not match and not candidates:
+                raise RuntimeError(f"No hay interfaz IPv4 para {c}")
+            segments.append((match[0] if match else candidates[0][0], c))
+    elif ifaces:
+        segments = []
+        for i in ifaces:
+            match = [cc for ii, cc in candidates if ii == i]
+            if not match:
+                raise RuntimeError(f"La interfaz {i} no tiene una red IPv4 utilizable.")
+            segments.append((i, match[0]))
+    else:
+        segments = [infer_default_iface_and_cidr()]
+    if not segments:
+        raise RuntimeError("No se pudo inferir una interfaz IPv4 válida para calcular el CIDR.")
+    return list(dict.fromkeys(segments))
 
 
 # -----------------------
 #  Ayudas de enriquecido
 # -----------------------
 
-def _is_locally_administered(mac: str) -> bool:
-    """Devuelve True si la MAC es 'locally administered' (MAC privada)."""
-    try:
-        first = int(mac.split(":")[0], 16)
-        return bool(first & 0x02)
-    except Exception:
-        return False
-
-
-def _enrich_hostnames(devs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Completa hostnames vacíos probando NetBIOS / getent / avahi (best-effort)."""
+def _enrich_hostnames(devs: List[Device]) -> List[Device]:
+    """
+    Completa hostnames vacíos en paralelo: DNS inversa y, si falla, NetBIOS / getent / avahi.
+    Consulta antes la caché persistente (también negativos) y guarda lo resuelto.
+    Cada IP se resuelve una sola vez, con plazo por host y plazo global (best-effort).
+    """
+    cache = get_cache()
+    names: Dict[str, Tuple[str, str]] = {}
+    pending: Dict[str, str] = {}  # ip -> mac
     for d in devs:
-        if not d.get("hostname"):
-            extra = resolve_extra(d["ip"])
-            if extra:
-                d["hostname"] = extra
-                d["note"] = (d.get("note") + (", " if d.get("note") else "")) + "name:extra"
+        if d.hostname:
+            continue
+        ip, mac = d.ip, d.mac
+        hit = cache.get_hostname(ip, mac)
+        if hit is not None:
+            names[ip] = hit
+        else:
+            pending[ip] = mac
+
+    count("namer.cache_hits", len(names))
+    resolved = resolve_many(pending, macs=pending)
+    for ip, (name, source) in resolved.items():
+        cache.put_hostname(ip, pending[ip], name, source)  # incluye negativos
+    names.update(resolved)
+
+    if not names:
+        return devs
+    for d in devs:
+        if not d.hostname:
+            apply_name(d, *names.get(d.ip, ("", "")))
     return devs
 
 
-def _enrich_vendor(devs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Añade fabricante por OUI a 'note'; marca 'mac:private' y pista de iPhone si aplica."""
-    for d in devs:
-        mac = (d.get("mac") or "").lower().replace("-", ":")
-        host = (d.get("hostname") or "").lower()
-        note = d.get("note") or ""
-        if mac:
-            v = vendor_from_mac(mac)
-            if v:
-                note += (", " if note else "") + f"vendor:{v}"
-            else:
-                if _is_locally_administered(mac):
-                    note += (", " if note else "") + "mac:private"
-                    if "iphone" in host:
-                        note += ", guess:Apple(iOS private MAC)"
-        d["note"] = note
+def _enrich_vendor(devs: List[Device]) -> List[Device]:
+    """Añade fabricante por OUI ('vendor'); etiqueta 'mac:private' y pista de iPhone si aplica."""
+    with_mac = [d for d in devs if d.mac_int is not None]
+    vendors = vendors_for_macs([d.mac for d in with_mac])  # índice OUI en bloque (caché persistente si no hay índice)
+    for d, v in zip(with_mac, vendors):
+        apply_vendor(d, v)
     return devs
 
 
-def _finalize(devs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Orden por IP, enriquecer hostname y vendor, y deduplicar por IP (último visto)."""
+def finalize(devs: List[Any], resolve_names: bool = True) -> List[Device]:
+    """
+    Deduplicar por IP (último visto), enriquecer hostname y vendor, y ordenar por IP.
+    Acepta Device o dicts {ip, mac, hostname, note} y devuelve Device.
+    resolve_names=False evita consultas de nombre en la red (inventario pasivo).
+    """
     # dedupe por IP
-    dedup: Dict[str, Dict[str, Any]] = {}
+    dedup: Dict[int, Device] = {}
     for d in devs:
-        dedup[d["ip"]] = d
+        d = as_device(d)
+        dedup[d.ip_int] = d
     devs = list(dedup.values())
     # enriquecer
-    devs = _enrich_hostnames(devs)
-    devs = _enrich_vendor(devs)
+    with stage("scan.enrich"):
+        if resolve_names:
+            devs = _enrich_hostnames(devs)
+        devs = _enrich_vendor(devs)
+        get_cache().save()
     # ordenar
-    devs.sort(key=lambda d: tuple(int(x) for x in d["ip"].split(".")))
+    devs.sort(key=sort_key)
     return devs
 
 
@@ -144,75 +229,136 @@ def _finalize(devs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
 #  Escaneo L2 y Fallback
 # -----------------------
 
-def _arp_scan_layer2(cidr: str, iface: str, timeout: int = 3) -> List[Dict[str, Any]]:
+def _start_arp_sniffer(iface: str, prn) -> AsyncSniffer:
     """
-    Preferido: ARP a nivel 2 (rápido/fiable). Requiere pcap/Npcap en Windows.
-    Hacemos 2 pasadas con retry para “despertar” clientes adormecidos.
+    Arranca un sniffer de ARP replies en segundo plano y espera a que esté listo.
+    Filtro BPF en kernel si se puede compilar (libpcap/tcpdump); si no, filtro en Python.
+    Lanza RuntimeError si no se puede capturar (sin pcap/Npcap o permisos).
     """
-    conf.verb = 0
-    net = ipaddress.IPv4Network(cidr)
-    results: List[Dict[str, Any]] = []
-
-    for _ in range(2):
-        answered, _ = srp(
-            Ether(dst="ff:ff:ff:ff:ff:ff") / ARP(pdst=str(net)),
-            iface=iface,
-            timeout=timeout + 1,   # un poco más paciente
-            retry=1,
-            inter=0.02
-        )
-        for _, r in answered:
-            ip = r.psrc
-            mac = r.hwsrc
-            host = try_reverse_dns(ip)
-            results.append({"ip": ip, "mac": mac, "hostname": host, "note": ""})
-        time.sleep(0.3)
-
-    return _finalize(results)
-
-
-def _icmp_ping_sweep(cidr: str, timeout: float = 0.6) -> List[str]:
+    for kwargs in ({"filter": "arp and arp[6:2] = 2"}, {"lfilter": lambda p: ARP in p}):
+        ready = threading.Event()
+        sniffer = AsyncSniffer(iface=iface, prn=prn, store=False, started_callback=ready.set, **kwargs)
+        sniffer.start()
+        limit = time.monotonic() + 3
+        while not ready.wait(0.05):
+            if time.monotonic() > limit or not (sniffer.thread and sniffer.thread.is_alive()):
+                break
+        if ready.is_set():
+            return sniffer
+        # El hilo murió al arrancar; limpiamos y probamos la siguiente opción
+        try:
+            sniffer.stop(join=True)
+        except Exception:
+            pass
+    raise RuntimeError("Sniffer ARP L2 no disponible")
+
+
+def arp_probe(
+    targets: List[str],
+    iface: str,
+    timeout: float = 3,
+    quiet: float = 0.5,
+    max_passes: int = 3,
+    inter: float = 0.001,
+    stats: Optional[Dict[str, Any]] = None,
+    on_host: Optional[Callable[[str, str], None]] = None,
+) -> Dict[str, str]:
     """
-    Fallback: barrido ICMP (Echo) en toda la subred. Devuelve IPs que respondieron.
-    En Windows puede requerir consola de Admin para raw sockets.
+    ARP L2 adaptativo (scapy) sobre una lista de IPs. Devuelve {ip: mac} de las que respondieron.
+    Un sniffer recoge las respuestas mientras se envía; cada pasada termina tras
+    'quiet' s sin respuestas nuevas (máx. 'timeout' s) y las siguientes solo
+    reintentan las IPs que no contestaron, para “despertar” clientes adormecidos.
+    Si una reintentona no aporta nada, se para.
+    En stats["l2_passes"] queda el tiempo y los aciertos de cada pasada.
+    'on_host(ip, mac)' se invoca con cada respuesta nueva (desde el hilo del sniffer).
+    Lanza RuntimeError si no se puede capturar (sin pcap/Npcap o permisos).
     """
-    live_ips: List[str] = []
-    net = ipaddress.IPv4Network(cidr)
-    for ip in net.hosts():
-        ip_str = str(ip)
+    conf.verb = 0
+    # Nuestras propias IPs no cuentan: el sniffer también ve los replies que enviamos
+    own = {a.address for a in psutil.net_if_addrs().get(iface, []) if a.family == socket.AF_INET}
+    wanted = set(targets) - own
+    found: Dict[str, str] = {}  # ip -> mac
+    last_hit = [0.0]
+    passes: List[Dict[str, Any]] = []
+
+    def on_reply(pkt):
+        arp = pkt[ARP]
+        if arp.op == 2 and arp.psrc in wanted and arp.psrc not in found:
+            found[arp.psrc] = arp.hwsrc
+            last_hit[0] = time.monotonic()
+            if on_host:
+                on_host(arp.psrc, arp.hwsrc)
+
+    sniffer = _start_arp_sniffer(iface, on_reply)
+    try:
+        for n in range(1, max_passes + 1):
+            pending = [ip for ip in targets if ip in wanted and ip not in found]
+            if not pending:
+                break
+            before = len(found)
+            t0 = time.monotonic()
+            sendp(Ether(dst="ff:ff:ff:ff:ff:ff") / ARP(pdst=pending), iface=iface, inter=inter, verbose=False)
+            sent_at = time.monotonic()
+            # Esperar hasta 'quiet' s sin respuestas nuevas (con tope 'timeout')
+            while True:
+                now = time.monotonic()
+                if now - max(sent_at, last_hit[0]) >= quiet or now - sent_at >= timeout:
+                    break
+                time.sleep(0.02)
+            hits = len(found) - before
+            passes.append({
+                "pass": n, "sent": len(pending), "hits": hits,
+                "elapsed_s": round(time.monotonic() - t0, 3),
+            })
+            if n > 1 and hits == 0:
+                break
+    finally:
         try:
-            ans = sr1(IP(dst=ip_str) / ICMP(), timeout=timeout, verbose=False)
-            if ans is not None:
-                live_ips.append(ip_str)
-        except PermissionError:
-            pass
+            sniffer.stop()
         except Exception:
             pass
-    return live_ips
+        if stats is not None:
+            stats["l2_passes"] = passes
+    return found
+
+
+def _arp_scan_layer2(
+    cidr: str,
+    iface: str,
+    on_host: Callable[..., None],
+    timeout: float = 3,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Dict[str, str]:
+    """
+    Preferido: ARP a nivel 2 (rápido/fiable). Requiere pcap/Npcap en Windows.
+    Escaneo adaptativo de toda la subred con 'arp_probe'; cada respuesta va a 'on_host'.
+    """
+    net = ipaddress.IPv4Network(cidr)
+    return arp_probe([str(ip) for ip in net.hosts()], iface, timeout=timeout, stats=stats, on_host=on_host)
 
 
-def _touch_host(ip: str, ports=(80, 443, 554, 8009)) -> None:
-    """Intenta conexiones TCP cortas para forzar resolución ARP del SO."""
-    for p in ports:
-        try:
-            s = pysock.socket(pysock.AF_INET, pysock.SOCK_STREAM)
-            s.settimeout(0.2)
-            s.connect_ex((ip, p))  # no lanza excepción
-        except Exception:
-            pass
-        finally:
-            try:
-                s.close()
-            except Exception:
-                pass
+def _icmp_ping_sweep(cidr: str, timeout: float = 1.0, rate: float = 1000.0) -> List[str]:
+    """
+    Fallback: barrido ICMP (Echo) en toda la subred. Devuelve IPs que respondieron.
+    Envío concurrente con ritmo 'rate' (pps); la duración depende de 'timeout', no del nº de hosts.
+    En Windows puede requerir consola de Admin para raw sockets.
+    """
+    net = ipaddress.IPv4Network(cidr)
+    return icmp_sweep((str(ip) for ip in net.hosts()), timeout=timeout, rate=rate)
 
 
 def _read_arp_table() -> Dict[str, str]:
     """
     Lee la tabla ARP del sistema y devuelve {ip -> mac} (minúsculas).
+    - Linux: rtnetlink / /proc/net/arp, sin procesos (ver neigh.py)
     - Windows: 'arp -a'
-    - Linux/macOS: 'ip neigh show'
+    - macOS y resto: 'ip neigh show'
     """
+    if neigh.available():
+        try:
+            return neigh.read_table()
+        except OSError:
+            pass
     osname = platform.system().lower()
     mapping: Dict[str, str] = {}
     if "windows" in osname:
@@ -235,64 +381,171 @@ def _read_arp_table() -> Dict[str, str]:
     return mapping
 
 
-def _inventory_via_icmp_and_arp(cidr: str) -> List[Dict[str, Any]]:
+def _inventory_via_icmp_and_arp(cidr: str, on_host: Callable[..., None], arp_wait: float = 2.0) -> List[str]:
     """
     Fallback completo: ICMP sweep + "touch" TCP para poblar ARP + lectura ARP del SO.
+    El touch es un único bucle no bloqueante para todas las IPs (ver touch.py).
+    En Linux se escuchan los eventos de vecinos del kernel: las IPs que el barrido ya
+    resolvió no se tocan, el resto se deja de tocar en cuanto tiene MAC, y se espera
+    solo hasta que cada IP tenga MAC (o falle), con 'arp_wait' como tope; en el resto,
+    pausa fija si alguna IP no respondió al touch.
+    Cada IP viva va a 'on_host(ip, mac, tags)' al conocerse su MAC; devuelve las IPs vivas.
     """
-    ips_up = _icmp_ping_sweep(cidr)
-
-    # Dispara ARP en el SO hacia cada IP viva
-    for ip in ips_up:
-        _touch_host(ip)
-    time.sleep(0.5)  # deja que el SO resuelva ARP
+    with stage("scan.icmp_sweep"):
+        ips_up = _icmp_ping_sweep(cidr)
+    count("scan.icmp_replies", len(ips_up))
 
-    arp_map = _read_arp_table()
-    devices: List[Dict[str, Any]] = []
+    arp_map: Optional[Dict[str, str]] = None
+    touch: Dict[str, Any] = {}
+    if neigh.available():
+        try:
+            with neigh.NeighborWatch() as watch:  # suscrito antes de generar tráfico
+                watch.expect(ips_up)
+                with stage("scan.tcp_touch"):
+                    tcp_touch(ips_up, watch=watch, stats=touch)
+                with stage("scan.arp_wait"):
+                    arp_map = watch.wait(ips_up, timeout=arp_wait)
+        except OSError:
+            arp_map = None
+    if arp_map is None:
+        # Dispara ARP en el SO hacia cada IP viva
+        with stage("scan.tcp_touch"):
+            answered = tcp_touch(ips_up, stats=touch)
+        with stage("scan.arp_wait"):
+            if len(answered) < len(ips_up):
+                time.sleep(0.5)  # deja que el SO resuelva ARP de las que no respondieron
+            arp_map = _read_arp_table()
+    count("scan.tcp_connects", touch.get("connects", 0))
     for ip in ips_up:
-        mac = arp_map.get(ip, "")
-        host = try_reverse_dns(ip)
-        devices.append({"ip": ip, "mac": mac, "hostname": host, "note": "icmp+os-arp"})
-
-    return _finalize(devices)
-
-
-def arp_scan(cidr: str, iface: str, timeout: int = 3) -> List[Dict[str, Any]]:
+        on_host(ip, arp_map.get(ip, ""), ("icmp+os-arp",))
+    return ips_up
+
+
+def _arp_scan_raw(
+    cidr: str,
+    iface: str,
+    on_host: Callable[..., None],
+    timeout: float = 3,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Dict[str, str]:
+    """ARP L2 con el motor AF_PACKET (Linux, subredes grandes); cada respuesta va a 'on_host'."""
+    return raw_arp_scan(cidr, iface, timeout=timeout, stats=stats, on_host=on_host)
+
+
+@timed("scan.segment")
+def arp_scan(
+    cidr: str,
+    iface: str,
+    timeout: float = 3,
+    stats: Optional[Dict[str, Any]] = None,
+    engine: str = "auto",
+) -> List[Device]:
     """
     API pública del escaneo:
-      1) Intentar ARP L2 (rápido).
+      1) Intentar ARP L2 adaptativo (rápido). Motor según 'engine':
+         - "raw": socket AF_PACKET (Linux); "scapy": sendp + sniffer;
+         - "auto": AF_PACKET si está disponible y la red supera RAW_ENGINE_MIN_HOSTS.
+         Si el motor raw falla (permisos, plataforma), se usa scapy.
       2) Si falla (sin pcap/Npcap o permisos), usar fallback ICMP + ARP SO.
-      3) En ambos caminos, enriquecer hostnames y fabricante y ordenar.
+      3) En ambos caminos, cada host que responde pasa al momento al enriquecido
+         de hostname y fabricante (ScanPipeline, en paralelo al barrido); al final,
+         dedupe y orden por IP.
+    Si se pasa 'stats' (dict), se rellena con el método usado, la duración y los
+    tiempos del pipeline (stats["pipeline"]).
     """
-    try:
-        return _arp_scan_layer2(cidr, iface, timeout=timeout)
-    except Exception:
-        return _inventory_via_icmp_and_arp(cidr)
+    if engine not in ENGINES:
+        raise ValueError(f"Motor ARP desconocido: {engine} (válidos: {', '.join(ENGINES)})")
+    stats = stats if stats is not None else {}
+    t0 = time.monotonic()
+    use_raw = engine == "raw" or (
+        engine == "auto"
+        and rawarp_available()
+        and ipaddress.IPv4Network(cidr, strict=False).num_addresses > RAW_ENGINE_MIN_HOSTS
+    )
+    with ScanPipeline() as pipe:
+        done = False
+        if use_raw:
+            try:
+                with stage("scan.arp_l2"):
+                    _arp_scan_raw(cidr, iface, pipe.on_host, timeout=timeout, stats=stats)
+                stats["method"] = "arp-l2"
+                done = True
+            except Exception:
+                pass
+        if not done:
+            try:
+                with stage("scan.arp_l2"):
+                    _arp_scan_layer2(cidr, iface, pipe.on_host, timeout=timeout, stats=stats)
+                stats["method"] = "arp-l2"
+                stats["engine"] = "scapy"
+            except Exception:
+                _inventory_via_icmp_and_arp(cidr, pipe.on_host)
+                stats["method"] = "icmp+os-arp"
+        with stage("scan.enrich_wait"):
+            devices = pipe.finish()
+    stats["pipeline"] = pipe.stats
+    for p in stats.get("l2_passes", ()):
+        count("scan.arp_requests", p["sent"])
+        count("scan.arp_replies", p["hits"])
+    stats["elapsed_s"] = round(time.monotonic() - t0, 3)
+    return devices
+
+
+def scan_segments(
+    segments: List[Tuple[str, str]],
+    timeout: float = 3,
+    engine: str = "auto",
+) -> Tuple[List[Device], List[Dict[str, Any]]]:
+    """
+    Escanea varios segmentos (iface, cidr) en paralelo con 'arp_scan' y fusiona
+    el inventario (dedupe por IP, orden por IP). El tiempo total es el del segmento
+    más lento. Devuelve (devices, stats por segmento).
+    """
+    if engine not in ENGINES:  # antes de lanzar nada: no es un fallo de un segmento
+        raise ValueError(f"Motor ARP desconocido: {engine} (válidos: {', '.join(ENGINES)})")
+    stats = [{"iface": iface, "cidr": cidr} for iface, cidr in segments]
+    merged: Dict[int, Any] = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(segments)), thread_name_prefix="wg-segment") as pool:
+        futures = [
+            pool.submit(arp_scan, cidr, iface, timeout, st, engine)
+            for (iface, cidr), st in zip(segments, stats)
+        ]
+        for fut, st in zip(futures, stats):
+            try:
+                for d in fut.result():
+                    merged[sort_key(d)] = d
+            except Exception as e:
+                st["error"] = str(e)
+    devices = sorted(merged.values(), key=sort_key)
+    return devices, stats
 
 
 # -----------------------
 #  Monitor ARP Spoof
 # -----------------------
 
-def monitor_arp_spoof(duration_sec: int = 60):
+def monitor_arp_spoof(
+    duration_sec: Optional[float] = 60,
+    iface: Optional[str] = None,
+    stats: Optional[Dict[str, Any]] = None,
+    on_event=None,
+    stop: Optional[threading.Event] = None,
+    baseline: Optional[Dict[str, str]] = None,
+    threshold: int = 50,
+    pcap: Optional[Path] = None,
+):
     """
-    Escucha ARP replies durante 'duration_sec' y alerta si una IP “cambia” de MAC.
+    Escucha ARP replies (y ARP gratuitos) durante 'duration_sec' y alerta si una IP “cambia” de MAC.
+    Ruta de alto ritmo: BPF en kernel + decodificación desde bytes (ver arpmon.py).
+    duration_sec=None → sin límite; 'on_event' recibe cada alerta al momento.
+    'baseline' ({ip: mac}) y 'threshold' ajustan la puntuación de cada cambio.
+    Con 'pcap' analiza ese fichero en lugar de escuchar en vivo.
     Sin pcap/Npcap en Windows o sin permisos, devuelve nota informativa.
     """
-    ip_to_mac: Dict[str, str] = {}
-    anomalies: List[str] = []
-
-    def handler(pkt):
-        if pkt.haslayer(ARP) and pkt[ARP].op == 2:  # is-at
-            ip = pkt[ARP].psrc
-            mac = pkt[ARP].hwsrc
-            prev = ip_to_mac.get(ip)
-            if prev and prev != mac:
-                anomalies.append(f"ARP cambio sospechoso: {ip} -> {prev} ahora {mac}")
-            ip_to_mac[ip] = mac
-
     try:
-        sniff(filter="arp", prn=handler, store=False, timeout=duration_sec)
+        return monitor_arp(duration_sec=duration_sec, iface=iface, stats=stats, on_event=on_event, stop=stop,
+                           baseline=baseline, threshold=threshold, pcap=pcap)
+    except (KeyboardInterrupt, FileNotFoundError, PcapError):
+        raise
     except Exception:
-        anomalies.append("Sniff ARP no disponible (falta Npcap/WinPcap o permisos).")
-
-    return anomalies
+        return ["Sniff ARP no disponible (falta Npcap/WinPcap o permisos)."]
@@ -0,0 +1,183 @@
+"""
+Barrido ICMP (Echo) concurrente sobre un conjunto de IPs.
+
+- Envío por un único socket raw a un ritmo configurable (paquetes/segundo).
+- Recepción en el mismo bucle (select): las respuestas se emparejan por
+  identificador/secuencia ICMP, no por orden de llegada.
+- Plazo global: el tiempo total depende del timeout, no del nº de hosts.
+- Sin raw sockets (sin privilegios): unos pocos lotes 'sr' de scapy.
+"""
+
+from __future__ import annotations
+from typing import Callable, Dict, Iterable, List, Optional
+import os
+import select
+import socket
+import struct
+import time
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+# Tamaño de lote para el fallback con scapy (cada 'sr' guarda los paquetes en memoria)
+SCAPY_BATCH = 1024
+
+
+def _checksum(data: bytes) -> int:
+    """Checksum de Internet (RFC 1071)."""
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _echo_request(ident: int, seq: int, payload: bytes = b"wifi-guardian") -> bytes:
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    csum = _checksum(header + payload)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, csum, ident, seq) + payload
+
+
+def _parse_echo_reply(data: bytes):
+    """
+    Devuelve (ip_origen, ident, seq) si 'data' es un Echo Reply con cabecera IP.
+    Si no lo es, devuelve None.
+    """
+    if len(data) < 28:
+        return None
+    ihl = (data[0] & 0x0F) * 4
+    if len(data) < ihl + 8:
+        return None
+    icmp_type, _, _, ident, seq = struct.unpack_from("!BBHHH", data, ihl)
+    if icmp_type != ICMP_ECHO_REPLY:
+        return None
+    return socket.inet_ntoa(data[12:16]), ident, seq
+
+
+def _sweep_raw(
+    targets: List[str],
+    timeout: float,
+    rate: float,
+    deadline: float,
+    on_reply: Optional[Callable[[str], None]],
+) -> List[str]:
+    """Motor principal: un socket raw, envío con ritmo y recepción no bloqueante."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+    try:
+        sock.setblocking(False)
+        ident = (os.getpid() ^ int(time.time() * 1000)) & 0xFFFF
+        # ip -> seq esperado; 'seq' se repite a partir de 65536 hosts pero la IP desambigua
+        pending: Dict[str, int] = {ip: i & 0xFFFF for i, ip in enumerate(targets)}
+        alive: List[str] = []
+        interval = 1.0 / rate if rate > 0 else 0.0
+        start = time.monotonic()
+        next_idx = 0
+        last_send = start
+
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            # Enviar lo que "toca" según el ritmo (ráfagas si vamos con retraso)
+            while next_idx < len(targets) and (interval == 0 or start + next_idx * interval <= now):
+                ip = targets[next_idx]
+                try:
+                    sock.sendto(_echo_request(ident, next_idx & 0xFFFF), (ip, 0))
+                except (BlockingIOError, InterruptedError):
+                    break  # buffer lleno: reintenta en la próxima vuelta
+                except OSError:
+                    pass  # destino inalcanzable, broadcast, etc.
+                next_idx += 1
+                last_send = time.monotonic()
+
+            if next_idx >= len(targets) and now >= last_send + timeout:
+                break
+
+            if next_idx < len(targets):
+                wait = max(0.0, min(start + next_idx * interval - now, 0.05))
+            else:
+                wait = max(0.0, min(last_send + timeout, deadline) - now)
+            readable, _, _ = select.select([sock], [], [], wait)
+            if not readable:
+                continue
+            # Vaciar todo lo disponible
+            while True:
+                try:
+                    data = sock.recv(2048)
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError:
+                    break
+                parsed = _parse_echo_reply(data)
+                if not parsed:
+                    continue
+                src, rid, rseq = parsed
+                if rid == ident and pending.get(src) == rseq:
+                    del pending[src]
+                    alive.append(src)
+                    if on_reply:
+                        on_reply(src)
+        return alive
+    finally:
+        sock.close()
+
+
+def _sweep_scapy(
+    targets: List[str],
+    timeout: float,
+    rate: float,
+    deadline: float,
+    on_reply: Optional[Callable[[str], None]],
+) -> List[str]:
+    """Fallback: lotes 'sr' de scapy (scapy empareja id/seq internamente)."""
+    from scapy.all import IP, ICMP, sr  # type: ignore
+
+    ident = os.getpid() & 0xFFFF
+    alive: List[str] = []
+    inter = 1.0 / rate if rate > 0 else 0
+    for i in range(0, len(targets), SCAPY_BATCH):
+        if time.monotonic() >= deadline:
+            break
+        chunk = targets[i:i + SCAPY_BATCH]
+        pkts = [IP(dst=ip) / ICMP(id=ident, seq=(i + j) & 0xFFFF) for j, ip in enumerate(chunk)]
+        try:
+            answered, _ = sr(pkts, timeout=timeout, inter=inter, verbose=False)
+        except Exception:
+            continue
+        for _, r in answered:
+            alive.append(r.src)
+            if on_reply:
+                on_reply(r.src)
+    return alive
+
+
+def icmp_sweep(
+    targets: Iterable[str],
+    timeout: float = 1.0,
+    rate: float = 1000.0,
+    deadline: Optional[float] = None,
+    on_reply: Optional[Callable[[str], None]] = None,
+) -> List[str]:
+    """
+    Envía un Echo Request a cada IP de 'targets' y devuelve las que respondieron.
+
+    - timeout: espera tras el último envío (segundos).
+    - rate: paquetes por segundo (0 = sin límite).
+    - deadline: tope total en segundos (por defecto: tiempo de envío + timeout).
+    - on_reply: callback opcional invocado con cada IP según responde.
+    """
+    ips = list(dict.fromkeys(targets))
+    if not ips:
+        return []
+    if deadline is None:
+        deadline = (len(ips) / rate if rate > 0 else 0.0) + timeout + 1.0
+    limit = time.monotonic() + deadline
+    try:
+        return _sweep_raw(ips, timeout, rate, limit, on_reply)
+    except (PermissionError, OSError):
+        # Sin raw sockets (usuario sin privilegios / Windows sin Admin)
+        try:
+            return _sweep_scapy(ips, timeout, rate, limit, on_reply)
+        except Exception:
+            return []
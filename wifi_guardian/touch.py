@@ -0,0 +1,169 @@
+"""
+"Touch" TCP concurrente: conexiones cortas para que el SO resuelva ARP de cada IP.
+
+- Connects no bloqueantes a todos los pares (ip, puerto) a la vez desde un único
+  bucle (selectors), con un tope global de sockets abiertos.
+- Orden por puerto: primero un connect a cada host; el siguiente puerto solo para
+  los que sigan sin respuesta.
+- Un host deja de tocarse en cuanto hay prueba de que su vecino está resuelto:
+  el connect termina (aceptado o RST) o, con un NeighborWatch (neigh.py), el kernel
+  anuncia la entrada. Sus sockets pendientes se cierran y su cola se salta.
+- Tiempo total acotado por oleadas (pares / tope) × timeout, no por nº de hosts × puertos.
+"""
+
+from __future__ import annotations
+from typing import Any, Collection, Deque, Dict, Iterable, Optional, Set, Tuple
+from collections import deque
+import errno
+import selectors
+import socket
+import time
+
+TOUCH_PORTS = (80, 443, 554, 8009)
+MAX_SOCKETS = 512
+
+_IN_PROGRESS = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY, getattr(errno, "WSAEWOULDBLOCK", -1)}
+# El vecino respondió en L2: el connect llegó al host (aceptado o rechazado)
+_ANSWERED = {0, errno.ECONNREFUSED, errno.ECONNRESET}
+
+
+def _socket_cap(max_sockets: int) -> int:
+    """Tope de sockets respetando el límite de descriptores del proceso."""
+    try:
+        import resource
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY:
+            max_sockets = min(max_sockets, soft - 64)
+    except (ImportError, OSError, ValueError):
+        pass
+    return max(1, max_sockets)
+
+
+def tcp_touch(
+    ips: Iterable[str],
+    ports: Collection[int] = TOUCH_PORTS,
+    timeout: float = 0.25,
+    max_sockets: int = MAX_SOCKETS,
+    watch: Optional[Any] = None,
+    deadline: Optional[float] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Set[str]:
+    """
+    Lanza connects TCP no bloqueantes a cada (ip, puerto) y devuelve las IPs que
+    respondieron (aceptado / RST): esas ya tienen MAC en la tabla ARP del SO.
+
+    - timeout: vida máxima de cada connect (segundos).
+    - max_sockets: tope global de sockets abiertos a la vez.
+    - watch: NeighborWatch opcional (ya con 'expect'); si el kernel resuelve o da por
+      FAILED una IP, se deja de tocar aunque sus connects no hayan terminado.
+    - deadline: tope total en segundos (por defecto, solo el de las oleadas).
+    - stats: si se pasa, se rellena con connects, skipped, cancelled, expired,
+      peak_open y elapsed_ms.
+    """
+    stats = stats if stats is not None else {}
+    t0 = time.monotonic()
+    targets = list(dict.fromkeys(ips))
+    queue: Deque[Tuple[str, int]] = deque((ip, port) for port in ports for ip in targets)
+    cap = _socket_cap(max_sockets)
+    limit = t0 + deadline if deadline is not None else None
+
+    answered: Set[str] = set()
+    settled: Set[str] = set()                            # respondidas, FAILED o resueltas por el kernel
+    expiry: Dict[socket.socket, float] = {}              # orden de inserción = orden de vencimiento
+    sel_ip: Dict[socket.socket, str] = {}
+    by_ip: Dict[str, Set[socket.socket]] = {}
+    counts = {"connects": 0, "skipped": 0, "cancelled": 0, "expired": 0, "peak_open": 0}
+
+    sel = selectors.DefaultSelector()
+
+    def close(s: socket.socket) -> None:
+        sel.unregister(s)
+        del expiry[s]
+        by_ip[sel_ip.pop(s)].discard(s)
+        s.close()
+
+    def settle(ip: str) -> None:
+        settled.add(ip)
+        for s in list(by_ip.get(ip, ())):
+            close(s)
+            counts["cancelled"] += 1
+
+    if watch is not None:
+        sel.register(watch, selectors.EVENT_READ, None)
+        settled.update(ip for ip in targets if watch.done(ip))
+
+    try:
+        while queue or expiry:
+            now = time.monotonic()
+            if limit is not None and now >= limit:
+                break
+
+            # Lanzar hasta el tope
+            while queue and len(expiry) < cap:
+                ip, port = queue.popleft()
+                if ip in settled:
+                    counts["skipped"] += 1
+                    continue
+                try:
+                    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                except OSError:  # sin descriptores: reintenta cuando se libere alguno
+                    queue.appendleft((ip, port))
+                    if not expiry:
+                        queue.clear()  # ni uno libre: no hay nada que esperar
+                    cap = max(1, len(expiry))
+                    break
+                s.setblocking(False)
+                err = s.connect_ex((ip, port))
+                counts["connects"] += 1
+                if err in _IN_PROGRESS:
+                    sel.register(s, selectors.EVENT_WRITE, ip)
+                    expiry[s] = now + timeout
+                    sel_ip[s] = ip
+                    by_ip.setdefault(ip, set()).add(s)
+                    continue
+                s.close()
+                if err in _ANSWERED:
+                    answered.add(ip)
+                    settle(ip)
+                elif err in (errno.EHOSTUNREACH, errno.ENETUNREACH):
+                    settle(ip)
+            counts["peak_open"] = max(counts["peak_open"], len(expiry))
+            if not expiry:
+                continue
+
+            wait = next(iter(expiry.values())) - now
+            if limit is not None:
+                wait = min(wait, limit - now)
+            for key, _ in sel.select(max(0.0, wait)):
+                if key.data is None:
+                    for ip in watch.drain():
+                        settle(ip)
+                    continue
+                s = key.fileobj
+                if s not in expiry:  # cerrado en esta misma vuelta (settle)
+                    continue
+                ip = key.data
+                err = s.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                close(s)
+                if err in _ANSWERED:
+                    answered.add(ip)
+                    settle(ip)
+                elif err == errno.EHOSTUNREACH:  # ARP fallido: más puertos no cambian nada
+                    settle(ip)
+
+            # Vencidos (los primeros del dict son los más antiguos)
+            now = time.monotonic()
+            while expiry:
+                s, exp = next(iter(expiry.items()))
+                if exp > now:
+                    break
+                close(s)
+                counts["expired"] += 1
+    finally:
+        for s in list(expiry):
+            close(s)
+        sel.close()
+
+    counts["elapsed_ms"] = round((time.monotonic() - t0) * 1000, 1)
+    stats.update(counts)
+    return answered
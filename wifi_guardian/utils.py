@@ -1,13 +1,15 @@
 """
 Funciones auxiliares de red:
 - Conversión (IP, máscara) → CIDR.
-- Reverse DNS para intentar obtener el hostname de una IP.
+- Reverse DNS para intentar obtener el hostname de una IP (consultando antes la caché).
 """
 
 import ipaddress
 import socket
 from typing import Optional
 
+from .cache import get_cache
+
 def cidr_from_ip_mask(ip: str, netmask: str) -> Optional[str]:
     """
     Dado una IP y su máscara, devuelve la red en formato CIDR (ej. '192.168.1.0/24').
@@ -20,15 +22,24 @@ def cidr_from_ip_mask(ip: str, netmask: str) -> Optional[str]:
     except Exception:
         return None
 
-def try_reverse_dns(ip: str) -> str:
+def try_reverse_dns(ip: str, mac: str = "") -> str:
     """
     Intenta resolver el nombre de host (PTR) para una IP.
     Si falla, devuelve cadena vacía.
 
+    Primero mira la caché persistente (clave IP+MAC): una entrada vigente
+    sin nombre de origen DNS evita repetir un gethostbyaddr que ya falló.
+
     Útil para enriquecer informes con nombres de dispositivos.
     """
+    cache = get_cache()
+    hit = cache.get_hostname(ip, mac)
+    if hit is not None:
+        name, source = hit
+        return name if source == "dns" else ""
     try:
         name, _, _ = socket.gethostbyaddr(ip)
+        cache.put_hostname(ip, mac, name, "dns")
         return name
     except Exception:
         return ""
\ No newline at end of file
@@ -1,44 +1,307 @@
 """
 Consulta de fabricante (OUI) a partir de una MAC.
-Usa una base local que la librería descarga/gestiona.
+
+La fuente es la base que descarga 'mac-vendor-lookup' (MA-L, prefijos de 24 bits)
+más los registros MA-M (28 bits) y MA-S (36 bits) del IEEE. En 'vendors-update'
+se compila todo en un índice binario compacto que se abre con mmap:
+  - cabecera + tres tablas ordenadas de claves enteras (24/28/36 bits),
+  - id de fabricante por clave y tabla de cadenas (offsets + blob UTF-8).
+Buscar es una búsqueda binaria (microsegundos) y arrancar no parsea texto.
+Si el índice no existe, se compila una vez desde la base local; si tampoco
+hay base, se usa MacLookup como antes (con la caché persistente delante).
 """
 
 from __future__ import annotations
-from typing import Optional
-from mac_vendor_lookup import MacLookup
+from typing import Dict, Iterable, List, Optional, Tuple
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+import mmap
+import os
+import struct
 
-# Singleton simple para evitar re-cargar la DB muchas veces
-_lookup: Optional[MacLookup] = None
+from .cache import get_cache
+from .profiling import count, timed
 
-def vendor_from_mac(mac: str) -> str:
+INDEX_PATH = Path(os.path.expanduser("~/.cache/wifi-guardian-oui.idx"))
+
+# Registros extra del IEEE (MA-M / MA-S); MA-L la gestiona mac-vendor-lookup
+IEEE_EXTRA_URLS = (
+    "https://standards-oui.ieee.org/oui28/mam.txt",
+    "https://standards-oui.ieee.org/oui36/oui36.txt",
+)
+
+_MAGIC = b"WGOUI\x00\x00\x01"
+_HEADER = struct.Struct("=8sQIIII")  # magic, marca de endianness, n24, n28, n36, n_vendors
+_ENDIAN_MARK = 0x0102030405060708
+_PREFIX_BITS = (36, 28, 24)          # orden de búsqueda: el prefijo más largo gana
+
+
+# -----------------------
+#  Compilación del índice
+# -----------------------
+
+def _parse_ieee_lines(lines: Iterable[str]) -> Iterable[Tuple[int, int, str]]:
     """
-    Devuelve el nombre del fabricante para una MAC (si existe).
-    - Normaliza may/min.
-    - Captura excepciones y devuelve "" si no hay match.
+    Extrae (bits, prefijo, fabricante) de un listado IEEE (oui.txt, mam.txt, oui36.txt)
+    o del formato 'PREFIJO:Fabricante' que guarda mac-vendor-lookup.
+    En MA-M/MA-S la línea '(base 16)' trae el rango de los 24 bits bajos
+    y el OUI viene en la línea '(hex)' anterior.
+    """
+    oui = ""
+    for line in lines:
+        if "(hex)" in line:
+            oui = line.split("(hex)", 1)[0].strip().replace("-", "").upper()
+            continue
+        if "(base 16)" in line:
+            token, vendor = (x.strip() for x in line.split("(base 16)", 1))
+        elif ":" in line and "\t" not in line:
+            token, vendor = (x.strip() for x in line.split(":", 1))
+        else:
+            continue
+        if not vendor:
+            continue
+        try:
+            if "-" in token:
+                start, end = token.split("-", 1)
+                if len(start) < 12:
+                    start, end = oui + start, oui + end
+                lo, hi = int(start, 16), int(end, 16)
+                bits = 48 - (hi - lo + 1).bit_length() + 1
+                yield bits, lo >> (48 - bits), vendor
+            elif len(token) == 6:
+                yield 24, int(token, 16), vendor
+        except ValueError:
+            continue
+
+
+@timed("vendor.build_index")
+def build_index(sources: Iterable[Iterable[str]], path: Path = INDEX_PATH) -> int:
+    """
+    Compila el índice binario a partir de uno o varios listados (iterables de líneas).
+    Devuelve el nº de prefijos indexados.
     """
+    tables: Dict[int, Dict[int, int]] = {b: {} for b in _PREFIX_BITS}
+    vendor_ids: Dict[str, int] = {}
+    for lines in sources:
+        for bits, prefix, vendor in _parse_ieee_lines(lines):
+            if bits not in tables:
+                continue
+            vid = vendor_ids.setdefault(vendor, len(vendor_ids))
+            tables[bits][prefix] = vid
+
+    blob = bytearray()
+    offsets = array("I", [0])
+    for vendor in vendor_ids:  # dict conserva el orden de inserción = id
+        blob += vendor.encode("utf-8")
+        offsets.append(len(blob))
+
+    parts = [_HEADER.pack(_MAGIC, _ENDIAN_MARK, *(len(tables[b]) for b in (24, 28, 36)), len(vendor_ids))]
+    for bits in (24, 28, 36):
+        keys = sorted(tables[bits])
+        parts.append(array("Q", keys).tobytes())
+        ids = array("I", (tables[bits][k] for k in keys)).tobytes()
+        parts.append(ids + b"\x00" * (-len(ids) % 8))  # alinear a 8 bytes
+    parts.append(offsets.tobytes())
+    parts.append(bytes(blob))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(b"".join(parts))
+    os.replace(tmp, path)
+    return sum(len(t) for t in tables.values())
+
+
+class _OuiIndex:
+    """Vista mmap del índice; las tablas se leen sin copiarlas a objetos Python."""
+
+    def __init__(self, path: Path):
+        self._fh = open(path, "rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, mark, n24, n28, n36, nv = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC or mark != _ENDIAN_MARK:
+            raise ValueError("Índice OUI incompatible")
+        view = memoryview(self._mm)
+        pos = _HEADER.size
+        self._tables: Dict[int, Tuple[memoryview, memoryview]] = {}
+        for bits, n in ((24, n24), (28, n28), (36, n36)):
+            keys = view[pos:pos + 8 * n].cast("Q")
+            pos += 8 * n
+            ids = view[pos:pos + 4 * n].cast("I")
+            pos += 4 * n + (-4 * n % 8)
+            self._tables[bits] = (keys, ids)
+        self._offsets = view[pos:pos + 4 * (nv + 1)].cast("I")
+        self._blob = pos + 4 * (nv + 1)
+        self._names: Dict[int, str] = {}
+
+    def close(self) -> None:
+        self._tables, self._offsets = {}, None
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # quedan vistas vivas; el GC lo cerrará
+        self._fh.close()
+
+    def _vendor(self, vid: int) -> str:
+        name = self._names.get(vid)
+        if name is None:
+            a, b = self._offsets[vid], self._offsets[vid + 1]
+            name = self._mm[self._blob + a:self._blob + b].decode("utf-8", "replace")
+            self._names[vid] = name
+        return name
+
+    def lookup(self, mac_int: int) -> str:
+        for bits in _PREFIX_BITS:
+            keys, ids = self._tables[bits]
+            key = mac_int >> (48 - bits)
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                return self._vendor(ids[i])
+        return ""
+
+
+# -----------------------
+#  Estado (lazy)
+# -----------------------
+
+# Singletons simples para no re-abrir/re-cargar nada
+_index: Optional[_OuiIndex] = None
+_index_tried = False
+_lookup = None  # MacLookup (solo fallback / actualización)
+
+
+def _mac_to_int(mac: str) -> Optional[int]:
+    """'aa:bb:cc:dd:ee:ff' / 'AA-BB-...' / 'aabb.ccdd.eeff' → entero de 48 bits."""
+    if not mac:
+        return None
+    digits = mac.strip().replace(":", "").replace("-", "").replace(".", "")
+    if len(digits) != 12:
+        return None
+    try:
+        return int(digits, 16)
+    except ValueError:
+        return None
+
+
+def _local_ma_l_db() -> Optional[str]:
+    """Ruta del listado MA-L que mantiene mac-vendor-lookup (si existe)."""
+    try:
+        from mac_vendor_lookup import BaseMacLookup
+        return BaseMacLookup().find_vendors_list()
+    except Exception:
+        return None
+
+
+def _get_index() -> Optional[_OuiIndex]:
+    """Abre el índice; si falta, lo compila una vez desde la base MA-L local."""
+    global _index, _index_tried
+    if _index is not None or _index_tried:
+        return _index
+    _index_tried = True
+    try:
+        if not INDEX_PATH.exists():
+            src = _local_ma_l_db()
+            if not src:
+                return None
+            with open(src, encoding="utf-8", errors="ignore") as fh:
+                build_index([fh])
+        _index = _OuiIndex(INDEX_PATH)
+    except Exception:
+        _index = None
+    return _index
+
+
+def _fallback_lookup(mac: str) -> str:
+    """Camino lento sin índice: MacLookup por MAC, con la caché persistente delante."""
     global _lookup
+    cache = get_cache()
+    cached = cache.get_vendor(mac)
+    if cached is not None:
+        return cached
+    count("vendor.fallback_lookups")
     try:
-        if not mac:
-            return ""
-        normalized = mac.strip().lower().replace("-", ":")
-        if len(normalized.split(":")[0]) < 2:
-            return ""
         if _lookup is None:
+            from mac_vendor_lookup import MacLookup
             _lookup = MacLookup()  # carga DB (si ya existe localmente)
-        return _lookup.lookup(normalized)  # puede lanzar si no encuentra
+        vendor = _lookup.lookup(mac)  # puede lanzar si no encuentra
     except Exception:
+        vendor = ""
+    cache.put_vendor(mac, vendor)
+    return vendor
+
+
+# -----------------------
+#  API pública
+# -----------------------
+
+def vendor_from_mac(mac: str) -> str:
+    """
+    Devuelve el nombre del fabricante para una MAC (si existe).
+    - Normaliza may/min y separadores.
+    - Devuelve "" si no hay match o la MAC no es válida.
+    """
+    value = _mac_to_int(mac)
+    if value is None:
         return ""
+    index = _get_index()
+    if index is not None:
+        return index.lookup(value)
+    return _fallback_lookup(mac.strip().lower().replace("-", ":"))
 
+
+@timed("vendor.lookup")
+def vendors_for_macs(macs: Iterable[str]) -> List[str]:
+    """Versión en bloque de 'vendor_from_mac' (mismo orden que la entrada)."""
+    index = _get_index()
+    out: List[str] = []
+    for mac in macs:
+        value = _mac_to_int(mac)
+        if value is None:
+            out.append("")
+        elif index is not None:
+            out.append(index.lookup(value))
+        else:
+            out.append(_fallback_lookup(mac.strip().lower().replace("-", ":")))
+    count("vendor.macs", len(out))
+    return out
+
+
+def _download_lines(url: str) -> List[str]:
+    import urllib.request  # solo al actualizar: no penaliza el arranque
+    req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0 (wifi-guardian)"})
+    with urllib.request.urlopen(req, timeout=60) as resp:
+        return resp.read().decode("utf-8", errors="ignore").splitlines()
+
+
+@timed("vendor.update")
 def update_local_db() -> bool:
     """
-    Descarga/actualiza la base de datos de OUIs (requiere Internet).
+    Descarga/actualiza la base de datos de OUIs (requiere Internet) y recompila el índice.
+    MA-M/MA-S son best-effort: si fallan, el índice queda solo con MA-L.
     Devuelve True si se actualiza sin errores.
     """
-    global _lookup
+    global _lookup, _index, _index_tried
     try:
+        from mac_vendor_lookup import MacLookup
         if _lookup is None:
             _lookup = MacLookup()
         _lookup.update_vendors()
+        src = _local_ma_l_db()
+        if not src:
+            return False
+        sources: List[Iterable[str]] = []
+        for url in IEEE_EXTRA_URLS:
+            try:
+                sources.append(_download_lines(url))
+            except Exception:
+                pass
+        # Soltar el mmap actual antes de reemplazar el archivo (Windows no lo permite abierto)
+        if _index is not None:
+            _index.close()
+        _index, _index_tried = None, False
+        with open(src, encoding="utf-8", errors="ignore") as fh:
+            sources.insert(0, fh)
+            build_index(sources)
         return True
     except Exception:
         return False